@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ApiCarrinhoConfig(AppConfig):
+    name = 'api_carrinho'
+
+    def ready(self):
+        # Receptores de sinais do projeto: PRAGMAs do SQLite em cada conexão
+        # nova (sqlite.py) e cópia da réplica ao fim do migrate (replica.py)
+        from api_carrinho import replica, sqlite  # noqa F401
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_carrinho.settings')
 
 application = get_asgi_application()
+
+# Monta o índice de autocompletar antes da primeira requisição
+from apps.carrinho.autocompletar import aquecer  # noqa E402
+
+aquecer()
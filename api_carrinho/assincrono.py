@@ -0,0 +1,57 @@
+"""
+Views assíncronas sobre o APIView do DRF.
+
+O DRF 3.15 só despacha handlers síncronos. APIViewAssincrona refaz o
+dispatch como corrotina: autenticação, permissões e throttling continuam
+sendo os do DRF (rodam numa thread via sync_to_async, porque o token é
+lido do banco), e o handler `async def get(...)` roda no event loop,
+consultando o banco pelo ORM assíncrono (aget, async for).
+
+Sob ASGI o Django dá a cada requisição uma thread para o código
+síncrono. A view síncrona trabalha nela do início ao fim; a assíncrona só
+na autenticação e nas consultas, e espera no event loop o que não for
+banco. Sob WSGI o Django roda a corrotina com async_to_sync, então as
+mesmas URLs continuam funcionando.
+"""
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from rest_framework.views import APIView
+
+
+class APIViewAssincrona(APIView):
+    """
+    APIView cujos handlers são `async def`. Só faz sentido para leituras:
+    escritas continuam nas views síncronas, dentro das transações dos
+    managers.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Autentica já aqui: request.user fica em cache no Request e o
+            # handler não dispara consultas síncronas ao lê-lo
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(
+                    self, request.method.lower(), self.http_method_not_allowed
+                )
+            else:
+                handler = self.http_method_not_allowed
+
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                # options() e http_method_not_allowed() do DRF
+                response = handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
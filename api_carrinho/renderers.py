@@ -0,0 +1,80 @@
+"""
+Renderer e parser JSON baseados no orjson.
+
+O orjson serializa dict/list (inclusive ReturnDict/ReturnList), UUID e
+datetime direto em C, sem as cópias e o `default` em Python do encoder do
+DRF; só o que ele não conhece (Decimal, textos traduzíveis, QuerySet...)
+passa pelo encoder do DRF. Sem o orjson instalado, as duas classes se
+comportam como JSONRenderer/JSONParser.
+
+NDJSONRenderer (application/x-ndjson) escreve uma linha JSON por item da
+lista; é o formato das listagens em streaming (ver streaming.py).
+"""
+import json
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+_encoder = JSONEncoder()
+
+if orjson is not None:
+    OPCOES = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def para_json(dados):
+    # Um documento JSON compacto em bytes, com ou sem o orjson
+    if orjson is None:
+        return json.dumps(
+            dados, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')
+        ).encode()
+    return orjson.dumps(dados, default=_encoder.default, option=OPCOES)
+
+
+class OrjsonRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        opcoes = OPCOES
+        # O orjson só indenta com 2 espaços; qualquer indent pedido vira 2.
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            opcoes |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_encoder.default, option=opcoes)
+
+
+class OrjsonParser(JSONParser):
+    renderer_class = OrjsonRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get(
+            'encoding', settings.DEFAULT_CHARSET
+        )
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, (list, tuple)):
+            return b''.join(para_json(item) + b'\n' for item in data)
+        return para_json(data) + b'\n'
@@ -0,0 +1,204 @@
+"""
+Réplica de leitura.
+
+RoteadorReplica manda para a réplica (REPLICA['ALIAS']) as leituras das
+requisições GET/HEAD/OPTIONS; escritas, leituras de requisições que
+alteram dados e leituras dentro de transação ficam no default. Assim a
+navegação no catálogo usa outra conexão (e, no SQLite, outro arquivo)
+que não disputa lock com o checkout.
+
+A réplica fica atrasada em relação ao default. Para que o cliente leia o
+que acabou de gravar, uma requisição que altera dados fixa quem a fez no
+default por JANELA_ESCRITA segundos: a chave é a credencial enviada
+(Authorization ou cookie de sessão) e a marca fica no cache padrão. Isso
+só basta se a réplica tiver menos de JANELA_ESCRITA segundos de atraso:
+cada cópia grava no cache o instante em que começou, e com a última cópia
+mais antiga que isso (sincronização parada) todas as leituras voltam ao
+default. Escritas sem credencial (cadastro, scripts) não fixam ninguém e
+podem levar até JANELA_ESCRITA segundos para aparecer nas leituras. Com
+vários workers, use um backend de cache compartilhado.
+
+Usuários, tokens e sessões são sempre lidos do default: um token recém
+criado ainda não existe na réplica. Sem a réplica em DATABASES, ou com
+ela apontando para o mesmo banco do default (o espelho usado nos testes),
+tudo fica no default.
+
+Localmente a réplica é um segundo arquivo SQLite copiado do default pela
+API de backup: manage.py sincronizar_replica --intervalo N, com N menor
+que JANELA_ESCRITA, e também ao fim de cada migrate, para que a réplica
+nunca fique sem as tabelas. A réplica fica desligada até que
+REPLICA_LEITURA aponte para o arquivo dela (ver settings.py).
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from hashlib import sha256
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+CONFIGURACAO_PADRAO = {
+    'ALIAS': 'replica',
+    'JANELA_ESCRITA': 5,
+    'INTERVALO_SINCRONIZACAO': 2,
+    'APPS_NO_PRINCIPAL': ('auth', 'authtoken', 'sessions', 'contenttypes'),
+}
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+# Instante (time.time()) em que começou a última cópia para a réplica
+CHAVE_SINCRONIZACAO = 'replica:sincronizada_em'
+
+_ler_da_replica = contextvars.ContextVar('ler_da_replica', default=False)
+
+
+def configuracao():
+    return {**CONFIGURACAO_PADRAO, **getattr(settings, 'REPLICA', {})}
+
+
+def replica_disponivel(alias):
+    if alias not in connections.settings:
+        return False
+    return (
+        connections[alias].settings_dict['NAME']
+        != connections['default'].settings_dict['NAME']
+    )
+
+
+@contextmanager
+def lendo_do_principal():
+    """Leituras do bloco vão para o default, mesmo numa requisição GET."""
+    token = _ler_da_replica.set(False)
+    try:
+        yield
+    finally:
+        _ler_da_replica.reset(token)
+
+
+def copia_local(alias):
+    # A cópia pela API de backup só vale para réplica e default em arquivos
+    # SQLite; o banco de testes, em memória, não é copiado
+    origem = connections['default']
+    return replica_disponivel(alias) and (
+        connections[alias].vendor == origem.vendor == 'sqlite'
+        and not origem.is_in_memory_db()
+    )
+
+
+def sincronizar(alias=None):
+    """Copia o default inteiro para a réplica pela API de backup do SQLite."""
+    alias = alias or configuracao()['ALIAS']
+    origem, destino = connections['default'], connections[alias]
+    origem.ensure_connection()
+    destino.ensure_connection()
+    # Uma passada só (pages=-1): a cópia é um instantâneo consistente do
+    # default no início dela
+    inicio = time.time()
+    origem.connection.backup(destino.connection)
+    cache.set(CHAVE_SINCRONIZACAO, inicio, None)
+
+
+@receiver(post_migrate, dispatch_uid='api_carrinho.replica')
+def sincronizar_apos_migrate(sender, using, **kwargs):
+    alias = configuracao()['ALIAS']
+    if using == 'default' and copia_local(alias):
+        sincronizar(alias)
+
+
+class RoteadorReplica:
+    def db_for_read(self, model, **hints):
+        if not _ler_da_replica.get():
+            return None
+        config = configuracao()
+        if model._meta.app_label in config['APPS_NO_PRINCIPAL']:
+            return None
+        # Dentro de transação a leitura acompanha as escritas dela
+        if connections['default'].in_atomic_block:
+            return None
+        if not replica_disponivel(config['ALIAS']):
+            return None
+        return config['ALIAS']
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e default têm os mesmos dados
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o esquema junto com os dados, pela cópia
+        if db == configuracao()['ALIAS']:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Libera a réplica para as leituras das requisições seguras de quem não
+    gravou nada nos últimos JANELA_ESCRITA segundos.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _ler_da_replica.set(self._pode_ler_da_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _ler_da_replica.reset(token)
+        self._fixar_apos_escrita(request)
+        return response
+
+    async def __acall__(self, request):
+        token = _ler_da_replica.set(self._pode_ler_da_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _ler_da_replica.reset(token)
+        self._fixar_apos_escrita(request)
+        return response
+
+    @staticmethod
+    def _chave(request):
+        credencial = request.META.get('HTTP_AUTHORIZATION') or (
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        )
+        if not credencial:
+            return None
+        return 'replica:fixado:' + sha256(credencial.encode()).hexdigest()
+
+    def _pode_ler_da_replica(self, request):
+        if request.method not in METODOS_SEGUROS:
+            return False
+        chave = self._chave(request)
+        marcas = cache.get_many(
+            [CHAVE_SINCRONIZACAO] + ([chave] if chave else [])
+        )
+        if chave is not None and marcas.get(chave):
+            return False
+        # Cópia começada há menos de JANELA_ESCRITA segundos: já contém o
+        # que foi gravado por quem saiu da janela
+        sincronizada_em = marcas.get(CHAVE_SINCRONIZACAO)
+        return sincronizada_em is not None and (
+            time.time() - sincronizada_em < configuracao()['JANELA_ESCRITA']
+        )
+
+    def _fixar_apos_escrita(self, request):
+        # Mesmo com erro a requisição pode ter gravado algo
+        if request.method in METODOS_SEGUROS:
+            return
+        chave = self._chave(request)
+        if chave is not None:
+            cache.set(chave, True, configuracao()['JANELA_ESCRITA'])
@@ -44,9 +44,11 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
 
+    'api_carrinho.apps.ApiCarrinhoConfig',
     'apps.perfil.apps.PerfilConfig',
     'apps.pedidos.apps.PedidosConfig',
     'apps.carrinho.apps.CarrinhoConfig',
+    'apps.idempotencia.apps.IdempotenciaConfig',
 ]
 
 MIDDLEWARE = [
@@ -83,11 +85,60 @@ WSGI_APPLICATION = 'api_carrinho.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLite com o perfil de api_carrinho/sqlite.py: transações de escrita com
+# BEGIN IMMEDIATE e conexões reaproveitadas por até CONN_MAX_AGE segundos.
+# Sob ASGI cada requisição roda o código síncrono numa thread própria e a
+# conexão não é reaproveitada: lá, use CONN_MAX_AGE = 0.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+}
+
+# Réplica de leitura (api_carrinho/replica.py), desligada por padrão. Com
+# REPLICA_LEITURA=<arquivo SQLite> no ambiente, as leituras de
+# GET/HEAD/OPTIONS vão para a réplica, que precisa de um processo com
+# manage.py sincronizar_replica --intervalo INTERVALO_SINCRONIZACAO
+# (menor que JANELA_ESCRITA) e de um cache compartilhado entre processos.
+# A réplica só é lida enquanto a última cópia tiver menos de JANELA_ESCRITA
+# segundos, e quem alterou dados lê do default por JANELA_ESCRITA segundos.
+REPLICA = {
+    'ALIAS': 'replica',
+    'JANELA_ESCRITA': 5,
+    'INTERVALO_SINCRONIZACAO': 2,
+}
+
+if os.environ.get('REPLICA_LEITURA'):
+    DATABASES[REPLICA['ALIAS']] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['REPLICA_LEITURA'],
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        # Nos testes, espelho do default (e por isso ignorada pelo roteador)
+        'TEST': {
+            'MIRROR': 'default',
+        },
     }
+    DATABASE_ROUTERS = ['api_carrinho.replica.RoteadorReplica']
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1, # noqa E501
+        'api_carrinho.replica.ReplicaMiddleware'
+    )
+
+# PRAGMAs aplicados a cada conexão nova do SQLite (None desliga um deles)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,  # ms esperando o lock de escrita
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,  # negativo: KiB
+    'temp_store': 'memory',
 }
 
 
@@ -149,6 +200,17 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    # orjson no lugar do json da biblioteca padrão (ver renderers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'api_carrinho.renderers.OrjsonRenderer',
+        'api_carrinho.renderers.NDJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api_carrinho.renderers.OrjsonParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',  # noqa E501
     'PAGE_SIZE': 2,
     'DEFAULT_THROTTLE_CLASSES': (
@@ -161,6 +223,69 @@ REST_FRAMEWORK = {
     }
 }
 
+# Frete: a tabela UF -> frete fica em memória em cada processo. Mudanças
+# em InformacaoEnvio publicam uma nova versão no cache padrão; com vários
+# workers, configure CACHES com um backend compartilhado (Redis/Memcached).
+FRETE_INTERVALO_VERIFICACAO = 1.0  # segundos entre conferências da versão
+
+# Cache de respostas do catálogo (produtos/ e produtos/<UUID>/). TTL e
+# ESTOQUE_TTL em segundos; o estoque tem janela própria, mais curta.
+CATALOGO_CACHE = {
+    'TTL': 300,
+    'ESTOQUE_TTL': 5,
+    'MAX_ENTRADAS': 512,
+    'INTERVALO_VERIFICACAO': 1.0,
+}
+
+# Paginação keyset da listagem de produtos (produtos/?tamanho=&ordenacao=)
+CATALOGO_PAGINACAO = {
+    'TAMANHO_PAGINA': 50,
+    'TAMANHO_MAXIMO': 500,
+}
+
+# Números de pedido e de envio gerados no servidor: cada processo reserva
+# TAMANHO_BLOCO números por vez no contador (pedidos.Sequencia)
+SEQUENCIAS = {
+    'TAMANHO_BLOCO': 50,
+}
+
+# Idempotency-Key nas mutações de carrinho e pedido: respostas guardadas por
+# TTL segundos (manage.py limpar_idempotencia apaga as vencidas)
+IDEMPOTENCIA = {
+    'TTL': 24 * 60 * 60,
+    'TEMPO_EM_ANDAMENTO': 60,
+}
+
+# Ranking de mais vendidos em memória (produtos/mais-vendidos/): top
+# TAMANHO por região e geral, gravado em pedidos.ContagemVendasProduto por
+# uma thread a cada INTERVALO_SNAPSHOT segundos (None desliga); MAX_AGE vai
+# no Cache-Control da resposta
+MAIS_VENDIDOS = {
+    'TAMANHO': 20,
+    'INTERVALO_SNAPSHOT': 30.0,
+    'MAX_AGE': 60,
+}
+
+# Paginação keyset da listagem de pedidos (pedidos/?tamanho=&ordenacao=)
+PEDIDOS_PAGINACAO = {
+    'TAMANHO_PAGINA': 20,
+    'TAMANHO_MAXIMO': 100,
+}
+
+# Índice em memória do autocompletar (produtos/autocompletar/?q=)
+AUTOCOMPLETAR = {
+    'MAX_RESULTADOS': 10,
+    'PROFUNDIDADE_PRECALCULADA': 3,
+    'MEMORIA_MAXIMA_MB': 64,
+    'CONSTRUIR_NA_INICIALIZACAO': True,
+}
+
+# Listagens em streaming (?stream=1 ou Accept: application/x-ndjson): linhas
+# lidas do banco e serializadas por lote de TAMANHO_LOTE
+STREAMING = {
+    'TAMANHO_LOTE': 500,
+}
+
 # SWAGGER
 SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,
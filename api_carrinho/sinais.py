@@ -0,0 +1,11 @@
+from django.db import transaction
+
+
+def invalidar_agora_e_apos_commit(invalidar):
+    """
+    Chama `invalidar()` já, para este processo, e de novo após o commit da
+    transação em curso: sem a segunda chamada, uma leitura feita antes da
+    mudança ser confirmada recarregaria (e guardaria) os dados antigos.
+    """
+    invalidar()
+    transaction.on_commit(invalidar)
@@ -0,0 +1,50 @@
+"""
+Perfil de conexão do SQLite para produção.
+
+Cada conexão nova recebe os PRAGMAs de SQLITE_PRAGMAS (sobre os padrões
+abaixo) pelo sinal connection_created:
+
+- journal_mode=wal: leitores não bloqueiam o escritor nem são bloqueados
+  por ele; o commit grava só no WAL.
+- synchronous=normal: com WAL, fsync só no checkpoint. Um commit pode se
+  perder se a máquina cair (não o processo), mas o banco não corrompe.
+- busy_timeout: quanto (ms) uma conexão espera pelo lock de escrita antes
+  de falhar com "database is locked".
+- mmap_size, cache_size (negativo = KiB) e temp_store=memory: leituras
+  por mmap, cache de páginas maior e temporárias (ORDER BY, GROUP BY sem
+  índice) fora do disco.
+
+O resto do perfil está em DATABASES: transaction_mode IMMEDIATE faz todo
+transaction.atomic() abrir com BEGIN IMMEDIATE, pegando o lock de escrita
+na entrada. Com o BEGIN padrão (DEFERRED) a transação que lê e depois
+escreve tenta promover o lock no meio e, se outra já escreve, falha na
+hora sem esperar o busy_timeout. CONN_MAX_AGE mantém a conexão (e os
+PRAGMAs já aplicados) entre requisições da mesma thread.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+CONFIGURACAO_PADRAO = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,
+    'temp_store': 'memory',
+}
+
+
+def configuracao():
+    return {**CONFIGURACAO_PADRAO, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+@receiver(connection_created, dispatch_uid='api_carrinho.sqlite')
+def configurar_conexao(sender, connection, **kwargs):
+    # None num PRAGMA desliga o ajuste
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, valor in configuracao().items():
+            if valor is not None:
+                cursor.execute(f'PRAGMA {pragma} = {valor}')
@@ -0,0 +1,83 @@
+"""
+Listagens em streaming.
+
+Com ?stream=1 (ou Accept: application/x-ndjson / ?format=ndjson) as
+listagens deixam de montar a lista inteira em memória: as linhas saem do
+banco com queryset.iterator(chunk_size=...), são serializadas lote a lote
+e enviadas numa StreamingHttpResponse, como um array JSON ou uma linha
+NDJSON por item. A memória do worker fica limitada a um lote e o
+primeiro byte sai logo após a primeira leitura.
+
+Depois que o primeiro byte sai não dá mais para trocar o status; um erro
+no meio da listagem interrompe o corpo (o array fica sem o "]").
+"""
+from itertools import islice
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from drf_yasg import openapi
+from api_carrinho.renderers import NDJSONRenderer, para_json
+
+CONFIGURACAO_PADRAO = {
+    'TAMANHO_LOTE': 500,
+}
+
+VALORES_VERDADEIROS = ('1', 'true', 'sim')
+
+PARAMETRO_STREAM = openapi.Parameter(
+    'stream', openapi.IN_QUERY,
+    description="1 para receber a lista em streaming (array JSON); com Accept: application/x-ndjson, uma linha JSON por item", # noqa E501
+    type=openapi.TYPE_STRING
+)
+
+
+def configuracao():
+    return {**CONFIGURACAO_PADRAO, **getattr(settings, 'STREAMING', {})}
+
+
+def streaming_solicitado(request):
+    # Opt-in: parâmetro stream ou o renderer NDJSON escolhido na negociação
+    return (
+        request.query_params.get('stream', '').lower() in VALORES_VERDADEIROS
+        or request.accepted_renderer.format == NDJSONRenderer.format
+    )
+
+
+def _lotes(queryset, tamanho):
+    linhas = queryset.iterator(chunk_size=tamanho)
+    while lote := list(islice(linhas, tamanho)):
+        yield lote
+
+
+def _array(queryset, serializar, tamanho):
+    yield b'['
+    separador = b''
+    for lote in _lotes(queryset, tamanho):
+        dados = serializar(lote)
+        if dados:
+            yield separador + b','.join(para_json(item) for item in dados)
+            separador = b','
+    yield b']'
+
+
+def _ndjson(queryset, serializar, tamanho):
+    for lote in _lotes(queryset, tamanho):
+        yield b''.join(para_json(item) + b'\n' for item in serializar(lote))
+
+
+def resposta_em_streaming(request, queryset, serializar, tamanho_lote=None):
+    """
+    Envia `queryset` em streaming. `serializar` recebe um lote (lista de
+    objetos) e devolve a lista de dicts correspondente.
+    """
+    tamanho = tamanho_lote or configuracao()['TAMANHO_LOTE']
+    if request.accepted_renderer.format == NDJSONRenderer.format:
+        conteudo = _ndjson(queryset, serializar, tamanho)
+        tipo = NDJSONRenderer.media_type
+    else:
+        conteudo = _array(queryset, serializar, tamanho)
+        tipo = 'application/json'
+
+    resposta = StreamingHttpResponse(conteudo, content_type=tipo)
+    # Proxies como o nginx não devem segurar o corpo até o fim
+    resposta['X-Accel-Buffering'] = 'no'
+    return resposta
@@ -5,13 +5,17 @@ from django.conf.urls.static import static
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
-from apps.carrinho.api.viewsets import ProdutoAPIView, ProdutoDetailAPIView, ProdutoFilterListAPIView # noqa E501
+from apps.carrinho.api.viewsets import ProdutoAPIView, ProdutoDetailAPIView, ProdutoFilterListAPIView, CacheCatalogoAPIView, ProdutoBuscaAPIView, ProdutoAutocompletarAPIView, ProdutosMaisVendidosAPIView # noqa E501
+from apps.carrinho.api.viewsets import ProdutoAsyncAPIView, ProdutoDetailAsyncAPIView, CarrinhoAsyncAPIView, ListarCarrinhosFinalizadosAsyncAPIView # noqa E501
 from apps.carrinho.api.viewsets import (
     CarrinhoAPIView, CarrinhoComprasAPIView,  RemoveCarrinhoComprasAPIView,
-    AtualizarStatusCarrinhoAPIView, ListarCarrinhosFinalizadosAPIView
+    RemoveCarrinhoComprasLoteAPIView,
+    CarrinhoComprasLoteAPIView,
+    AtualizarStatusCarrinhoAPIView, ListarCarrinhosFinalizadosAPIView,
+    FinalizarCompraAPIView
 )
-from apps.pedidos.api.viewsets import InformacaoEnvioAPIView, InformacaoEnvioDetails # noqa E501
-from apps.pedidos.api.viewsets import PedidoAPIView, PedidoDetailsAPIView
+from apps.pedidos.api.viewsets import InformacaoEnvioAPIView, InformacaoEnvioDetails, ResolvedorFreteAPIView # noqa E501
+from apps.pedidos.api.viewsets import PedidoAPIView, PedidoDetailsAPIView, ResumoClienteAPIView, VendasDiariasAPIView, PedidoAsyncAPIView # noqa E501
 from apps.perfil.api.viewsets import UsuarioAPIView, UsuarioDetailAPIView
 from apps.perfil.api.viewsets import PerfilAPIView,  PerfilDetailAPIView
 from apps.perfil.api.viewsets import EnderecoAPIView, EnderecoDetailAPIView
@@ -47,17 +51,36 @@ urlpatterns = [
     path('enderecos/<int:pk>/', EnderecoDetailAPIView.as_view(), name='endereco-detail'), # noqa E501
     path('enderecos/<int:pk>/', EnderecoDetailAPIView.as_view(), name='endereco-detail'), # noqa E501
     path('informacao-envio/', InformacaoEnvioAPIView.as_view(), name='informacao-envio'), # noqa E501
+    path('informacao-envio/resolvedor/', ResolvedorFreteAPIView.as_view(), name='informacao-envio-resolvedor'), # noqa E501
     path('informacao-envio/<int:pk>/', InformacaoEnvioDetails.as_view(), name='informacao-envio-detail'), # noqa E501
     path('pedidos/', PedidoAPIView.as_view(), name='pedidos'),
+    path('pedidos/resumo/', ResumoClienteAPIView.as_view(), name='pedidos-resumo'), # noqa E501
+    path('pedidos/vendas/', VendasDiariasAPIView.as_view(), name='pedidos-vendas'), # noqa E501
     path('pedidos/<int:id>/', PedidoDetailsAPIView.as_view(), name='pedido-detail'),  # noqa E501
     path('produtos/', ProdutoAPIView.as_view(), name='produtos'),
+    path('produtos/autocompletar/', ProdutoAutocompletarAPIView.as_view(), name='produtos-autocompletar'), # noqa E501
+    path('produtos/busca/', ProdutoBuscaAPIView.as_view(), name='produtos-busca'), # noqa E501
+    path('produtos/cache/', CacheCatalogoAPIView.as_view(), name='produtos-cache'), # noqa E501
+    path('produtos/mais-vendidos/', ProdutosMaisVendidosAPIView.as_view(), name='produtos-mais-vendidos'), # noqa E501
     path('produtos/<str:UUID>/', ProdutoDetailAPIView.as_view(), name='produto-detail'), # noqa E501
     path('produtos/filter-list/', ProdutoFilterListAPIView.as_view(), name='produtos-filter-list'), # noqa E501
     path('carrinhos/', CarrinhoAPIView.as_view(), name='carrinhos'),
+    path('carrinhos/adicionar/', CarrinhoComprasLoteAPIView.as_view(), name='adicionar-produtos-carrinho'),  # noqa E501
     path('carrinhos/adicionar/<str:num_produto>/<int:quantidade>/', CarrinhoComprasAPIView.as_view(), name='adicionar-produto-carrinho'),  # noqa E501
+    path('carrinhos/remover/', RemoveCarrinhoComprasLoteAPIView.as_view(), name='remover-produtos-carrinho'),  # noqa E501
+    path('carrinhos/remover/<uuid:num_produto>/', RemoveCarrinhoComprasAPIView.as_view(), name='remover-produto-carrinho-uuid'),  # noqa E501
     path('carrinhos/remover/<str:nome>/', RemoveCarrinhoComprasAPIView.as_view(), name='remover-produto-carrinho'),  # noqa E501
     path('carrinhos/status/', AtualizarStatusCarrinhoAPIView.as_view(), name='atualizar-status-carrinho'),  # noqa E501
+    path('carrinhos/finalizar/', FinalizarCompraAPIView.as_view(), name='finalizar-compra'),  # noqa E501
     path('carrinhos/finalizados/', ListarCarrinhosFinalizadosAPIView.as_view(), name='listar-carrinhos-finalizados'), # noqa E501
+
+    # Variantes assíncronas (ORM assíncrono) das leituras mais frequentes;
+    # sob ASGI não prendem uma thread por requisição
+    path('async/produtos/', ProdutoAsyncAPIView.as_view(), name='produtos-async'), # noqa E501
+    path('async/produtos/<str:UUID>/', ProdutoDetailAsyncAPIView.as_view(), name='produto-detail-async'), # noqa E501
+    path('async/carrinhos/', CarrinhoAsyncAPIView.as_view(), name='carrinhos-async'), # noqa E501
+    path('async/carrinhos/finalizados/', ListarCarrinhosFinalizadosAsyncAPIView.as_view(), name='listar-carrinhos-finalizados-async'), # noqa E501
+    path('async/pedidos/', PedidoAsyncAPIView.as_view(), name='pedidos-async'), # noqa E501
 ]
 
 if settings.DEBUG:
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CarrinhoDeCompras, Produto
+from .models import CarrinhoDeCompras, ItemCarrinho, Produto
 
 
 @admin.register(Produto)
@@ -10,6 +10,18 @@ class ProdutoAdmin(admin.ModelAdmin):
     ordering = ('nome',)
 
 
+class ItemCarrinhoInline(admin.TabularInline):
+    model = ItemCarrinho
+    extra = 0
+    fields = ('produto', 'quantidade', 'preco_unitario')
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        """Linhas só mudam pela API, que também movimenta o estoque."""
+        return False
+
+
 @admin.register(CarrinhoDeCompras)
 class CarrinhoDeComprasAdmin(admin.ModelAdmin):
     list_display = ('id', 'cliente', 'total', 'status')
@@ -23,9 +35,10 @@ class CarrinhoDeComprasAdmin(admin.ModelAdmin):
             'fields': ('cliente',)
         }),
         ('Detalhes do Carrinho', {
-            'fields': ('itens', 'frete', 'total', 'status')
+            'fields': ('frete', 'total', 'status')
         }),
     )
+    inlines = [ItemCarrinhoInline]
     ordering = ('-id',)
 
     def has_add_permission(self, request):
@@ -0,0 +1,173 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+CONFIGURACAO_PADRAO = {
+    'TAMANHO_PAGINA': 50,
+    'TAMANHO_MAXIMO': 500,
+}
+
+
+class PaginacaoPorChave(BasePagination):
+    """
+    Paginação keyset: cada página continua a partir da chave de ordenação
+    do último (ou primeiro, ao voltar) item da anterior, em vez de pular
+    OFFSET linhas, então a página N custa o mesmo que a primeira.
+
+    A chave é (campo, id) - o id desempata valores repetidos - e precisa de
+    um índice composto com as mesmas colunas. O cursor é opaco para o
+    cliente: JSON em base64 com a ordenação, os valores da chave e o
+    sentido da navegação.
+    """
+
+    cursor_query_param = 'cursor'
+    ordenacao_query_param = 'ordenacao'
+    tamanho_query_param = 'tamanho'
+    ordenacoes = ('id', 'nome', 'preco')
+    tipos = {'id': int, 'nome': str, 'preco': (int, float)}
+    ordenacao_padrao = 'id'
+    cursor_invalido = 'Cursor inválido.'
+    nome_configuracao = 'CATALOGO_PAGINACAO'
+
+    def configuracao(self):
+        return {
+            **CONFIGURACAO_PADRAO,
+            **getattr(settings, self.nome_configuracao, {}),
+        }
+
+    def paginate_queryset(self, queryset, request, view=None):
+        consulta = self._consulta(queryset, request)
+        return self._fechar_pagina(list(consulta[:self.tamanho + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # Mesma página, lida pelo ORM assíncrono
+        consulta = self._consulta(queryset, request)
+        return self._fechar_pagina(
+            [item async for item in consulta[:self.tamanho + 1]]
+        )
+
+    def _consulta(self, queryset, request):
+        self.request = request
+        self.tamanho = self.get_page_size(request)
+        cursor = self.decodificar_cursor(request)
+        if cursor:
+            self.ordenacao, valores, voltando = cursor
+        else:
+            self.ordenacao = self.get_ordering(request)
+            valores, voltando = None, False
+
+        campo = self.ordenacao.lstrip('-')
+        self.chaves = (campo,) if campo == 'id' else (campo, 'id')
+
+        # Ao voltar, a consulta percorre o índice no sentido contrário e a
+        # página é invertida depois.
+        crescente = self.ordenacao.startswith('-') == voltando
+        if valores is not None:
+            queryset = queryset.filter(self._apos(valores, crescente))
+        self.voltando, self.continuando = voltando, valores is not None
+        return queryset.order_by(
+            *(chave if crescente else f'-{chave}' for chave in self.chaves)
+        )
+
+    def _fechar_pagina(self, linhas):
+        pagina = linhas[:self.tamanho]
+        ha_mais = len(linhas) > self.tamanho
+        if self.voltando:
+            pagina.reverse()
+            self.tem_proxima, self.tem_anterior = True, ha_mais
+        else:
+            self.tem_proxima, self.tem_anterior = ha_mais, self.continuando
+        self.pagina = pagina
+        return pagina
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        config = self.configuracao()
+        try:
+            tamanho = int(request.query_params[self.tamanho_query_param])
+        except (KeyError, ValueError):
+            return config['TAMANHO_PAGINA']
+        if tamanho <= 0:
+            return config['TAMANHO_PAGINA']
+        return min(tamanho, config['TAMANHO_MAXIMO'])
+
+    def get_ordering(self, request):
+        ordenacao = request.query_params.get(
+            self.ordenacao_query_param, self.ordenacao_padrao
+        )
+        if ordenacao.lstrip('-') not in self.ordenacoes:
+            raise ValidationError({
+                self.ordenacao_query_param: (
+                    f"Ordenação inválida. Use um de: {', '.join(self.ordenacoes)}" # noqa E501
+                    " (prefixo '-' para decrescente)."
+                )
+            })
+        return ordenacao
+
+    def get_next_link(self):
+        if not self.tem_proxima or not self.pagina:
+            return None
+        return self.link_cursor(self.pagina[-1], voltando=False)
+
+    def get_previous_link(self):
+        if not self.tem_anterior:
+            return None
+        if not self.pagina:
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param
+            )
+        return self.link_cursor(self.pagina[0], voltando=True)
+
+    def link_cursor(self, item, voltando):
+        valores = [getattr(item, chave) for chave in self.chaves]
+        codificado = urlsafe_b64encode(json.dumps(
+            {'o': self.ordenacao, 'v': valores, 'r': voltando},
+            separators=(',', ':')
+        ).encode()).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param, codificado
+        )
+
+    def decodificar_cursor(self, request):
+        codificado = request.query_params.get(self.cursor_query_param)
+        if not codificado:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(codificado.encode()))
+            ordenacao, valores, voltando = cursor['o'], cursor['v'], cursor['r'] # noqa E501
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.cursor_invalido)
+
+        campo = str(ordenacao).lstrip('-')
+        if campo not in self.ordenacoes:
+            raise NotFound(self.cursor_invalido)
+        tipos = (self.tipos[campo], int) if campo != 'id' else (int,)
+        if (not isinstance(valores, list) or len(valores) != len(tipos)
+                or not all(map(isinstance, valores, tipos))):
+            raise NotFound(self.cursor_invalido)
+        return ordenacao, valores, bool(voltando)
+
+    def _apos(self, valores, crescente):
+        # (campo, id) > (v1, v2) escrito de forma que o primeiro termo
+        # delimite a faixa do índice composto.
+        sufixo = 'gt' if crescente else 'lt'
+        if len(self.chaves) == 1:
+            return Q(**{f'id__{sufixo}': valores[0]})
+        campo = self.chaves[0]
+        return Q(**{f'{campo}__{sufixo}e': valores[0]}) & (
+            Q(**{f'{campo}__{sufixo}': valores[0]})
+            | Q(**{f'id__{sufixo}': valores[1]})
+        )
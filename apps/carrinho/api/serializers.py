@@ -9,13 +9,17 @@ class ProdutoSerializer(serializers.Serializer):
     descricao = serializers.CharField(allow_blank=True, required=False)
     preco = serializers.FloatField()
     estoque = serializers.IntegerField()
+    versao = serializers.IntegerField(read_only=True)
+    atualizado_em = serializers.DateTimeField(read_only=True)
 
 
 class CarrinhoDeComprasSerializer(serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
     cliente = serializers.PrimaryKeyRelatedField(read_only=True)
-    itens = serializers.JSONField()
+    itens = serializers.JSONField(read_only=True)
     frete_custo = serializers.SerializerMethodField()
+    subtotal = serializers.FloatField(read_only=True)
+    quantidade_itens = serializers.IntegerField(read_only=True)
     total = serializers.FloatField(required=False, allow_null=True)
     status = serializers.ChoiceField(
         choices=CarrinhoDeCompras.StatusCarrinho.choices
@@ -26,3 +30,25 @@ class CarrinhoDeComprasSerializer(serializers.Serializer):
         if obj.frete:
             return obj.frete.custo_envio
         return None
+
+
+class ItemAdicaoSerializer(serializers.Serializer):
+    num_produto = serializers.UUIDField()
+    quantidade = serializers.IntegerField(min_value=1)
+
+
+class AdicaoEmLoteSerializer(serializers.Serializer):
+    itens = ItemAdicaoSerializer(many=True, allow_empty=False, max_length=200)
+    tudo_ou_nada = serializers.BooleanField(default=False)
+
+
+class ItemRemocaoSerializer(serializers.Serializer):
+    num_produto = serializers.UUIDField()
+    # Sem quantidade, a linha sai inteira do carrinho
+    quantidade = serializers.IntegerField(
+        min_value=1, required=False, allow_null=True, default=None
+    )
+
+
+class RemocaoEmLoteSerializer(serializers.Serializer):
+    itens = ItemRemocaoSerializer(many=True, allow_empty=False, max_length=200) # noqa E501
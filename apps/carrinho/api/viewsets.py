@@ -1,18 +1,30 @@
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.response import Response
 from rest_framework import status
-from apps.carrinho.api.serializers import CarrinhoDeComprasSerializer, ProdutoSerializer # noqa E501
+from django.db import DatabaseError
+from django.utils.cache import patch_cache_control
+from apps.carrinho.autocompletar import indice_autocompletar
+from apps.carrinho.busca import buscar_produtos, montar_consulta
+from apps.carrinho.cache import cache_catalogo
+from apps.carrinho.condicional import aresposta_condicional, resposta_condicional # noqa E501
+from api_carrinho.assincrono import APIViewAssincrona
+from api_carrinho.replica import lendo_do_principal
+from api_carrinho.streaming import PARAMETRO_STREAM, resposta_em_streaming, streaming_solicitado # noqa E501
+from apps.carrinho.api.paginacao import PaginacaoPorChave
+from apps.carrinho.api.serializers import AdicaoEmLoteSerializer, CarrinhoDeComprasSerializer, ProdutoSerializer, RemocaoEmLoteSerializer # noqa E501
 from apps.carrinho.managers.manager_carrinho import CarrinhoManager
 from apps.carrinho.managers.manager_produto import ProdutosManager
-from apps.carrinho.models import CarrinhoDeCompras, Produto
-from apps.pedidos.managers.managers_pedido import InformacaoEnvioManager
-from apps.pedidos.models import InformacaoEnvio
+from apps.carrinho.models import CarrinhoDeCompras, ItemCarrinho, Produto # noqa E501
+from apps.idempotencia.chaves import PARAMETRO_IDEMPOTENCIA, idempotente
+from apps.pedidos.api.serializers import PedidoSerializer
+from apps.pedidos.mais_vendidos import ranking_mais_vendidos
+from apps.pedidos.models import VendaDiaria
 from apps.perfil.models import Perfil
 
 
@@ -23,11 +35,74 @@ class ProdutoAPIView(APIView):
 
     @swagger_auto_schema(
         responses={200: ProdutoSerializer(many=True)},
+        manual_parameters=[
+            openapi.Parameter(
+                'ordenacao', openapi.IN_QUERY,
+                description="id, nome ou preco; prefixo '-' para decrescente", # noqa E501
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'tamanho', openapi.IN_QUERY,
+                description="Quantidade de produtos por página",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'cursor', openapi.IN_QUERY,
+                description="Cursor devolvido em next/previous",
+                type=openapi.TYPE_STRING
+            ),
+            PARAMETRO_STREAM,
+        ],
     )
     def get(self, request):
-        produtos = Produto.objects.all()
-        serializer = ProdutoSerializer(produtos, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if streaming_solicitado(request):
+            # O catálogo inteiro, sem paginação e fora do cache de páginas
+            return resposta_em_streaming(
+                request, Produto.objects.order_by('id'),
+                lambda lote: ProdutoSerializer(lote, many=True).data
+            )
+
+        # Cada página fica no cache sob a própria URL (ordenação, tamanho
+        # e cursor). Um acerto já traz o ETag: a resposta 304 sai sem
+        # consulta e sem serialização.
+        chave, resposta = cache_catalogo.procurar(
+            ('lista', request.build_absolute_uri())
+        )
+        if resposta is not None:
+            return resposta_condicional(
+                request,
+                (resposta.etag, resposta.ultima_alteracao),
+                lambda: Response(resposta.dados, status=status.HTTP_200_OK)
+            )
+
+        # Numa falha, a página é paginada só com as chaves e as marcas de
+        # versão; os produtos completos são lidos e serializados apenas se
+        # a resposta não for 304.
+        paginacao = PaginacaoPorChave()
+        with lendo_do_principal():
+            pagina = paginacao.paginate_queryset(
+                Produto.objects.only(*cache_catalogo.CAMPOS_VALIDADOR),
+                request, self
+            )
+        marcas = paginacao.get_paginated_response(
+            cache_catalogo.marcas(pagina)
+        ).data
+
+        def montar():
+            with lendo_do_principal():
+                produtos = Produto.objects.in_bulk([p.pk for p in pagina])
+            dados = {**marcas, 'results': [
+                dict(produto) for produto in ProdutoSerializer(
+                    [produtos[p.pk] for p in pagina if p.pk in produtos],
+                    many=True
+                ).data
+            ]}
+            resposta = cache_catalogo.guardar(chave, dados)
+            return Response(resposta.dados, status=status.HTTP_200_OK)
+
+        return resposta_condicional(
+            request, cache_catalogo.validador(marcas), montar
+        )
 
     @swagger_auto_schema(
         responses={201: ProdutoSerializer(many=False)},
@@ -101,10 +176,19 @@ class ProdutoDetailAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
+        def carregar():
             produto = Produto.objects.get(num_produto=produto_uuid)
-            serializer = ProdutoSerializer(produto)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return dict(ProdutoSerializer(produto).data)
+
+        try:
+            resposta = cache_catalogo.obter(
+                ('detalhe', produto_uuid), carregar
+            )
+            return resposta_condicional(
+                request,
+                (resposta.etag, resposta.ultima_alteracao),
+                lambda: Response(resposta.dados, status=status.HTTP_200_OK)
+            )
 
         except Produto.DoesNotExist:
             return Response(
@@ -204,6 +288,160 @@ class ProdutoDetailAPIView(APIView):
             )
 
 
+class ProdutoBuscaAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = ProdutoSerializer
+    http_method_names = ['get']
+    limite_padrao = 20
+    limite_maximo = 100
+
+    @swagger_auto_schema(
+        responses={200: ProdutoSerializer(many=True)},
+        operation_description="Busca textual em nome e descrição, por prefixo e sem acentos, ordenada por relevância.", # noqa E501
+        manual_parameters=[
+            openapi.Parameter(
+                'q', openapi.IN_QUERY,
+                description="Termo de busca (parcial ou completo)",
+                type=openapi.TYPE_STRING, required=True
+            ),
+            openapi.Parameter(
+                'limite', openapi.IN_QUERY,
+                description="Quantidade máxima de produtos (até 100)",
+                type=openapi.TYPE_INTEGER
+            ),
+        ],
+    )
+    def get(self, request):
+        termo = request.query_params.get('q', '').strip()
+        if not montar_consulta(termo):
+            return Response(
+                {'detail': 'Informe um termo de busca com ao menos duas letras.'}, # noqa E501
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limite = int(request.query_params.get('limite', self.limite_padrao)) # noqa E501
+        except ValueError:
+            return Response(
+                {"detail": "O limite deve ser um número inteiro."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if limite < 1:
+            return Response(
+                {"detail": "O limite deve ser maior que zero."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limite = min(limite, self.limite_maximo)
+
+        produtos = buscar_produtos(termo, limite)
+        serializer = ProdutoSerializer(produtos, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class ProdutoAutocompletarAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get']
+
+    @swagger_auto_schema(
+        responses={200: "Lista de {num_produto, nome, popularidade}."},
+        operation_description="Sugestões de nomes de produto para o que está sendo digitado, servidas do índice em memória.", # noqa E501
+        manual_parameters=[
+            openapi.Parameter(
+                'q', openapi.IN_QUERY,
+                description="Início de uma das palavras do nome",
+                type=openapi.TYPE_STRING, required=True
+            ),
+            openapi.Parameter(
+                'limite', openapi.IN_QUERY,
+                description="Quantidade máxima de sugestões",
+                type=openapi.TYPE_INTEGER
+            ),
+        ],
+    )
+    def get(self, request):
+        try:
+            limite = int(request.query_params.get('limite', 0)) or None
+        except ValueError:
+            limite = None
+        if limite is not None and limite < 1:
+            return Response(
+                {"detail": "O limite deve ser maior que zero."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        sugestoes = indice_autocompletar.sugerir(
+            request.query_params.get('q', ''), limite
+        )
+        return Response(sugestoes, status=status.HTTP_200_OK)
+
+
+class ProdutosMaisVendidosAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get']
+
+    @swagger_auto_schema(
+        responses={200: "Lista de {posicao, num_produto, nome_produto, quantidade}."}, # noqa E501
+        operation_description="Produtos mais vendidos, no geral ou em uma região, servidos do ranking em memória.", # noqa E501
+        manual_parameters=[
+            openapi.Parameter(
+                'regiao', openapi.IN_QUERY,
+                description="Número da região (1 a 5); sem ela, o ranking geral", # noqa E501
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'limite', openapi.IN_QUERY,
+                description="Quantidade máxima de produtos",
+                type=openapi.TYPE_INTEGER
+            ),
+        ],
+    )
+    def get(self, request):
+        try:
+            regiao = request.query_params.get('regiao')
+            regiao = None if regiao in (None, '') else int(regiao)
+            limite = request.query_params.get('limite')
+            limite = None if limite in (None, '') else int(limite)
+        except ValueError:
+            return Response(
+                {"detail": "Região e limite devem ser números inteiros."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if limite is not None and limite < 1:
+            return Response(
+                {"detail": "O limite deve ser maior que zero."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if regiao is not None and regiao not in dict(VendaDiaria.REGIAO_CHOICES): # noqa E501
+            return Response(
+                {"detail": "Região inválida."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # A lista de cada escopo já vem ordenada do ranking; o navegador e
+        # proxies podem reaproveitá-la por MAX_AGE segundos
+        resposta = Response(
+            ranking_mais_vendidos.mais_vendidos(regiao, limite),
+            status=status.HTTP_200_OK
+        )
+        patch_cache_control(
+            resposta, private=True,
+            max_age=ranking_mais_vendidos.configuracao()['MAX_AGE']
+        )
+        return resposta
+
+
+class CacheCatalogoAPIView(APIView):
+    permission_classes = [IsAdminUser]
+    http_method_names = ['get']
+
+    @swagger_auto_schema(
+        responses={200: "Métricas do cache de respostas do catálogo."},
+        operation_description="Acertos, falhas e despejos do cache do catálogo neste processo." # noqa E501
+    )
+    def get(self, request):
+        return Response(cache_catalogo.metricas(), status=status.HTTP_200_OK)
+
+
 class ProdutoFilterListAPIView(ListAPIView):
     queryset = Produto.objects.all()
     serializer_class = ProdutoSerializer
@@ -241,20 +479,29 @@ class CarrinhoAPIView(APIView):
     def get(self, request):
         try:
             cliente = Perfil.objects.get(usuario=request.user)
-
-            # Usando o CarrinhoManager para buscar carrinhos
+            carrinho_manager = CarrinhoManager()
             carrinhos = CarrinhoDeCompras.objects.filter(
                 cliente=cliente, status='A'
             )
 
-            if not carrinhos.exists():
+            # O validador vem de uma consulta de agregação; linhas e
+            # serialização só são carregadas se a resposta não for 304.
+            validador = carrinho_manager.validador_carrinhos(carrinhos)
+            if validador is None:
                 return Response(
                     {"detail": "Nenhum carrinho ativo encontrado."},
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            serializer = self.serializer_class(carrinhos, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            def montar():
+                serializer = self.serializer_class(
+                    carrinho_manager.com_linhas(carrinhos), many=True
+                )
+                return Response(serializer.data, status=status.HTTP_200_OK)
+
+            resposta = resposta_condicional(request, validador, montar)
+            patch_cache_control(resposta, private=True, no_cache=True)
+            return resposta
 
         except Perfil.DoesNotExist:
             return Response(
@@ -296,14 +543,25 @@ class CarrinhoComprasAPIView(APIView):
     http_method_names = ['post',]
 
     @swagger_auto_schema(
-        responses={201: CarrinhoDeComprasSerializer(many=False)}
+        responses={201: CarrinhoDeComprasSerializer(many=False)},
+        manual_parameters=[PARAMETRO_IDEMPOTENCIA]
     )
+    @idempotente
     def post(self, request, num_produto, quantidade):
+        # Orçamento fixo de consultas, qualquer que seja o tamanho do
+        # carrinho (travado em testes com assertNumQueries):
+        #   leituras: 1) carrinho ativo + frete + UF do cliente, 2) produto,
+        #             3) linhas do carrinho para montar a resposta;
+        #   escritas, em uma transação: estoque, linha e uma única gravação
+        #             do carrinho (totais e frete juntos).
+        # O frete vem da tabela em memória do resolvedor_frete.
         try:
             carrinho_manager = CarrinhoManager()
 
-            # Obtém o carrinho ativo
-            carrinho = carrinho_manager.get_carrinho_ativo(request.user.perfil)
+            # Obtém o carrinho ativo (o id do perfil é o id do usuário)
+            carrinho = carrinho_manager.get_carrinho_para_compra(
+                request.user.pk
+            )
             if not carrinho:
                 return Response(
                     {"detail": "Carrinho ativo não encontrado."},
@@ -319,10 +577,20 @@ class CarrinhoComprasAPIView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Adiciona o produto ao carrinho
+            # Rejeita cedo pedidos que o estoque lido já não comporta; a
+            # garantia definitiva é o decremento condicional no banco.
+            if produto.estoque < quantidade:
+                return Response(
+                    {"detail": f"Estoque insuficiente para o produto '{produto.nome}'."}, # noqa E501
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # Estoque, linha e totais (já com o frete) são gravados na mesma
+            # transação: se qualquer etapa falhar, nada é persistido.
             try:
+                frete = carrinho_manager.resolver_frete(carrinho)
                 carrinho = carrinho_manager.add_produto_carrinho(
-                    carrinho, produto, quantidade
+                    carrinho, produto, quantidade, frete
                 )
             except ValueError as e:
                 return Response(
@@ -330,65 +598,105 @@ class CarrinhoComprasAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Determina o frete automaticamente com base na região do cliente
-            try:
-                perfil = request.user.perfil
-                endereco = perfil.enderecos.first()
-                if not endereco or not endereco.estado:
-                    return Response(
-                        {"detail": "Endereço ou estado do cliente não encontrado."}, # noqa E501
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+            return Response(
+                {
+                    "detail": "Produto adicionado ao carrinho com sucesso.",
+                    "carrinho": {
+                        "id": carrinho.id,
+                        "itens": carrinho.itens,
+                        "frete": carrinho.frete.custo_envio if carrinho.frete else 0.0, # noqa E501
+                        "total": carrinho.total,
+                    }
+                },
+                status=status.HTTP_200_OK,
+            )
 
-                # Obter o número da região com base no estado
-                manager = InformacaoEnvioManager()
-                regiao_por_estado = manager.get_regiao_por_estado()
-                estado_cliente = endereco.estado.upper()
+        except DatabaseError:
+            raise
+        except Exception as e:
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-                num_regiao_envio = regiao_por_estado.get(estado_cliente)
-                if not num_regiao_envio:
-                    return Response(
-                        {"detail": f"Estado '{estado_cliente}' não mapeado para nenhuma região."}, # noqa E501
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
 
-                # Obter a informação de envio com base na região
-                frete = InformacaoEnvio.objects.filter(
-                    num_regiao_envio=num_regiao_envio
-                ).first()
-                if not frete:
-                    return Response(
-                        {"detail": f"Não há informações de envio disponíveis para a região {num_regiao_envio}."}, # noqa E501
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+class CarrinhoComprasLoteAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = AdicaoEmLoteSerializer
+    http_method_names = ['post',]
+
+    @swagger_auto_schema(
+        request_body=AdicaoEmLoteSerializer,
+        responses={200: "Resultado da adição de cada produto ao carrinho."},
+        operation_description="Adiciona vários produtos ao carrinho ativo em uma única requisição. Com 'tudo_ou_nada', qualquer falha desfaz o lote inteiro.", # noqa E501
+        manual_parameters=[PARAMETRO_IDEMPOTENCIA]
+    )
+    @idempotente
+    def post(self, request):
+        serializer = AdicaoEmLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Produtos repetidos no lote são somados em uma única linha
+        quantidades = {}
+        for item in serializer.validated_data['itens']:
+            num_produto = item['num_produto']
+            quantidades[num_produto] = (
+                quantidades.get(num_produto, 0) + item['quantidade']
+            )
+
+        try:
+            carrinho_manager = CarrinhoManager()
 
-                # Atribuir o frete ao carrinho
-                carrinho_manager.atribuir_frete(carrinho, frete.id)
+            carrinho = carrinho_manager.get_carrinho_para_compra(
+                request.user.pk
+            )
+            if not carrinho:
+                return Response(
+                    {"detail": "Carrinho ativo não encontrado."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
 
-            except Exception as e:
+            # O frete é resolvido uma única vez para o lote todo
+            try:
+                frete = carrinho_manager.resolver_frete(carrinho)
+            except ValueError as e:
                 return Response(
-                    {"detail": f"Erro ao determinar frete: {str(e)}"},
+                    {"detail": str(e)},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Calcula o total com o frete
-            total_com_frete = carrinho_manager.calcular_total_com_frete(
-                carrinho
+            resultados = carrinho_manager.add_produtos_carrinho(
+                carrinho, quantidades, frete,
+                tudo_ou_nada=serializer.validated_data['tudo_ou_nada']
             )
+            adicionados = sum(
+                1 for resultado in resultados if resultado['adicionado']
+            )
+            if not adicionados:
+                return Response(
+                    {
+                        "detail": "Nenhum produto foi adicionado ao carrinho.", # noqa E501
+                        "resultados": resultados,
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
             return Response(
                 {
-                    "detail": "Produto adicionado ao carrinho com sucesso.",
+                    "detail": f"{adicionados} de {len(resultados)} produtos adicionados ao carrinho.", # noqa E501
+                    "resultados": resultados,
                     "carrinho": {
                         "id": carrinho.id,
                         "itens": carrinho.itens,
                         "frete": carrinho.frete.custo_envio if carrinho.frete else 0.0, # noqa E501
-                        "total": total_com_frete,
+                        "total": carrinho.total,
                     }
                 },
                 status=status.HTTP_200_OK,
             )
 
+        except DatabaseError:
+            raise
         except Exception as e:
             return Response(
                 {"detail": str(e)},
@@ -403,9 +711,28 @@ class RemoveCarrinhoComprasAPIView(APIView):
 
     @swagger_auto_schema(
         responses={200: "Item removido e atualizado no carrinho com sucesso."},
-        operation_description="Remove um item do carrinho, decrementa sua quantidade e atualiza o estoque do produto." # noqa E501
+        operation_description="Remove um item do carrinho pelo UUID do produto, decrementa sua quantidade (?quantidade=, padrão 1) e devolve ao estoque. A rota por nome é mantida por compatibilidade.", # noqa E501
+        manual_parameters=[
+            openapi.Parameter(
+                'quantidade', openapi.IN_QUERY,
+                description="Quantidade a remover (padrão 1)",
+                type=openapi.TYPE_INTEGER
+            ),
+            PARAMETRO_IDEMPOTENCIA,
+        ],
     )
-    def delete(self, request, nome=None, quantidade=1):
+    @idempotente
+    def delete(self, request, num_produto=None, nome=None):
+        try:
+            quantidade = int(request.query_params.get('quantidade', 1))
+        except ValueError:
+            quantidade = 0
+        if quantidade < 1:
+            return Response(
+                {"detail": "A quantidade deve ser maior que zero."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
             carrinho_manager = CarrinhoManager()
 
@@ -417,53 +744,126 @@ class RemoveCarrinhoComprasAPIView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Verifica se o produto existe no carrinho pelo nome
-            itens = carrinho.itens
-            produto_key = None
-
-            for key, item in itens.items():
-                if item.get('nome') == nome:
-                    produto_key = key
-                    break
+            identificacao = num_produto
+            if num_produto is None:
+                # Rota legada por nome: só vale se o nome for único no
+                # carrinho.
+                encontrados = list(ItemCarrinho.objects.filter(
+                    carrinho=carrinho, produto__nome=nome
+                ).values_list('produto__num_produto', flat=True)[:2])
+                if len(encontrados) > 1:
+                    return Response(
+                        {"detail": f"Há mais de um produto '{nome}' no carrinho; remova pelo UUID."}, # noqa E501
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                num_produto = encontrados[0] if encontrados else None
+                identificacao = nome
 
-            if not produto_key:
-                return Response(
-                    {"detail": f"Produto '{nome}' não encontrado no carrinho."}, # noqa E501
-                    status=status.HTTP_404_NOT_FOUND
+            resultado = None
+            if num_produto is not None:
+                resultado, = carrinho_manager.remover_produtos_carrinho(
+                    carrinho, {num_produto: quantidade}
                 )
-
-            try:
-                produto = Produto.objects.get(num_produto=produto_key)
-            except Produto.DoesNotExist:
+            if not resultado or not resultado['removido']:
                 return Response(
-                    {"detail": "Produto não encontrado no banco de dados."},
+                    {"detail": f"Produto '{identificacao}' não encontrado no carrinho."}, # noqa E501
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Decrementa a quantidade no carrinho
-            quantidade_removida = min(
-                quantidade, itens[produto_key]['quantidade']
+            return Response(
+                {
+                    "detail": f"Item '{identificacao}' removido e atualizado no carrinho com sucesso.", # noqa E501
+                    "removido": resultado['removido'],
+                    "carrinho": {
+                        "id": carrinho.id,
+                        "subtotal": carrinho.subtotal,
+                        "quantidade_itens": carrinho.quantidade_itens,
+                        "total": carrinho.total,
+                    },
+                },
+                status=status.HTTP_200_OK
+            )
+
+        except DatabaseError:
+            raise
+        except Exception as e:
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            produto.estoque += quantidade_removida
-            produto.save()
 
-            itens[produto_key]['quantidade'] -= quantidade_removida
-            itens[produto_key]['subtotal'] = itens[produto_key]['quantidade'] * produto.preco # noqa E501
 
-            # Remove o item se a quantidade for zero
-            if itens[produto_key]['quantidade'] <= 0:
-                del itens[produto_key]
+class RemoveCarrinhoComprasLoteAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = RemocaoEmLoteSerializer
+    http_method_names = ['post',]
 
-            # Atualiza o carrinho
-            carrinho.itens = itens
-            carrinho.total = sum(item['subtotal'] for item in itens.values())
-            carrinho.save()
+    @swagger_auto_schema(
+        request_body=RemocaoEmLoteSerializer,
+        responses={200: "Resultado da remoção de cada produto do carrinho."},
+        operation_description="Remove vários produtos do carrinho ativo em uma única requisição. Sem 'quantidade', a linha sai inteira.", # noqa E501
+        manual_parameters=[PARAMETRO_IDEMPOTENCIA]
+    )
+    @idempotente
+    def post(self, request):
+        serializer = RemocaoEmLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Produtos repetidos no lote são somados; um item sem quantidade
+        # remove a linha inteira.
+        quantidades = {}
+        for item in serializer.validated_data['itens']:
+            num_produto = item['num_produto']
+            if item['quantidade'] is None or (
+                num_produto in quantidades and quantidades[num_produto] is None # noqa E501
+            ):
+                quantidades[num_produto] = None
+            else:
+                quantidades[num_produto] = (
+                    quantidades.get(num_produto, 0) + item['quantidade']
+                )
+
+        try:
+            carrinho_manager = CarrinhoManager()
+
+            carrinho = carrinho_manager.get_carrinho_ativo(request.user.perfil)
+            if not carrinho:
+                return Response(
+                    {"detail": "Carrinho ativo não encontrado."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            resultados = carrinho_manager.remover_produtos_carrinho(
+                carrinho, quantidades
+            )
+            removidos = sum(
+                1 for resultado in resultados if resultado['removido']
+            )
+            if not removidos:
+                return Response(
+                    {
+                        "detail": "Nenhum produto foi removido do carrinho.", # noqa E501
+                        "resultados": resultados,
+                    },
+                    status=status.HTTP_404_NOT_FOUND
+                )
 
             return Response(
-                {"detail": f"Item '{nome}' removido e atualizado no carrinho com sucesso."}, # noqa E501
-                status=status.HTTP_200_OK
+                {
+                    "detail": f"{removidos} de {len(resultados)} produtos removidos do carrinho.", # noqa E501
+                    "resultados": resultados,
+                    "carrinho": {
+                        "id": carrinho.id,
+                        "subtotal": carrinho.subtotal,
+                        "quantidade_itens": carrinho.quantidade_itens,
+                        "total": carrinho.total,
+                    },
+                },
+                status=status.HTTP_200_OK,
             )
 
+        except DatabaseError:
+            raise
         except Exception as e:
             return Response(
                 {"detail": str(e)},
@@ -500,6 +900,18 @@ class AtualizarStatusCarrinhoAPIView(APIView):
                     {"detail": "É necessário fornecer o novo status."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            if novo_status not in CarrinhoDeCompras.StatusCarrinho.values:
+                return Response(
+                    {"detail": f"Status inválido. Use um de: {', '.join(CarrinhoDeCompras.StatusCarrinho.values)}."}, # noqa E501
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # Finalizar cria o pedido e libera o estoque reservado; só o
+            # checkout faz isso
+            if novo_status == CarrinhoDeCompras.StatusCarrinho.FINALIZADO:
+                return Response(
+                    {"detail": "Para finalizar o carrinho, use o checkout (POST carrinhos/finalizar/)."}, # noqa E501
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
             # Atualiza o status do carrinho
             carrinho.status = novo_status
@@ -523,6 +935,45 @@ class AtualizarStatusCarrinhoAPIView(APIView):
             )
 
 
+class FinalizarCompraAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = PedidoSerializer
+    http_method_names = ['post']
+
+    @swagger_auto_schema(
+        responses={201: PedidoSerializer(many=False)},
+        operation_description="Finaliza o carrinho ativo: cria o pedido com uma linha de detalhe por item do carrinho e marca o carrinho como finalizado, em uma única transação.", # noqa E501
+        manual_parameters=[PARAMETRO_IDEMPOTENCIA]
+    )
+    @idempotente
+    def post(self, request):
+        # Comandos fixos, qualquer que seja o número de linhas: carrinho +
+        # frete + UF em uma leitura; o número do pedido sai do bloco em
+        # memória do alocador; na transação, a troca de status do carrinho,
+        # a leitura das linhas, o INSERT do pedido, um bulk_create dos
+        # detalhes, o UPDATE do resumo do cliente e o upsert das vendas
+        # diárias.
+        carrinho_manager = CarrinhoManager()
+        carrinho = carrinho_manager.get_carrinho_para_compra(request.user.pk)
+        if not carrinho:
+            return Response(
+                {"detail": "Carrinho ativo não encontrado."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            pedido = carrinho_manager.finalizar_compra(carrinho)
+        except ValueError as e:
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            PedidoSerializer(pedido).data, status=status.HTTP_201_CREATED
+        )
+
+
 class ListarCarrinhosFinalizadosAPIView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = CarrinhoDeComprasSerializer
@@ -534,9 +985,11 @@ class ListarCarrinhosFinalizadosAPIView(APIView):
     )
     def get(self, request):
         try:
-            carrinhos = CarrinhoDeCompras.objects.filter(
-                cliente=request.user.perfil,
-                status=CarrinhoDeCompras.StatusCarrinho.FINALIZADO
+            carrinhos = CarrinhoManager().com_linhas(
+                CarrinhoDeCompras.objects.filter(
+                    cliente=request.user.perfil,
+                    status=CarrinhoDeCompras.StatusCarrinho.FINALIZADO
+                )
             )
 
             # Valida se há carrinhos finalizados
@@ -555,3 +1008,191 @@ class ListarCarrinhosFinalizadosAPIView(APIView):
                 {"detail": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+
+class ProdutoAsyncAPIView(APIViewAssincrona):
+    permission_classes = [IsAuthenticated]
+    serializer_class = ProdutoSerializer
+    http_method_names = ['get']
+
+    @swagger_auto_schema(
+        responses={200: ProdutoSerializer(many=True)},
+        operation_description="Variante assíncrona (ORM assíncrono) da listagem de produtos, sem o modo streaming.", # noqa E501
+        manual_parameters=[
+            openapi.Parameter(
+                'ordenacao', openapi.IN_QUERY,
+                description="id, nome ou preco; prefixo '-' para decrescente", # noqa E501
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'tamanho', openapi.IN_QUERY,
+                description="Quantidade de produtos por página",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'cursor', openapi.IN_QUERY,
+                description="Cursor devolvido em next/previous",
+                type=openapi.TYPE_STRING
+            ),
+        ],
+    )
+    async def get(self, request):
+        # Mesmo cache de páginas da view síncrona; um acerto não sai do
+        # event loop
+        chave, resposta = await cache_catalogo.aprocurar(
+            ('lista', request.build_absolute_uri())
+        )
+        if resposta is not None:
+            return resposta_condicional(
+                request,
+                (resposta.etag, resposta.ultima_alteracao),
+                lambda: Response(resposta.dados, status=status.HTTP_200_OK)
+            )
+
+        # Como na view síncrona: validador pela consulta leve, corpo só
+        # quando a resposta não for 304
+        paginacao = PaginacaoPorChave()
+        with lendo_do_principal():
+            pagina = await paginacao.apaginate_queryset(
+                Produto.objects.only(*cache_catalogo.CAMPOS_VALIDADOR),
+                request, self
+            )
+        marcas = paginacao.get_paginated_response(
+            cache_catalogo.marcas(pagina)
+        ).data
+
+        async def montar():
+            with lendo_do_principal():
+                produtos = await Produto.objects.ain_bulk(
+                    [p.pk for p in pagina]
+                )
+            dados = {**marcas, 'results': [
+                dict(produto) for produto in ProdutoSerializer(
+                    [produtos[p.pk] for p in pagina if p.pk in produtos],
+                    many=True
+                ).data
+            ]}
+            resposta = cache_catalogo.guardar(chave, dados)
+            return Response(resposta.dados, status=status.HTTP_200_OK)
+
+        return await aresposta_condicional(
+            request, cache_catalogo.validador(marcas), montar
+        )
+
+
+class ProdutoDetailAsyncAPIView(APIViewAssincrona):
+    permission_classes = [IsAuthenticated]
+    serializer_class = ProdutoSerializer
+    http_method_names = ['get']
+
+    @swagger_auto_schema(
+        responses={200: ProdutoSerializer(many=False)},
+        operation_description="Variante assíncrona (ORM assíncrono) do detalhe de produto.", # noqa E501
+        manual_parameters=[
+            openapi.Parameter(
+                'UUID', openapi.IN_PATH,
+                description="UUID do produto",
+                type=openapi.TYPE_STRING
+            )
+        ],
+    )
+    async def get(self, request, *args, **kwargs):
+        produto_uuid = kwargs.get('UUID')
+
+        async def carregar():
+            produto = await Produto.objects.aget(num_produto=produto_uuid)
+            return dict(ProdutoSerializer(produto).data)
+
+        try:
+            resposta = await cache_catalogo.aobter(
+                ('detalhe', produto_uuid), carregar
+            )
+            return resposta_condicional(
+                request,
+                (resposta.etag, resposta.ultima_alteracao),
+                lambda: Response(resposta.dados, status=status.HTTP_200_OK)
+            )
+
+        except Produto.DoesNotExist:
+            return Response(
+                {'detail': 'Produto não encontrado.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {'detail': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+class CarrinhoAsyncAPIView(APIViewAssincrona):
+    permission_classes = [IsAuthenticated]
+    serializer_class = CarrinhoDeComprasSerializer
+    http_method_names = ['get']
+
+    @swagger_auto_schema(
+        responses={200: CarrinhoDeComprasSerializer(many=True)},
+        operation_description="Variante assíncrona (ORM assíncrono) do carrinho ativo.", # noqa E501
+    )
+    async def get(self, request):
+        try:
+            cliente = await Perfil.objects.aget(usuario=request.user)
+        except Perfil.DoesNotExist:
+            return Response(
+                {"detail": "Perfil do cliente não encontrado."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        carrinho_manager = CarrinhoManager()
+        carrinhos = CarrinhoDeCompras.objects.filter(
+            cliente=cliente, status=CarrinhoDeCompras.StatusCarrinho.ATIVO
+        )
+        validador = await carrinho_manager.avalidador_carrinhos(carrinhos)
+        if validador is None:
+            return Response(
+                {"detail": "Nenhum carrinho ativo encontrado."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        async def montar():
+            # Frete e linhas vêm junto (select/prefetch): serializar
+            # `itens` não consulta o banco fora do ORM assíncrono
+            linhas = [
+                carrinho async for carrinho in
+                carrinho_manager.com_linhas(carrinhos)
+            ]
+            serializer = self.serializer_class(linhas, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        resposta = await aresposta_condicional(request, validador, montar)
+        patch_cache_control(resposta, private=True, no_cache=True)
+        return resposta
+
+
+class ListarCarrinhosFinalizadosAsyncAPIView(APIViewAssincrona):
+    permission_classes = [IsAuthenticated]
+    serializer_class = CarrinhoDeComprasSerializer
+    http_method_names = ['get']
+
+    @swagger_auto_schema(
+        responses={200: CarrinhoDeComprasSerializer(many=True)},
+        operation_description="Variante assíncrona (ORM assíncrono) da lista de carrinhos finalizados." # noqa E501
+    )
+    async def get(self, request):
+        # O perfil tem o id do usuário como chave primária
+        carrinhos = [
+            carrinho async for carrinho in CarrinhoManager().com_linhas(
+                CarrinhoDeCompras.objects.filter(
+                    cliente_id=request.user.pk,
+                    status=CarrinhoDeCompras.StatusCarrinho.FINALIZADO
+                )
+            )
+        ]
+        if not carrinhos:
+            return Response(
+                {"detail": "Nenhum carrinho finalizado encontrado."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        serializer = self.serializer_class(carrinhos, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CarrinhoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.carrinho'
+
+    def ready(self):
+        from apps.carrinho import signals  # noqa F401
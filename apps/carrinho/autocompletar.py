@@ -0,0 +1,343 @@
+import heapq
+import logging
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CONFIGURACAO_PADRAO = {
+    'MAX_RESULTADOS': 10,
+    # Prefixos até este tamanho têm o top-k pré-calculado; os mais longos
+    # são resolvidos varrendo a faixa ordenada, e o resultado de faixas com
+    # mais de FAIXA_EM_CACHE chaves fica guardado até a próxima mudança.
+    'PROFUNDIDADE_PRECALCULADA': 3,
+    'FAIXA_EM_CACHE': 64,
+    'PREFIXOS_EM_CACHE': 1024,
+    'MEMORIA_MAXIMA_MB': 64,
+    'INTERVALO_VERIFICACAO': 1.0,
+    'CONSTRUIR_NA_INICIALIZACAO': True,
+}
+
+# Custo aproximado, em bytes, de uma chave na lista ordenada e no mapa de
+# produtos (tupla, inteiros, referências), além das próprias strings.
+CUSTO_FIXO_CHAVE = 120
+CUSTO_FIXO_PRODUTO = 260
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços simples: 'Café  Moído' -> 'cafe moido'.""" # noqa E501
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acentos = ''.join(
+        c for c in decomposto if not unicodedata.combining(c)
+    )
+    return ' '.join(sem_acentos.casefold().split())
+
+
+def inicios_de_palavra(nome_normalizado):
+    # Cada palavra do nome abre uma chave, para que "alg" encontre
+    # "Camiseta Algodão".
+    palavras = nome_normalizado.split(' ')
+    return [' '.join(palavras[i:]) for i in range(len(palavras))]
+
+
+class IndiceAutocompletar:
+    """
+    Índice em memória de nomes de produto para autocompletar.
+
+    As chaves (nome normalizado a partir de cada palavra, id) ficam em uma
+    lista ordenada: um prefixo corresponde a uma faixa contígua achada por
+    busca binária. Para prefixos curtos, cuja faixa cobre boa parte do
+    catálogo, o top-k por popularidade é mantido pronto; nos demais a faixa
+    é varrida, e o resultado de faixas grandes fica num cache pequeno.
+
+    O índice é montado com uma consulta e atualizado incrementalmente pelos
+    sinais de Produto neste processo. O comando reconstruir_autocompletar
+    publica uma nova versão no cache do Django, que os demais processos
+    percebem em até INTERVALO_VERIFICACAO segundos.
+    """
+
+    CHAVE_VERSAO = 'carrinho:autocompletar:versao'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._construido = False
+        self._versao = None
+        self._verificado_em = 0.0
+        self._chaves = []
+        self._produtos = {}
+        self._topo = {}
+        self._cache_prefixos = {}
+        self._memoria = 0
+        self.consultas = 0
+        self.reconstrucoes = 0
+        self.descartados = 0
+        self.truncado = False
+
+    def configuracao(self):
+        return {
+            **CONFIGURACAO_PADRAO,
+            **getattr(settings, 'AUTOCOMPLETAR', {}),
+        }
+
+    def sugerir(self, prefixo, limite=None):
+        """
+        Até `limite` produtos cujo nome tem uma palavra começando por
+        `prefixo`, do mais para o menos popular.
+        """
+        config = self.configuracao()
+        # Entre 1 e MAX_RESULTADOS: um limite negativo viraria ids[:-n]
+        limite = max(1, min(limite or config['MAX_RESULTADOS'], config['MAX_RESULTADOS'])) # noqa E501
+        chave = normalizar(prefixo)
+        if not chave:
+            return []
+
+        self._garantir_atual(config)
+        with self._lock:
+            self.consultas += 1
+            if len(chave) <= config['PROFUNDIDADE_PRECALCULADA']:
+                ids = self._topo.get(chave, [])
+            else:
+                ids = self._melhores_da_faixa(chave, config)
+            return [
+                self._sugestao(produto_id) for produto_id in ids[:limite]
+            ]
+
+    def construir(self):
+        """Remonta o índice inteiro a partir do banco."""
+        from django.db.models import Sum
+        from django.db.models.functions import Coalesce
+        from apps.carrinho.models import Produto
+
+        config = self.configuracao()
+        versao = cache.get(self.CHAVE_VERSAO, 0)
+        linhas = Produto.objects.annotate(
+            popularidade=Coalesce(Sum('itens_carrinho__quantidade'), 0)
+        ).values_list('id', 'num_produto', 'nome', 'popularidade')
+
+        # Com orçamento de memória estourado, ficam os mais populares
+        linhas = sorted(linhas, key=lambda linha: -linha[3])
+        orcamento = config['MEMORIA_MAXIMA_MB'] * 1024 * 1024
+
+        chaves, produtos, memoria, descartados = [], {}, 0, 0
+        for produto_id, num_produto, nome, popularidade in linhas:
+            normalizado = normalizar(nome)
+            novas = inicios_de_palavra(normalizado)
+            custo = self._custo(nome, novas)
+            if memoria + custo > orcamento:
+                descartados += 1
+                continue
+            memoria += custo
+            produtos[produto_id] = (nome, str(num_produto), popularidade, normalizado) # noqa E501
+            chaves.extend((chave, produto_id) for chave in novas)
+        chaves.sort()
+
+        with self._lock:
+            self._chaves = chaves
+            self._produtos = produtos
+            self._memoria = memoria
+            self.descartados = descartados
+            self.truncado = descartados > 0
+            self._recalcular_topo(config)
+            self._cache_prefixos = {}
+            self._versao = versao
+            self._verificado_em = time.monotonic()
+            self._construido = True
+            self.reconstrucoes += 1
+
+        if descartados:
+            logger.warning(
+                "Autocompletar: orçamento de %s MB atingido, %s produtos menos populares ficaram fora do índice.", # noqa E501
+                config['MEMORIA_MAXIMA_MB'], descartados
+            )
+
+    def atualizar(self, produto):
+        """Inclui ou reindexa um produto salvo, mantendo a popularidade."""
+        with self._lock:
+            if not self._construido:
+                return
+            config = self.configuracao()
+            anterior = self._produtos.get(produto.pk)
+            popularidade = anterior[2] if anterior else 0
+            prefixos = self._prefixos(anterior[3], config) if anterior else set() # noqa E501
+            if anterior:
+                self._retirar(produto.pk)
+
+            normalizado = normalizar(produto.nome)
+            novas = inicios_de_palavra(normalizado)
+            custo = self._custo(produto.nome, novas)
+            if self._memoria + custo > config['MEMORIA_MAXIMA_MB'] * 1024 * 1024: # noqa E501
+                self.descartados += 1
+                self.truncado = True
+            else:
+                self._memoria += custo
+                self._produtos[produto.pk] = (
+                    produto.nome, str(produto.num_produto), popularidade,
+                    normalizado
+                )
+                for chave in novas:
+                    insort(self._chaves, (chave, produto.pk))
+                prefixos |= self._prefixos(normalizado, config)
+            self._ajustar_topo(prefixos, produto.pk, config)
+
+    def remover(self, produto_id):
+        with self._lock:
+            if not self._construido or produto_id not in self._produtos:
+                return
+            config = self.configuracao()
+            prefixos = self._prefixos(self._produtos[produto_id][3], config)
+            self._retirar(produto_id)
+            self._ajustar_topo(prefixos, produto_id, config)
+
+    def invalidar(self):
+        """Pede a reconstrução em todos os processos."""
+        try:
+            cache.incr(self.CHAVE_VERSAO)
+        except ValueError:
+            cache.set(self.CHAVE_VERSAO, 1, timeout=None)
+        self._verificado_em = 0.0
+
+    def metricas(self):
+        return {
+            'construido': self._construido,
+            'produtos': len(self._produtos),
+            'chaves': len(self._chaves),
+            'prefixos_precalculados': len(self._topo),
+            'memoria_estimada_mb': round(self._memoria / 1024 / 1024, 2),
+            'truncado': self.truncado,
+            'descartados': self.descartados,
+            'consultas': self.consultas,
+            'reconstrucoes': self.reconstrucoes,
+            'versao': self._versao,
+        }
+
+    def _garantir_atual(self, config):
+        agora = time.monotonic()
+        if self._construido and (
+            agora - self._verificado_em < config['INTERVALO_VERIFICACAO']
+        ):
+            return
+        self._verificado_em = agora
+        if not self._construido or (
+            cache.get(self.CHAVE_VERSAO, 0) != self._versao
+        ):
+            self.construir()
+
+    @staticmethod
+    def _custo(nome, chaves):
+        return (
+            CUSTO_FIXO_PRODUTO + sys.getsizeof(nome)
+            + sum(CUSTO_FIXO_CHAVE + sys.getsizeof(chave) for chave in chaves) # noqa E501
+        )
+
+    def _ordem(self, produto_id):
+        nome, _, popularidade, normalizado = self._produtos[produto_id]
+        return (-popularidade, normalizado, produto_id)
+
+    def _sugestao(self, produto_id):
+        nome, num_produto, popularidade, _ = self._produtos[produto_id]
+        return {
+            'num_produto': num_produto,
+            'nome': nome,
+            'popularidade': popularidade,
+        }
+
+    def _faixa(self, prefixo):
+        inicio = bisect_left(self._chaves, (prefixo,))
+        fim = bisect_left(self._chaves, (prefixo + '\U0010ffff',), inicio)
+        return inicio, fim
+
+    def _melhores(self, ids, k):
+        return heapq.nsmallest(k, set(ids), key=self._ordem)
+
+    def _melhores_da_faixa(self, prefixo, config):
+        em_cache = self._cache_prefixos.get(prefixo)
+        if em_cache is not None:
+            return em_cache
+
+        inicio, fim = self._faixa(prefixo)
+        ids = self._melhores(
+            (produto_id for _, produto_id in self._chaves[inicio:fim]),
+            config['MAX_RESULTADOS']
+        )
+        # Só faixas grandes valem a entrada no cache
+        if fim - inicio > config['FAIXA_EM_CACHE']:
+            if len(self._cache_prefixos) >= config['PREFIXOS_EM_CACHE']:
+                self._cache_prefixos.pop(next(iter(self._cache_prefixos)))
+            self._cache_prefixos[prefixo] = ids
+        return ids
+
+    def _recalcular_topo(self, config):
+        # Percorre os produtos do mais para o menos popular: os primeiros k
+        # distintos que chegam a cada prefixo curto são o top-k dele.
+        k = config['MAX_RESULTADOS']
+        topo = {}
+        for produto_id in sorted(self._produtos, key=self._ordem):
+            for prefixo in self._prefixos(self._produtos[produto_id][3], config): # noqa E501
+                ids = topo.setdefault(prefixo, [])
+                if len(ids) < k:
+                    ids.append(produto_id)
+        self._topo = topo
+
+    def _prefixos(self, normalizado, config):
+        profundidade = config['PROFUNDIDADE_PRECALCULADA']
+        return {
+            chave[:tamanho]
+            for chave in inicios_de_palavra(normalizado)
+            for tamanho in range(1, min(len(chave), profundidade) + 1)
+        }
+
+    def _ajustar_topo(self, prefixos, produto_id, config):
+        # Ajusta o top-k dos prefixos curtos tocados por uma mudança. Só é
+        # preciso varrer a faixa quando o produto estava num top-k cheio:
+        # fora dele pode haver um substituto que a lista não conhece.
+        k = config['MAX_RESULTADOS']
+        for prefixo in prefixos:
+            ids = self._topo.get(prefixo, [])
+            if produto_id in ids and len(ids) >= k:
+                inicio, fim = self._faixa(prefixo)
+                ids = self._melhores(
+                    (i for _, i in self._chaves[inicio:fim]), k
+                )
+            else:
+                ids = [i for i in ids if i != produto_id]
+                indexado = self._produtos.get(produto_id)
+                if indexado and prefixo in self._prefixos(indexado[3], config): # noqa E501
+                    ids = sorted([*ids, produto_id], key=self._ordem)[:k]
+            if ids:
+                self._topo[prefixo] = ids
+            else:
+                self._topo.pop(prefixo, None)
+        self._cache_prefixos = {}
+
+    def _retirar(self, produto_id):
+        nome, _, _, normalizado = self._produtos.pop(produto_id)
+        chaves = inicios_de_palavra(normalizado)
+        self._memoria -= self._custo(nome, chaves)
+        for chave in chaves:
+            posicao = bisect_left(self._chaves, (chave, produto_id))
+            if posicao < len(self._chaves) and self._chaves[posicao] == (chave, produto_id): # noqa E501
+                del self._chaves[posicao]
+
+
+indice_autocompletar = IndiceAutocompletar()
+
+
+def aquecer():
+    """
+    Monta o índice na inicialização do servidor (wsgi/asgi), para que a
+    primeira digitação não pague a construção. Falhas de banco (por
+    exemplo, migrações pendentes) só adiam a montagem para o primeiro uso.
+    """
+    from django.db import DatabaseError
+
+    if not indice_autocompletar.configuracao()['CONSTRUIR_NA_INICIALIZACAO']:
+        return
+    try:
+        indice_autocompletar.construir()
+    except DatabaseError:
+        logger.exception("Autocompletar: índice não montado na inicialização.") # noqa E501
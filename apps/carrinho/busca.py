@@ -0,0 +1,111 @@
+import re
+from django.db import connection
+from django.db.models import Q
+
+TABELA_BUSCA = 'carrinho_produto_busca'
+
+# Mesmo esquema da migração 0010, idempotente: o comando de reconstrução
+# o reaplica porque uma migração futura que recrie carrinho_produto (o
+# SQLite faz isso em várias alterações de coluna) descarta os triggers.
+SQL_INDICE = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_BUSCA} USING fts5(
+        nome, descricao,
+        content='carrinho_produto', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_ai
+    AFTER INSERT ON carrinho_produto BEGIN
+        INSERT INTO {TABELA_BUSCA}(rowid, nome, descricao)
+        VALUES (new.id, new.nome, new.descricao);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_ad
+    AFTER DELETE ON carrinho_produto BEGIN
+        INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}, rowid, nome, descricao)
+        VALUES ('delete', old.id, old.nome, old.descricao);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_au
+    AFTER UPDATE OF nome, descricao ON carrinho_produto BEGIN
+        INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}, rowid, nome, descricao)
+        VALUES ('delete', old.id, old.nome, old.descricao);
+        INSERT INTO {TABELA_BUSCA}(rowid, nome, descricao)
+        VALUES (new.id, new.nome, new.descricao);
+    END
+    """,
+]
+
+# Peso das colunas no bm25: ocorrência no nome vale mais que na descrição
+PESO_NOME = 10.0
+PESO_DESCRICAO = 1.0
+
+
+def extrair_palavras(termo):
+    # Palavras de uma letra são ignoradas: artigos e preposições casariam
+    # com quase todo o catálogo.
+    return [p for p in re.findall(r'\w+', termo or '') if len(p) > 1]
+
+
+def montar_consulta(termo):
+    """
+    Converte o texto digitado em uma consulta FTS5: cada palavra vira um
+    prefixo entre aspas ("cam"*), o que neutraliza operadores e
+    pontuação, e todas precisam casar.
+    """
+    return ' '.join(f'"{palavra}"*' for palavra in extrair_palavras(termo))
+
+
+def buscar_produtos(termo, limite):
+    """Produtos que casam com `termo`, do mais para o menos relevante."""
+    from apps.carrinho.models import Produto
+
+    consulta = montar_consulta(termo)
+    if not consulta:
+        return []
+
+    if connection.vendor != 'sqlite':
+        filtro = Q()
+        for palavra in extrair_palavras(termo):
+            filtro &= Q(nome__icontains=palavra) | Q(
+                descricao__icontains=palavra
+            )
+        return list(Produto.objects.filter(filtro).order_by('nome')[:limite])
+
+    # O ranking fica na subconsulta, que só devolve `limite` rowids: o
+    # JOIN com o catálogo não passa por todas as ocorrências do termo.
+    return list(Produto.objects.raw(
+        f"""
+        SELECT produto.*, encontrados.relevancia
+        FROM (
+            SELECT rowid, bm25({TABELA_BUSCA}, %s, %s) AS relevancia
+            FROM {TABELA_BUSCA}
+            WHERE {TABELA_BUSCA} MATCH %s
+            ORDER BY relevancia
+            LIMIT %s
+        ) AS encontrados
+        JOIN {Produto._meta.db_table} AS produto
+            ON produto.id = encontrados.rowid
+        ORDER BY encontrados.relevancia
+        """,
+        [PESO_NOME, PESO_DESCRICAO, consulta, limite]
+    ))
+
+
+def reconstruir_indice(otimizar=True):
+    """Recria tabela e triggers, se faltarem, e reindexa todo o catálogo."""
+    with connection.cursor() as cursor:
+        for sql in SQL_INDICE:
+            cursor.execute(sql)
+        cursor.execute(
+            f"INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}) VALUES ('rebuild')"
+        )
+        if otimizar:
+            cursor.execute(
+                f"INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}) VALUES ('optimize')" # noqa E501
+            )
@@ -0,0 +1,263 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+from api_carrinho.replica import lendo_do_principal
+from apps.carrinho.condicional import calcular_validador
+
+CONFIGURACAO_PADRAO = {
+    'TTL': 300,
+    'ESTOQUE_TTL': 5,
+    'MAX_ENTRADAS': 512,
+    'INTERVALO_VERIFICACAO': 1.0,
+}
+
+RespostaCatalogo = namedtuple(
+    'RespostaCatalogo', ['dados', 'etag', 'ultima_alteracao']
+)
+
+
+class CacheCatalogo:
+    """
+    Cache LRU, em memória, das respostas serializadas do catálogo.
+
+    As entradas são chaveadas pela versão do catálogo, incrementada a cada
+    criação, alteração ou exclusão de Produto; respostas de versões antigas
+    nunca são servidas e acabam despejadas pelo LRU. O estoque muda por
+    UPDATE direto no add-to-cart, sem mudar a versão, e por isso tem uma
+    janela de validade própria e mais curta: vencida, só as colunas que o
+    UPDATE altera (estoque, versao, atualizado_em) são relidas e aplicadas
+    sobre o corpo em cache.
+
+    Cada entrada guarda também o ETag e o Last-Modified do corpo, para que
+    requisições condicionais sejam respondidas sem consulta nem serialização.
+    Numa falha, a listagem calcula o validador pelas colunas de
+    CAMPOS_VALIDADOR e só monta o corpo (guardar()) se não responder 304.
+
+    Com réplica de leitura, a falha é montada a partir do default: a réplica
+    atrasada guardaria dados antigos sob a versão nova por todo o TTL. A
+    releitura do estoque pode vir da réplica; o atraso dela soma à janela
+    de ESTOQUE_TTL.
+    """
+
+    CHAVE_VERSAO = 'carrinho:catalogo:versao'
+    CAMPOS_VALIDADOR = (
+        'nome', 'preco', 'num_produto', 'versao', 'atualizado_em'
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._versao = None
+        self._verificado_em = 0.0
+        self.acertos = 0
+        self.falhas = 0
+        self.estoque_recarregado = 0
+        self.despejos = 0
+
+    def configuracao(self):
+        return {
+            **CONFIGURACAO_PADRAO,
+            **getattr(settings, 'CATALOGO_CACHE', {}),
+        }
+
+    def obter(self, chave, carregar):
+        """
+        Devolve a RespostaCatalogo em cache para `chave` ou a monta com
+        `carregar()`, que devolve um produto ou uma página da listagem.
+        """
+        chave, resposta = self.procurar(chave)
+        if resposta is None:
+            with lendo_do_principal():
+                dados = carregar()
+            resposta = self.guardar(chave, dados)
+        return resposta
+
+    async def aobter(self, chave, carregar):
+        """
+        Versão assíncrona de obter(): `carregar` é uma corrotina e o
+        estoque vencido é relido pelo ORM assíncrono.
+        """
+        chave, resposta = await self.aprocurar(chave)
+        if resposta is None:
+            with lendo_do_principal():
+                dados = await carregar()
+            resposta = self.guardar(chave, dados)
+        return resposta
+
+    def procurar(self, chave):
+        """
+        Devolve (chave versionada, RespostaCatalogo em cache ou None). A
+        chave versionada é a que guardar() recebe para gravar uma falha.
+        """
+        config, agora, chave, entrada = self._procurar(chave)
+        if entrada is None:
+            return chave, None
+        if agora - entrada['estoque_em'] >= config['ESTOQUE_TTL']:
+            entrada = self._aplicar_estoque(
+                chave, entrada, agora,
+                list(self._consulta_estoque(entrada))
+            )
+        return chave, entrada['resposta']
+
+    async def aprocurar(self, chave):
+        # Como procurar(), relendo o estoque vencido pelo ORM assíncrono
+        config, agora, chave, entrada = self._procurar(chave)
+        if entrada is None:
+            return chave, None
+        if agora - entrada['estoque_em'] >= config['ESTOQUE_TTL']:
+            entrada = self._aplicar_estoque(
+                chave, entrada, agora,
+                [linha async for linha in self._consulta_estoque(entrada)]
+            )
+        return chave, entrada['resposta']
+
+    def guardar(self, chave, dados):
+        config = self.configuracao()
+        entrada = self._nova_entrada(dados, time.monotonic())
+        self._guardar(chave, entrada, config)
+        return entrada['resposta']
+
+    def invalidar(self):
+        with self._lock:
+            self._entradas.clear()
+        try:
+            cache.incr(self.CHAVE_VERSAO)
+        except ValueError:
+            cache.set(self.CHAVE_VERSAO, 1, timeout=None)
+        self._verificado_em = 0.0
+
+    def metricas(self):
+        consultas = self.acertos + self.falhas
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+            'estoque_recarregado': self.estoque_recarregado,
+            'despejos': self.despejos,
+            'entradas': len(self._entradas),
+            'versao': self._versao,
+        }
+
+    def _versao_atual(self, config, agora):
+        if agora - self._verificado_em >= config['INTERVALO_VERIFICACAO']:
+            self._versao = cache.get(self.CHAVE_VERSAO, 0)
+            self._verificado_em = agora
+        return self._versao
+
+    def _procurar(self, chave):
+        config = self.configuracao()
+        agora = time.monotonic()
+        chave = (self._versao_atual(config, agora), chave)
+
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada and agora - entrada['criado_em'] < config['TTL']:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+            else:
+                entrada = None
+                self.falhas += 1
+        return config, agora, chave, entrada
+
+    def _nova_entrada(self, dados, agora):
+        return {
+            'criado_em': agora,
+            'estoque_em': agora,
+            'resposta': self._resposta(dados),
+        }
+
+    def _guardar(self, chave, entrada, config):
+        with self._lock:
+            self._entradas[chave] = entrada
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > config['MAX_ENTRADAS']:
+                self._entradas.popitem(last=False)
+                self.despejos += 1
+
+    @staticmethod
+    def _produtos(dados):
+        # Página da listagem ({'next', 'previous', 'results'}) ou um produto
+        return dados['results'] if 'results' in dados else [dados]
+
+    @classmethod
+    def validador(cls, dados):
+        """
+        (etag, ultima_alteracao) de um produto ou de uma página, que só
+        precisam trazer as marcas() dos produtos. Os links next/previous
+        da página entram no ETag: mudam sem que os produtos mudem.
+        """
+        marcas = [
+            (p['num_produto'], p['versao'], parse_datetime(p['atualizado_em']))
+            for p in cls._produtos(dados)
+        ]
+        if 'results' in dados:
+            marcas.append((dados['next'], dados['previous'], None))
+        return calcular_validador(marcas)
+
+    @staticmethod
+    def marcas(produtos):
+        # Marcas de versão como o ProdutoSerializer as representa, para que
+        # o validador da consulta leve seja o mesmo do corpo serializado
+        from apps.carrinho.api.serializers import ProdutoSerializer
+
+        campo_data = ProdutoSerializer().fields['atualizado_em']
+        return [
+            {
+                'num_produto': str(produto.num_produto),
+                'versao': produto.versao,
+                'atualizado_em': campo_data.to_representation(
+                    produto.atualizado_em
+                ),
+            }
+            for produto in produtos
+        ]
+
+    @classmethod
+    def _resposta(cls, dados):
+        return RespostaCatalogo(dados, *cls.validador(dados))
+
+    def _consulta_estoque(self, entrada):
+        from apps.carrinho.models import Produto
+
+        return Produto.objects.filter(num_produto__in=[
+            p['num_produto'] for p in self._produtos(entrada['resposta'].dados)
+        ]).values_list('num_produto', 'estoque', 'versao', 'atualizado_em')
+
+    def _aplicar_estoque(self, chave, entrada, agora, linhas):
+        from apps.carrinho.api.serializers import ProdutoSerializer
+
+        dados = entrada['resposta'].dados
+        produtos = self._produtos(dados)
+        campo_data = ProdutoSerializer().fields['atualizado_em']
+        volateis = {
+            str(num_produto): {
+                'estoque': estoque,
+                'versao': versao,
+                'atualizado_em': campo_data.to_representation(atualizado_em),
+            }
+            for num_produto, estoque, versao, atualizado_em in linhas
+        }
+
+        # Copia em vez de alterar: o corpo antigo pode estar sendo enviado
+        atualizados = [
+            {**p, **volateis.get(p['num_produto'], {})} for p in produtos
+        ]
+        nova = {
+            **entrada,
+            'estoque_em': agora,
+            'resposta': self._resposta(
+                {**dados, 'results': atualizados} if 'results' in dados
+                else atualizados[0]
+            ),
+        }
+        with self._lock:
+            if chave in self._entradas:
+                self._entradas[chave] = nova
+        self.estoque_recarregado += 1
+        return nova
+
+
+cache_catalogo = CacheCatalogo()
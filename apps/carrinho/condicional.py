@@ -0,0 +1,61 @@
+from hashlib import sha1
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def calcular_validador(marcas):
+    """
+    Devolve (etag, ultima_alteracao) a partir das marcas de versão das
+    linhas que compõem a resposta. Cada marca é uma tupla cujo último item
+    é a data de alteração (datetime); o ETag é forte e muda com qualquer
+    marca, sem depender do corpo serializado.
+    """
+    resumo = sha1()
+    ultima_alteracao = None
+    for marca in marcas:
+        resumo.update(repr(marca).encode())
+        alterado_em = marca[-1]
+        if alterado_em and (
+            ultima_alteracao is None or alterado_em > ultima_alteracao
+        ):
+            ultima_alteracao = alterado_em
+    return quote_etag(resumo.hexdigest()[:32]), ultima_alteracao
+
+
+def resposta_condicional(request, validador, montar):
+    """
+    Responde 304 quando If-None-Match / If-Modified-Since batem com o
+    validador; caso contrário chama `montar()`, que só então consulta e
+    serializa o corpo. Os validadores vão nos cabeçalhos das duas respostas.
+    """
+    etag, timestamp, resposta = _verificar(request, validador)
+    if resposta is None:
+        resposta = montar()
+    return _marcar(resposta, etag, timestamp)
+
+
+async def aresposta_condicional(request, validador, montar):
+    # Como resposta_condicional(), com `montar` sendo uma corrotina
+    etag, timestamp, resposta = _verificar(request, validador)
+    if resposta is None:
+        resposta = await montar()
+    return _marcar(resposta, etag, timestamp)
+
+
+def _verificar(request, validador):
+    etag, ultima_alteracao = validador
+    # HTTP-date tem resolução de segundos
+    timestamp = int(ultima_alteracao.timestamp()) if ultima_alteracao else None # noqa E501
+
+    resposta = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    return etag, timestamp, resposta
+
+
+def _marcar(resposta, etag, timestamp):
+    if resposta.status_code in (200, 304):
+        resposta['ETag'] = etag
+        if timestamp is not None:
+            resposta['Last-Modified'] = http_date(timestamp)
+    return resposta
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from apps.carrinho.managers.manager_carrinho import CarrinhoManager
+from apps.carrinho.models import CarrinhoDeCompras
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula os totais dos carrinhos a partir das linhas e aponta "
+        "divergências com os valores mantidos incrementalmente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corrigir', action='store_true',
+            help="Grava os valores recalculados nos carrinhos divergentes."
+        )
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help="Quantidade de carrinhos lidos por consulta."
+        )
+
+    def handle(self, *args, **options):
+        manager = CarrinhoManager()
+        carrinhos = CarrinhoDeCompras.objects.select_related('frete').order_by('pk') # noqa E501
+
+        verificados = divergentes = 0
+        for carrinho in carrinhos.iterator(chunk_size=options['lote']):
+            verificados += 1
+            divergencias = manager.recalcular(
+                carrinho, corrigir=options['corrigir']
+            )
+            if not divergencias:
+                continue
+
+            divergentes += 1
+            detalhes = ', '.join(
+                f"{campo}: {gravado} -> {calculado}"
+                for campo, (gravado, calculado) in divergencias.items()
+            )
+            self.stdout.write(f"Carrinho {carrinho.pk}: {detalhes}")
+
+        acao = 'corrigidos' if options['corrigir'] else 'divergentes'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verificados} carrinhos verificados, {divergentes} {acao}."
+        ))
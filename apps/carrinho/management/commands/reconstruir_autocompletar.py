@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.carrinho.autocompletar import indice_autocompletar
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói o índice em memória do autocompletar: publica uma nova "
+        "versão, para que os processos do servidor remontem o índice (com "
+        "a popularidade atualizada), e mostra as métricas da montagem."
+    )
+
+    def handle(self, *args, **options):
+        indice_autocompletar.invalidar()
+
+        inicio = time.perf_counter()
+        indice_autocompletar.construir()
+        duracao = time.perf_counter() - inicio
+
+        metricas = indice_autocompletar.metricas()
+        for campo, valor in metricas.items():
+            self.stdout.write(f"{campo}: {valor}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice montado em {duracao:.2f}s "
+            f"({metricas['memoria_estimada_mb']} MB estimados)."
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from apps.carrinho.busca import reconstruir_indice
+from apps.carrinho.models import Produto
+
+
+class Command(BaseCommand):
+    help = (
+        "Recria o índice FTS5 da busca de produtos (tabela e triggers, se "
+        "faltarem) e reindexa nome e descrição de todo o catálogo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sem-otimizar', action='store_true',
+            help="Não funde os segmentos do índice depois da reconstrução."
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                "A busca FTS5 só existe no SQLite; nos demais bancos a busca "
+                "usa o filtro por icontains e não há índice a reconstruir."
+            )
+
+        reconstruir_indice(otimizar=not options['sem_otimizar'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice de busca reconstruído: {Produto.objects.count()} produtos." # noqa E501
+        ))
@@ -0,0 +1,48 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from api_carrinho.replica import configuracao, copia_local, sincronizar
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia o banco default para a réplica de leitura (SQLite) pela API "
+        "de backup. Com --intervalo, repete a cópia a cada N segundos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=float,
+            help="Segundos entre as cópias (padrão: REPLICA"
+                 "['INTERVALO_SINCRONIZACAO']); 0 copia uma vez e sai."
+        )
+
+    def handle(self, *args, **options):
+        config = configuracao()
+        alias = config['ALIAS']
+        if not copia_local(alias):
+            raise CommandError(
+                f"A réplica '{alias}' não está configurada como um arquivo "
+                "SQLite separado do default (REPLICA_LEITURA)."
+            )
+
+        intervalo = options['intervalo']
+        if intervalo is None:
+            intervalo = config['INTERVALO_SINCRONIZACAO']
+        # Com cópias mais espaçadas que a janela, a réplica passaria parte
+        # do tempo velha demais para ser lida
+        if intervalo >= config['JANELA_ESCRITA']:
+            raise CommandError(
+                f"O intervalo ({intervalo}s) deve ser menor que "
+                f"JANELA_ESCRITA ({config['JANELA_ESCRITA']}s)."
+            )
+
+        while True:
+            inicio = time.perf_counter()
+            sincronizar(alias)
+            duracao = time.perf_counter() - inicio
+            self.stdout.write(self.style.SUCCESS(
+                f"Réplica '{alias}' sincronizada em {duracao * 1e3:.0f}ms."
+            ))
+            if not intervalo:
+                return
+            time.sleep(intervalo)
@@ -1,6 +1,17 @@
-from django.db import models
-from apps.carrinho.models import CarrinhoDeCompras
-from apps.pedidos.models import InformacaoEnvio
+from math import isclose
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Case, Count, F, FloatField, Max, OuterRef, Prefetch, Subquery, Sum, Value, When # noqa E501
+from django.db.models.functions import Coalesce, Greatest
+from apps.carrinho.condicional import calcular_validador
+from apps.carrinho.models import CarrinhoDeCompras, ItemCarrinho, Produto
+from apps.pedidos.frete import resolvedor_frete
+from apps.pedidos.managers.managers_pedido import ResumoClienteManager, VendaDiariaManager # noqa E501
+from apps.pedidos.models import DetalhesDoPedido, InformacaoEnvio, Pedido
+from apps.pedidos.sequencias import alocador_sequencias
+from apps.perfil.models import Endereco
+
+
+TOLERANCIA_TOTAIS = 0.005
 
 
 class CarrinhoManager(models.Manager):
@@ -8,52 +19,456 @@ class CarrinhoManager(models.Manager):
 
         return CarrinhoDeCompras.objects.create(
             cliente=cliente,
-            itens={},
             frete=None,
+            subtotal=0.0,
+            quantidade_itens=0,
             total=0.0,
             status=CarrinhoDeCompras.StatusCarrinho.ATIVO
         )
 
-    def add_produto_carrinho(self, carrinho, produto, quantidade):
+    def reservar_estoque(self, produto, quantidade):
+
+        # Decremento condicional feito no banco: a linha só é alterada se
+        # ainda houver estoque suficiente, sem ler e regravar o valor.
+        atualizados = Produto.objects.filter(
+            pk=produto.pk, estoque__gte=quantidade
+        ).update(
+            estoque=F('estoque') - quantidade, **Produto.alteracao()
+        )
+        return atualizados == 1
+
+    def add_produto_carrinho(self, carrinho, produto, quantidade, frete=None):
 
-        itens = carrinho.itens
+        if quantidade <= 0:
+            raise ValueError("A quantidade deve ser maior que zero.")
 
-        # Verifica se há estoque suficiente
-        if produto.estoque < quantidade:
-            raise ValueError(
-                f"Estoque insuficiente para o produto '{produto.nome}'."
+        with transaction.atomic():
+            # Decrementa o estoque do produto, se houver saldo suficiente
+            if not self.reservar_estoque(produto, quantidade):
+                raise ValueError(
+                    f"Estoque insuficiente para o produto '{produto.nome}'."
+                )
+
+            preco_unitario = self.somar_linha(carrinho, produto, quantidade)
+
+            # Aplica apenas a diferença nos totais do carrinho
+            self.aplicar_delta(
+                carrinho, quantidade * preco_unitario, quantidade, frete
             )
+        return carrinho
 
-        if str(produto.num_produto) in itens:
-            itens[str(produto.num_produto)]['quantidade'] += quantidade
-            itens[str(produto.num_produto)]['subtotal'] = itens[str(produto.id)]['quantidade'] * produto.preco # noqa E501
-        else:
-            # Adiciona o produto ao carrinho
-            itens[str(produto.num_produto)] = {
-                'nome': produto.nome,
-                'descricao': produto.descricao,
-                'preco': produto.preco,
-                'quantidade': quantidade,
-                'subtotal': quantidade * produto.preco,
+    def add_produtos_carrinho(self, carrinho, quantidades, frete=None,
+                              tudo_ou_nada=False):
+
+        # Adição em lote: `quantidades` é {num_produto: quantidade}. Os
+        # produtos vêm em uma única consulta IN; cada linha aceita reserva
+        # estoque com o decremento condicional, e linhas e totais do
+        # carrinho são gravados de uma vez. Devolve o resultado por produto.
+        produtos = Produto.objects.in_bulk(
+            list(quantidades), field_name='num_produto'
+        )
+
+        resultados = []
+        aceitos = []
+        with transaction.atomic():
+            for num_produto, quantidade in quantidades.items():
+                produto = produtos.get(num_produto)
+                resultado = {
+                    'num_produto': str(num_produto),
+                    'quantidade': quantidade,
+                    'adicionado': False,
+                }
+                if produto is None:
+                    resultado['detail'] = "Produto não encontrado."
+                elif not self.reservar_estoque(produto, quantidade):
+                    resultado['detail'] = (
+                        f"Estoque insuficiente para o produto '{produto.nome}'." # noqa E501
+                    )
+                else:
+                    resultado['adicionado'] = True
+                    aceitos.append((produto, quantidade))
+                resultados.append(resultado)
+
+            falhou = len(aceitos) < len(quantidades)
+            if tudo_ou_nada and falhou:
+                transaction.set_rollback(True)
+                for resultado in resultados:
+                    if resultado['adicionado']:
+                        resultado['adicionado'] = False
+                        resultado['detail'] = (
+                            "Desfeito: outro produto do lote falhou."
+                        )
+                return resultados
+
+            if aceitos:
+                delta_subtotal = self.somar_linhas(carrinho, aceitos)
+                self.aplicar_delta(
+                    carrinho,
+                    delta_subtotal,
+                    sum(quantidade for _, quantidade in aceitos),
+                    frete
+                )
+        return resultados
+
+    def somar_linhas(self, carrinho, aceitos):
+
+        # Versão em lote de somar_linha: uma leitura das linhas existentes,
+        # um bulk_update com incremento no banco e um bulk_create das novas.
+        # Devolve a variação do subtotal pelos preços de snapshot.
+        existentes = {
+            linha.produto_id: linha
+            for linha in ItemCarrinho.objects.filter(
+                carrinho=carrinho,
+                produto__in=[produto for produto, _ in aceitos]
+            )
+        }
+
+        delta_subtotal = 0.0
+        atualizar, criar = [], []
+        for produto, quantidade in aceitos:
+            linha = existentes.get(produto.pk)
+            if linha:
+                delta_subtotal += quantidade * linha.preco_unitario
+                linha.quantidade = F('quantidade') + quantidade
+                atualizar.append(linha)
+            else:
+                delta_subtotal += quantidade * produto.preco
+                criar.append(ItemCarrinho(
+                    carrinho=carrinho,
+                    produto=produto,
+                    quantidade=quantidade,
+                    preco_unitario=produto.preco
+                ))
+
+        if atualizar:
+            ItemCarrinho.objects.bulk_update(atualizar, ['quantidade'])
+        if criar:
+            try:
+                with transaction.atomic():
+                    ItemCarrinho.objects.bulk_create(criar)
+            except IntegrityError:
+                # Outra requisição criou alguma dessas linhas nesse meio
+                # tempo: refaz as novas uma a uma pelo upsert individual.
+                delta_subtotal -= sum(
+                    linha.quantidade * linha.preco_unitario for linha in criar
+                )
+                for linha in criar:
+                    preco = self.somar_linha(
+                        carrinho, linha.produto, linha.quantidade
+                    )
+                    delta_subtotal += linha.quantidade * preco
+        return delta_subtotal
+
+    def somar_linha(self, carrinho, produto, quantidade):
+
+        # Upsert de uma única linha em um só comando: INSERT ... ON CONFLICT
+        # DO UPDATE (SQLite 3.35+ e PostgreSQL, por causa do RETURNING).
+        # Devolve o preço unitário da linha, que é o snapshot gravado quando
+        # o produto entrou no carrinho e não muda nas somas seguintes.
+        tabela = connection.ops.quote_name(ItemCarrinho._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {tabela} "
+                "(carrinho_id, produto_id, quantidade, preco_unitario) "
+                "VALUES (%s, %s, %s, %s) "
+                "ON CONFLICT (carrinho_id, produto_id) DO UPDATE SET "
+                f"quantidade = {tabela}.quantidade + excluded.quantidade "
+                "RETURNING preco_unitario",
+                [carrinho.pk, produto.pk, quantidade, produto.preco]
+            )
+            return cursor.fetchone()[0]
+
+    def remover_produtos_carrinho(self, carrinho, quantidades):
+
+        # Remoção em lote: `quantidades` é {num_produto: quantidade}, com
+        # None para tirar a linha inteira. As linhas vêm em uma consulta
+        # (travadas até o fim da transação), o estoque volta em um único
+        # UPDATE com CASE, as linhas zeradas saem em um DELETE, as demais
+        # são decrementadas em outro UPDATE e os totais do carrinho são
+        # gravados uma vez. Devolve o resultado por produto.
+        resultados = []
+        devolver = {}
+        excluir, decrementar = [], {}
+        delta_subtotal = 0.0
+        with transaction.atomic():
+            linhas = {
+                linha.num_produto: linha
+                for linha in ItemCarrinho.objects.select_for_update().filter(
+                    carrinho=carrinho,
+                    produto__num_produto__in=list(quantidades)
+                ).annotate(num_produto=F('produto__num_produto'))
             }
 
-        # Decrementa o estoque do produto
-        produto.estoque -= quantidade
-        produto.save()
+            for num_produto, quantidade in quantidades.items():
+                linha = linhas.get(num_produto)
+                resultado = {
+                    'num_produto': str(num_produto),
+                    'quantidade': quantidade,
+                    'removido': 0,
+                }
+                if linha is None:
+                    resultado['detail'] = "Produto não está no carrinho."
+                    resultados.append(resultado)
+                    continue
+
+                removida = min(quantidade or linha.quantidade, linha.quantidade) # noqa E501
+                if removida >= linha.quantidade:
+                    excluir.append(linha.pk)
+                else:
+                    decrementar[linha.pk] = removida
+                devolver[linha.produto_id] = removida
+                delta_subtotal -= removida * linha.preco_unitario
+                resultado['removido'] = removida
+                resultados.append(resultado)
+
+            if not devolver:
+                return resultados
+
+            Produto.objects.filter(pk__in=list(devolver)).update(
+                estoque=F('estoque') + self._por_id(devolver),
+                **Produto.alteracao()
+            )
+            if excluir:
+                ItemCarrinho.objects.filter(pk__in=excluir).delete()
+            if decrementar:
+                ItemCarrinho.objects.filter(pk__in=list(decrementar)).update(
+                    quantidade=F('quantidade') - self._por_id(decrementar)
+                )
+            self.aplicar_delta(
+                carrinho, delta_subtotal, -sum(devolver.values())
+            )
+        return resultados
+
+    @staticmethod
+    def _por_id(valores):
+        # CASE id WHEN ... THEN ... END, para gravar valores diferentes por
+        # linha em um único UPDATE.
+        return Case(
+            *(When(pk=pk, then=Value(valor)) for pk, valor in valores.items()), # noqa E501
+            default=Value(0),
+        )
 
-        # Recalcula o total do carrinho
-        carrinho.itens = itens
-        carrinho.total = sum(item['subtotal'] for item in itens.values())
-        carrinho.save()
+    def aplicar_delta(self, carrinho, delta_subtotal, delta_quantidade,
+                      frete=None):
+
+        # Mantém subtotal, quantidade de itens e total com frete somando só
+        # a variação da mudança, em um único UPDATE, sem percorrer as linhas.
+        if frete is not None:
+            carrinho.frete = frete
+        custo_frete = self.obter_custo_frete(carrinho)
+
+        CarrinhoDeCompras.objects.filter(pk=carrinho.pk).update(
+            subtotal=F('subtotal') + delta_subtotal,
+            quantidade_itens=F('quantidade_itens') + delta_quantidade,
+            total=F('subtotal') + delta_subtotal + custo_frete,
+            frete=carrinho.frete,
+            **CarrinhoDeCompras.alteracao()
+        )
+
+        carrinho.subtotal += delta_subtotal
+        carrinho.quantidade_itens += delta_quantidade
+        carrinho.total = carrinho.subtotal + custo_frete
         return carrinho
 
+    def recalcular(self, carrinho, corrigir=False):
+
+        # Verificação sob demanda: recalcula os totais a partir das linhas e
+        # devolve as divergências {campo: (gravado, calculado)}.
+        agregado = ItemCarrinho.objects.filter(carrinho=carrinho).aggregate(
+            subtotal=Sum(
+                F('quantidade') * F('preco_unitario'),
+                output_field=FloatField()
+            ),
+            quantidade_itens=Sum('quantidade'),
+        )
+        subtotal = agregado['subtotal'] or 0.0
+        esperado = {
+            'subtotal': subtotal,
+            'quantidade_itens': agregado['quantidade_itens'] or 0,
+            'total': subtotal + self.obter_custo_frete(carrinho),
+        }
+
+        divergencias = {}
+        for campo, valor in esperado.items():
+            gravado = getattr(carrinho, campo)
+            if gravado is None or not isclose(
+                gravado, valor, abs_tol=TOLERANCIA_TOTAIS
+            ):
+                divergencias[campo] = (gravado, valor)
+
+        if divergencias and corrigir:
+            CarrinhoDeCompras.objects.filter(pk=carrinho.pk).update(
+                **esperado, **CarrinhoDeCompras.alteracao()
+            )
+            for campo, valor in esperado.items():
+                setattr(carrinho, campo, valor)
+        return divergencias
+
     def get_carrinho_ativo(self, cliente):
 
-        return CarrinhoDeCompras.objects.filter(
+        return CarrinhoDeCompras.objects.select_related('frete').filter(
             cliente=cliente,
             status=CarrinhoDeCompras.StatusCarrinho.ATIVO
         ).first()
 
+    def get_carrinho_para_compra(self, cliente_id):
+
+        # Carrinho ativo, frete atual e UF do primeiro endereço do cliente
+        # em uma única consulta.
+        estado_cliente = Endereco.objects.filter(
+            perfil_id=OuterRef('cliente_id')
+        ).order_by('pk').values('estado')[:1]
+
+        return CarrinhoDeCompras.objects.select_related('frete').annotate(
+            estado_cliente=Subquery(estado_cliente)
+        ).filter(
+            cliente_id=cliente_id,
+            status=CarrinhoDeCompras.StatusCarrinho.ATIVO
+        ).first()
+
+    def estado_do_cliente(self, carrinho):
+
+        # UF já anotada por get_carrinho_para_compra ou do 1º endereço
+        if hasattr(carrinho, 'estado_cliente'):
+            estado = carrinho.estado_cliente
+        else:
+            endereco = carrinho.cliente.enderecos.first()
+            estado = endereco.estado if endereco else None
+        if not estado:
+            raise ValueError("Endereço ou estado do cliente não encontrado.")
+        return estado
+
+    def resolver_frete(self, carrinho):
+
+        estado = self.estado_do_cliente(carrinho)
+
+        num_regiao_envio = resolvedor_frete.regiao(estado)
+        if not num_regiao_envio:
+            raise ValueError(
+                f"Estado '{estado.upper()}' não mapeado para nenhuma região."
+            )
+
+        # Tabela em memória: nenhuma consulta no caminho comum
+        frete = resolvedor_frete.resolver(estado)
+        if not frete:
+            raise ValueError(
+                f"Não há informações de envio disponíveis para a região {num_regiao_envio}." # noqa E501
+            )
+
+        # Mantém a instância já carregada com o carrinho, se for a mesma
+        if carrinho.frete_id == frete.pk:
+            return carrinho.frete
+        return frete
+
+    def finalizar_compra(self, carrinho):
+
+        # Checkout: converte o carrinho ativo em pedido numa transação, com
+        # número fixo de comandos qualquer que seja o número de linhas. O
+        # estoque não é conferido de novo: cada unidade de cada linha já saiu
+        # de Produto.estoque pelo decremento condicional ao entrar no
+        # carrinho (que a constraint estoque >= 0 garante), volta só pela
+        # remoção, e o PATCH de status não finaliza carrinhos. A troca condicional de status trava o carrinho (só um checkout
+        # passa de ATIVO para FINALIZADO); as linhas são lidas em uma
+        # consulta e viram DetalhesDoPedido em um único bulk_create; o
+        # resumo do cliente é atualizado em um UPDATE e as vendas diárias
+        # em um upsert.
+        estado = self.estado_do_cliente(carrinho)
+        frete = carrinho.frete or self.resolver_frete(carrinho)
+        # Fora da transação, para sair do bloco em memória; se o checkout
+        # falhar o número fica sem uso.
+        num_pedido = alocador_sequencias.proximo('pedido')
+
+        with transaction.atomic():
+            finalizados = CarrinhoDeCompras.objects.filter(
+                pk=carrinho.pk, status=CarrinhoDeCompras.StatusCarrinho.ATIVO
+            ).update(
+                status=CarrinhoDeCompras.StatusCarrinho.FINALIZADO,
+                frete=frete,
+                total=F('subtotal') + frete.custo_envio,
+                **CarrinhoDeCompras.alteracao()
+            )
+            if not finalizados:
+                raise ValueError("O carrinho já foi finalizado.")
+
+            linhas = list(ItemCarrinho.objects.filter(
+                carrinho=carrinho
+            ).values_list(
+                'produto_id', 'produto__nome', 'quantidade', 'preco_unitario'
+            ))
+            if not linhas:
+                raise ValueError("O carrinho está vazio.")
+
+            pedido = Pedido.objects.create(
+                num_pedido=num_pedido,
+                cliente_id=carrinho.cliente_id,
+                estado=estado,
+                info_envio=frete
+            )
+            pedido.detalhes = DetalhesDoPedido.objects.bulk_create([
+                DetalhesDoPedido(
+                    pedido=pedido,
+                    num_produto=produto_id,
+                    nome_produto=nome,
+                    quantidade=quantidade,
+                    custo_unidade=preco_unitario,
+                    subtotal=quantidade * preco_unitario
+                )
+                for produto_id, nome, quantidade, preco_unitario in linhas
+            ])
+            ResumoClienteManager().registrar_pedido(pedido, pedido.detalhes)
+            VendaDiariaManager().registrar_pedido(pedido, pedido.detalhes)
+
+        carrinho.status = CarrinhoDeCompras.StatusCarrinho.FINALIZADO
+        carrinho.frete = frete
+        carrinho.total = carrinho.subtotal + frete.custo_envio
+        return pedido
+
+    def com_linhas(self, queryset):
+
+        # Carrega frete e linhas (com o produto) em consultas fixas, para
+        # que serializar `itens` não gere uma consulta por carrinho.
+        return queryset.select_related('frete').prefetch_related(
+            Prefetch(
+                'linhas',
+                queryset=ItemCarrinho.objects.select_related('produto')
+            )
+        )
+
+    def validador_carrinhos(self, queryset):
+
+        # ETag / Last-Modified dos carrinhos em uma consulta de agregação.
+        # Além da versão do carrinho, entram a versão dos produtos das
+        # linhas (nome e descrição aparecem em `itens`), a contagem de
+        # linhas (exclusão de produto remove linhas em cascata) e o custo
+        # do frete. Devolve None se não houver carrinho.
+        marcas = list(self._marcas_carrinhos(queryset))
+        if not marcas:
+            return None
+        return calcular_validador(marcas)
+
+    async def avalidador_carrinhos(self, queryset):
+
+        # Mesmo validador, pelo ORM assíncrono
+        marcas = [marca async for marca in self._marcas_carrinhos(queryset)]
+        if not marcas:
+            return None
+        return calcular_validador(marcas)
+
+    def _marcas_carrinhos(self, queryset):
+        return queryset.order_by('pk').values_list(
+            'pk', 'versao', 'frete__custo_envio'
+        ).annotate(
+            linhas_total=Count('linhas'),
+            versoes_produtos=Sum('linhas__produto__versao'),
+            alterado_em=Greatest(
+                'atualizado_em',
+                Coalesce(
+                    Max('linhas__produto__atualizado_em'),
+                    'atualizado_em'
+                )
+            ),
+        )
+
     def obter_custo_frete(self, carrinho):
 
         if carrinho.frete:
@@ -62,20 +477,13 @@ class CarrinhoManager(models.Manager):
 
     def calcular_total_com_frete(self, carrinho):
 
-        subtotal = sum(
-            item['preco'] * item['quantidade'] for item in carrinho.itens.values() # noqa E501
-        )
-        custo_frete = self.obter_custo_frete(carrinho)
-        carrinho.total = subtotal + custo_frete
-        carrinho.save()
-        return carrinho.total
+        # O subtotal já é mantido a cada mudança; não há o que somar
+        return (carrinho.subtotal or 0.0) + self.obter_custo_frete(carrinho)
 
     def atribuir_frete(self, carrinho, informacao_envio_id):
 
         try:
             frete = InformacaoEnvio.objects.get(id=informacao_envio_id)
-            carrinho.frete = frete
-            carrinho.save()
         except InformacaoEnvio.DoesNotExist:
             raise ValueError("Informação de envio não encontrada.")
-        return carrinho
+        return self.aplicar_delta(carrinho, 0.0, 0, frete)
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrinho', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='produto',
+            constraint=models.CheckConstraint(condition=models.Q(('estoque__gte', 0)), name='produto_estoque_nao_negativo'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrinho', '0002_produto_estoque_nao_negativo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemCarrinho',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.PositiveIntegerField()),
+                ('preco_unitario', models.FloatField(help_text='Preço do produto no momento em que entrou no carrinho.')),
+                ('carrinho', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='linhas', to='carrinho.carrinhodecompras')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens_carrinho', to='carrinho.produto')),
+            ],
+            options={
+                'verbose_name': 'Item do Carrinho',
+                'verbose_name_plural': 'Itens do Carrinho',
+                'ordering': ('id',),
+                'constraints': [models.UniqueConstraint(fields=('carrinho', 'produto'), name='item_carrinho_produto_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,122 @@
+import uuid
+from django.db import migrations
+
+TAMANHO_LOTE = 500
+
+
+def _chave_produto(chave):
+    # O JSON legado usava o UUID do produto como chave, mas carrinhos
+    # antigos também foram gravados com o id numérico.
+    try:
+        return 'num_produto', uuid.UUID(str(chave))
+    except ValueError:
+        if str(chave).isdigit():
+            return 'id', int(chave)
+    return None, None
+
+
+def migrar_itens_para_linhas(apps, schema_editor):
+    CarrinhoDeCompras = apps.get_model('carrinho', 'CarrinhoDeCompras')
+    ItemCarrinho = apps.get_model('carrinho', 'ItemCarrinho')
+    Produto = apps.get_model('carrinho', 'Produto')
+
+    ultimo_id = 0
+    while True:
+        lote = list(
+            CarrinhoDeCompras.objects.filter(pk__gt=ultimo_id)
+            .order_by('pk')
+            .values('pk', 'itens')[:TAMANHO_LOTE]
+        )
+        if not lote:
+            break
+        ultimo_id = lote[-1]['pk']
+
+        uuids, ids = set(), set()
+        for carrinho in lote:
+            for chave in (carrinho['itens'] or {}):
+                campo, valor = _chave_produto(chave)
+                if campo == 'num_produto':
+                    uuids.add(valor)
+                elif campo == 'id':
+                    ids.add(valor)
+
+        por_uuid = dict(
+            Produto.objects.filter(num_produto__in=uuids)
+            .values_list('num_produto', 'id')
+        )
+        por_id = set(
+            Produto.objects.filter(id__in=ids).values_list('id', flat=True)
+        )
+
+        linhas = []
+        for carrinho in lote:
+            for chave, item in (carrinho['itens'] or {}).items():
+                campo, valor = _chave_produto(chave)
+                if campo == 'num_produto':
+                    produto_id = por_uuid.get(valor)
+                elif campo == 'id' and valor in por_id:
+                    produto_id = valor
+                else:
+                    produto_id = None
+
+                quantidade = int(item.get('quantidade') or 0)
+                if produto_id is None or quantidade <= 0:
+                    continue
+
+                linhas.append(ItemCarrinho(
+                    carrinho_id=carrinho['pk'],
+                    produto_id=produto_id,
+                    quantidade=quantidade,
+                    preco_unitario=float(item.get('preco') or 0.0),
+                ))
+
+        ItemCarrinho.objects.bulk_create(
+            linhas, batch_size=TAMANHO_LOTE, ignore_conflicts=True
+        )
+
+
+def migrar_linhas_para_itens(apps, schema_editor):
+    CarrinhoDeCompras = apps.get_model('carrinho', 'CarrinhoDeCompras')
+    ItemCarrinho = apps.get_model('carrinho', 'ItemCarrinho')
+
+    ultimo_id = 0
+    while True:
+        lote = list(
+            CarrinhoDeCompras.objects.filter(pk__gt=ultimo_id)
+            .order_by('pk')[:TAMANHO_LOTE]
+        )
+        if not lote:
+            break
+        ultimo_id = lote[-1].pk
+
+        itens = {carrinho.pk: {} for carrinho in lote}
+        linhas = ItemCarrinho.objects.filter(
+            carrinho_id__in=itens.keys()
+        ).select_related('produto')
+        for linha in linhas:
+            itens[linha.carrinho_id][str(linha.produto.num_produto)] = {
+                'nome': linha.produto.nome,
+                'descricao': linha.produto.descricao,
+                'preco': linha.preco_unitario,
+                'quantidade': linha.quantidade,
+                'subtotal': linha.quantidade * linha.preco_unitario,
+            }
+
+        for carrinho in lote:
+            carrinho.itens = itens[carrinho.pk]
+        CarrinhoDeCompras.objects.bulk_update(
+            lote, ['itens'], batch_size=TAMANHO_LOTE
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrinho', '0003_itemcarrinho'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrar_itens_para_linhas, migrar_linhas_para_itens
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrinho', '0004_migrar_itens_carrinho'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='carrinhodecompras',
+            name='itens',
+        ),
+    ]
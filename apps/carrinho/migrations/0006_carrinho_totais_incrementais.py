@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrinho', '0005_remove_carrinhodecompras_itens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrinhodecompras',
+            name='quantidade_itens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='carrinhodecompras',
+            name='subtotal',
+            field=models.FloatField(default=0.0, help_text='Soma das linhas, mantida incrementalmente a cada mudança.'),
+        ),
+    ]
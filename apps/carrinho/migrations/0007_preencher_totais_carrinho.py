@@ -0,0 +1,56 @@
+from django.db import migrations
+from django.db.models import F, FloatField, Sum
+
+TAMANHO_LOTE = 500
+
+
+def preencher_totais(apps, schema_editor):
+    CarrinhoDeCompras = apps.get_model('carrinho', 'CarrinhoDeCompras')
+    ItemCarrinho = apps.get_model('carrinho', 'ItemCarrinho')
+
+    ultimo_id = 0
+    while True:
+        lote = list(
+            CarrinhoDeCompras.objects.filter(pk__gt=ultimo_id)
+            .select_related('frete')
+            .order_by('pk')[:TAMANHO_LOTE]
+        )
+        if not lote:
+            break
+        ultimo_id = lote[-1].pk
+
+        agregados = {
+            linha['carrinho_id']: linha
+            for linha in ItemCarrinho.objects.filter(
+                carrinho_id__in=[carrinho.pk for carrinho in lote]
+            ).values('carrinho_id').annotate(
+                subtotal=Sum(
+                    F('quantidade') * F('preco_unitario'),
+                    output_field=FloatField()
+                ),
+                quantidade_itens=Sum('quantidade'),
+            )
+        }
+
+        for carrinho in lote:
+            agregado = agregados.get(carrinho.pk, {})
+            carrinho.subtotal = agregado.get('subtotal') or 0.0
+            carrinho.quantidade_itens = agregado.get('quantidade_itens') or 0
+            custo_frete = carrinho.frete.custo_envio if carrinho.frete else 0.0
+            carrinho.total = carrinho.subtotal + custo_frete
+
+        CarrinhoDeCompras.objects.bulk_update(
+            lote, ['subtotal', 'quantidade_itens', 'total'],
+            batch_size=TAMANHO_LOTE
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrinho', '0006_carrinho_totais_incrementais'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_totais, migrations.RunPython.noop),
+    ]
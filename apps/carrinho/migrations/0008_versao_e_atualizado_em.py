@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrinho', '0007_preencher_totais_carrinho'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrinhodecompras',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='carrinhodecompras',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='produto',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='produto',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrinho', '0008_versao_e_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['nome', 'id'], name='produto_nome_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['preco', 'id'], name='produto_preco_id_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations
+
+# Índice FTS5 de conteúdo externo: guarda só os tokens e lê nome/descricao
+# de carrinho_produto. remove_diacritics 2 deixa "cafe" casar com "Café";
+# prefix='2 3' mantém índices auxiliares para buscas por prefixo curtas.
+CRIAR = [
+    """
+    CREATE VIRTUAL TABLE carrinho_produto_busca USING fts5(
+        nome, descricao,
+        content='carrinho_produto', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER carrinho_produto_busca_ai
+    AFTER INSERT ON carrinho_produto BEGIN
+        INSERT INTO carrinho_produto_busca(rowid, nome, descricao)
+        VALUES (new.id, new.nome, new.descricao);
+    END
+    """,
+    """
+    CREATE TRIGGER carrinho_produto_busca_ad
+    AFTER DELETE ON carrinho_produto BEGIN
+        INSERT INTO carrinho_produto_busca(
+            carrinho_produto_busca, rowid, nome, descricao
+        ) VALUES ('delete', old.id, old.nome, old.descricao);
+    END
+    """,
+    # Só dispara quando nome ou descricao estão no SET: os UPDATEs de
+    # estoque do carrinho não tocam o índice.
+    """
+    CREATE TRIGGER carrinho_produto_busca_au
+    AFTER UPDATE OF nome, descricao ON carrinho_produto BEGIN
+        INSERT INTO carrinho_produto_busca(
+            carrinho_produto_busca, rowid, nome, descricao
+        ) VALUES ('delete', old.id, old.nome, old.descricao);
+        INSERT INTO carrinho_produto_busca(rowid, nome, descricao)
+        VALUES (new.id, new.nome, new.descricao);
+    END
+    """,
+    "INSERT INTO carrinho_produto_busca(carrinho_produto_busca) VALUES ('rebuild')", # noqa E501
+]
+
+REMOVER = [
+    "DROP TRIGGER IF EXISTS carrinho_produto_busca_au",
+    "DROP TRIGGER IF EXISTS carrinho_produto_busca_ad",
+    "DROP TRIGGER IF EXISTS carrinho_produto_busca_ai",
+    "DROP TABLE IF EXISTS carrinho_produto_busca",
+]
+
+
+def executar(comandos):
+    def operacao(apps, schema_editor):
+        # FTS5 é do SQLite; em outros bancos a busca usa o fallback do
+        # manager.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in comandos:
+            schema_editor.execute(sql)
+    return operacao
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrinho', '0009_produto_indices_paginacao'),
+    ]
+
+    operations = [
+        migrations.RunPython(executar(CRIAR), executar(REMOVER)),
+    ]
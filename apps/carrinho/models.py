@@ -1,10 +1,38 @@
 from uuid import uuid4
 from django.db import models
+from django.utils import timezone
 from apps.pedidos.models import InformacaoEnvio
 from apps.perfil.models import Perfil
 
 
-class Produto(models.Model):
+class Versionado(models.Model):
+    """Versão e data de alteração, validadores de ETag e Last-Modified."""
+    versao = models.PositiveIntegerField(default=1, editable=False)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    @staticmethod
+    def alteracao():
+        # Para UPDATEs diretos, que não passam por save() nem por auto_now
+        return {
+            'versao': models.F('versao') + 1,
+            'atualizado_em': timezone.now(),
+        }
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None and not self._state.adding:
+            self.versao += 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {
+                *update_fields, 'versao', 'atualizado_em'
+            }
+        super().save(*args, **kwargs)
+
+
+class Produto(Versionado):
     num_produto = models.UUIDField(
         default=uuid4,
         editable=False,
@@ -18,12 +46,23 @@ class Produto(models.Model):
     class Meta:
         verbose_name = 'Produto'
         verbose_name_plural = 'Produtos'
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(estoque__gte=0),
+                name='produto_estoque_nao_negativo'
+            ),
+        ]
+        # Chaves da paginação keyset da listagem (ordenação + desempate)
+        indexes = [
+            models.Index(fields=['nome', 'id'], name='produto_nome_id_idx'),
+            models.Index(fields=['preco', 'id'], name='produto_preco_id_idx'),
+        ]
 
     def __str__(self):
         return f"Produto: {self.nome}"
 
 
-class CarrinhoDeCompras(models.Model):
+class CarrinhoDeCompras(Versionado):
     class StatusCarrinho(models.TextChoices):
         ATIVO = 'A', 'Ativo'
         FINALIZADO = 'F', 'Finalizado'
@@ -33,10 +72,6 @@ class CarrinhoDeCompras(models.Model):
         on_delete=models.CASCADE,
         related_name="carrinhos"
     )
-    itens = models.JSONField(
-        default=dict,
-        help_text="Estrutura: {'produto_id': {'nome': str, 'descricao': str, 'preco': float, 'quantidade': int}}" # noqa E501
-    )
     frete = models.ForeignKey(
         InformacaoEnvio,
         on_delete=models.CASCADE,
@@ -44,6 +79,11 @@ class CarrinhoDeCompras(models.Model):
         blank=True,
         null=True
     )
+    subtotal = models.FloatField(
+        default=0.0,
+        help_text="Soma das linhas, mantida incrementalmente a cada mudança."
+    )
+    quantidade_itens = models.IntegerField(default=0)
     total = models.FloatField(blank=True, null=True)
     status = models.CharField(
         max_length=1,
@@ -57,3 +97,57 @@ class CarrinhoDeCompras(models.Model):
 
     def __str__(self):
         return f"Carrinho {self.id} do cliente {self.cliente}"
+
+    @property
+    def itens(self):
+        """Linhas do carrinho no formato JSON legado, indexadas pelo UUID."""
+        if 'linhas' in getattr(self, '_prefetched_objects_cache', {}):
+            linhas = self.linhas.all()
+        else:
+            linhas = self.linhas.select_related('produto').order_by('id')
+
+        return {
+            str(linha.produto.num_produto): {
+                'nome': linha.produto.nome,
+                'descricao': linha.produto.descricao,
+                'preco': linha.preco_unitario,
+                'quantidade': linha.quantidade,
+                'subtotal': linha.subtotal,
+            }
+            for linha in linhas
+        }
+
+
+class ItemCarrinho(models.Model):
+    carrinho = models.ForeignKey(
+        CarrinhoDeCompras,
+        on_delete=models.CASCADE,
+        related_name="linhas"
+    )
+    produto = models.ForeignKey(
+        Produto,
+        on_delete=models.CASCADE,
+        related_name="itens_carrinho"
+    )
+    quantidade = models.PositiveIntegerField()
+    preco_unitario = models.FloatField(
+        help_text="Preço do produto no momento em que entrou no carrinho."
+    )
+
+    class Meta:
+        verbose_name = 'Item do Carrinho'
+        verbose_name_plural = 'Itens do Carrinho'
+        ordering = ('id',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['carrinho', 'produto'],
+                name='item_carrinho_produto_unico'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.quantidade}x {self.produto.nome} no carrinho {self.carrinho_id}" # noqa E501
+
+    @property
+    def subtotal(self):
+        return self.quantidade * self.preco_unitario
@@ -0,0 +1,25 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from api_carrinho.sinais import invalidar_agora_e_apos_commit
+from apps.carrinho.autocompletar import indice_autocompletar
+from apps.carrinho.cache import cache_catalogo
+from apps.carrinho.models import Produto
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_delete, sender=Produto)
+def invalidar_cache_catalogo(sender, **kwargs):
+    invalidar_agora_e_apos_commit(cache_catalogo.invalidar)
+
+
+@receiver(post_save, sender=Produto)
+def indexar_autocompletar(sender, instance, **kwargs):
+    # Só o estado confirmado entra no índice em memória
+    transaction.on_commit(lambda: indice_autocompletar.atualizar(instance))
+
+
+@receiver(post_delete, sender=Produto)
+def desindexar_autocompletar(sender, instance, **kwargs):
+    produto_id = instance.pk
+    transaction.on_commit(lambda: indice_autocompletar.remover(produto_id))
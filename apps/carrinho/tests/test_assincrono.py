@@ -0,0 +1,177 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from apps.carrinho.cache import cache_catalogo
+from apps.carrinho.models import CarrinhoDeCompras, ItemCarrinho, Produto
+from apps.pedidos.managers.managers_pedido import PedidoManager
+from apps.pedidos.models import InformacaoEnvio
+from apps.pedidos.sequencias import alocador_sequencias
+from apps.perfil.models import Perfil
+
+
+class VariantesAssincronasTest(TestCase):
+    """
+    As views async/... respondem o mesmo que as síncronas. As requisições
+    passam pelo AsyncClient (o caminho do ASGI): uma consulta síncrona
+    dentro do handler levantaria SynchronousOnlyOperation.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        cache_catalogo.invalidar()
+        alocador_sequencias.descartar()
+        self.addCleanup(alocador_sequencias.descartar)
+
+        self.user = User.objects.create_user(
+            username='assincrono', email='assincrono@example.com',
+            password='password123'
+        )
+        self.perfil = Perfil.objects.create(usuario=self.user)
+        self.token = Token.objects.create(user=self.user)
+        self.cabecalhos = {'Authorization': f'Token {self.token.key}'}
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.produtos = [
+            Produto.objects.create(
+                nome=f"Produto {i}", descricao="", preco=10.0 + i, estoque=5
+            )
+            for i in range(3)
+        ]
+        info_envio = InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio="Normal", custo_envio=10,
+            num_regiao_envio=4
+        )
+        for status_carrinho in CarrinhoDeCompras.StatusCarrinho.values:
+            carrinho = CarrinhoDeCompras.objects.create(
+                cliente=self.perfil, status=status_carrinho, frete=info_envio
+            )
+            ItemCarrinho.objects.create(
+                carrinho=carrinho, produto=self.produtos[0], quantidade=2,
+                preco_unitario=10.0
+            )
+        for quantidade in (1, 2, 3):
+            PedidoManager().criar_pedido(
+                num_pedido=alocador_sequencias.proximo('pedido'),
+                cliente=self.perfil, estado='SP', info_envio=info_envio,
+                detalhes=[{
+                    'num_produto': 1, 'nome_produto': "Produto 1",
+                    'quantidade': quantidade, 'custo_unidade': 5.0,
+                }]
+            )
+
+    async def _get(self, nome, args=(), parametros=None):
+        return await self.async_client.get(
+            reverse(nome, args=args), parametros, headers=self.cabecalhos
+        )
+
+    async def test_listagem_de_produtos(self):
+        response = await self._get('produtos-async', parametros={'tamanho': 2}) # noqa E501
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dados = response.json()
+        self.assertEqual(
+            [produto['nome'] for produto in dados['results']],
+            ["Produto 0", "Produto 1"]
+        )
+        # O cursor aponta para a própria variante assíncrona
+        self.assertIn('/async/produtos/', dados['next'])
+
+        response = await self.async_client.get(
+            dados['next'], headers=self.cabecalhos
+        )
+        self.assertEqual(
+            [produto['nome'] for produto in response.json()['results']],
+            ["Produto 2"]
+        )
+
+        # Segunda leitura da página sai do cache e responde 304 ao ETag
+        response = await self._get('produtos-async', parametros={'tamanho': 2}) # noqa E501
+        response = await self.async_client.get(
+            reverse('produtos-async'), {'tamanho': 2},
+            headers={**self.cabecalhos, 'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_detalhe_de_produto(self):
+        produto = self.produtos[1]
+        response = await self._get(
+            'produto-detail-async', args=[produto.num_produto]
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['nome'], "Produto 1")
+
+        response = await self._get(
+            'produto-detail-async',
+            args=['00000000-0000-0000-0000-000000000000']
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_autenticacao_obrigatoria(self):
+        response = await self.async_client.get(reverse('carrinhos-async'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_carrinho_ativo_e_finalizados(self):
+        response = await self._get('carrinhos-async')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        (carrinho,) = response.json()
+        self.assertEqual(carrinho['status'], 'A')
+        self.assertEqual(carrinho['frete_custo'], 10.0)
+        self.assertEqual(
+            list(carrinho['itens']), [str(self.produtos[0].num_produto)]
+        )
+
+        response = await self.async_client.get(
+            reverse('carrinhos-async'),
+            headers={**self.cabecalhos, 'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = await self._get('listar-carrinhos-finalizados-async')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [carrinho['status'] for carrinho in response.json()], ['F']
+        )
+
+    async def test_listagem_de_pedidos(self):
+        response = await self._get('pedidos-async', parametros={'tamanho': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dados = response.json()
+        self.assertEqual(
+            [
+                pedido['detalhes'][0]['quantidade']
+                for pedido in dados['results']
+            ],
+            [3, 2]
+        )
+        self.assertIn('/async/pedidos/', dados['next'])
+
+        response = await self._get('pedidos-async', parametros={'resumo': 1})
+        self.assertEqual(
+            [pedido['total'] for pedido in response.json()['results']],
+            [15.0, 10.0, 5.0]
+        )
+
+    def test_mesma_resposta_que_as_views_sincronas(self):
+        # Pelo cliente síncrono a corrotina roda com async_to_sync
+        for sincrona, assincrona, parametros in (
+            ('produtos', 'produtos-async', {'tamanho': 2}),
+            ('carrinhos', 'carrinhos-async', None),
+            ('listar-carrinhos-finalizados',
+             'listar-carrinhos-finalizados-async', None),
+            ('pedidos', 'pedidos-async', {'resumo': 1}),
+        ):
+            with self.subTest(assincrona):
+                esperado = self.client.get(reverse(sincrona), parametros)
+                obtido = self.client.get(reverse(assincrona), parametros)
+                self.assertEqual(obtido.status_code, esperado.status_code)
+                if 'results' in esperado.json():
+                    self.assertEqual(
+                        obtido.json()['results'], esperado.json()['results']
+                    )
+                else:
+                    self.assertEqual(obtido.json(), esperado.json())
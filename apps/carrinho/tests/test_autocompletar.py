@@ -0,0 +1,118 @@
+from io import StringIO
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from apps.carrinho.autocompletar import indice_autocompletar, normalizar
+from apps.carrinho.managers.manager_carrinho import CarrinhoManager
+from apps.carrinho.models import Produto
+from apps.perfil.models import Perfil
+
+
+class IndiceAutocompletarTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='autocompletar', email='autocompletar@example.com',
+            password='password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.camiseta = Produto.objects.create(
+            nome="Camiseta Algodão", descricao="", preco=50.0, estoque=50
+        )
+        self.caneca = Produto.objects.create(
+            nome="Caneca Térmica", descricao="", preco=30.0, estoque=50
+        )
+        self.cafe = Produto.objects.create(
+            nome="Café Moído", descricao="", preco=20.0, estoque=50
+        )
+
+        # Popularidade: unidades nos carrinhos
+        manager = CarrinhoManager()
+        carrinho = manager.criar_carrinho_vazio(
+            Perfil.objects.create(usuario=self.user)
+        )
+        manager.add_produto_carrinho(carrinho, self.cafe, 5)
+        manager.add_produto_carrinho(carrinho, self.caneca, 2)
+        indice_autocompletar.construir()
+
+    def nomes(self, prefixo, limite=None):
+        return [s['nome'] for s in indice_autocompletar.sugerir(prefixo, limite)] # noqa E501
+
+    def test_normaliza_acentos_caixa_e_espacos(self):
+        self.assertEqual(normalizar("  Café   MOÍDO "), "cafe moido")
+
+    def test_prefixo_curto_ordena_por_popularidade(self):
+        self.assertEqual(
+            self.nomes("ca"), ["Café Moído", "Caneca Térmica", "Camiseta Algodão"] # noqa E501
+        )
+        self.assertEqual(self.nomes("CA", limite=1), ["Café Moído"])
+
+    def test_prefixo_longo_e_palavra_do_meio(self):
+        self.assertEqual(self.nomes("camis"), ["Camiseta Algodão"])
+        self.assertEqual(self.nomes("termi"), ["Caneca Térmica"])
+        self.assertEqual(self.nomes("cafe mo"), ["Café Moído"])
+        self.assertEqual(self.nomes("xyz"), [])
+
+    def test_atualizacao_incremental_apos_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.camiseta.nome = "Camisa Polo"
+            self.camiseta.save()
+            Produto.objects.create(
+                nome="Caderno", descricao="", preco=10.0, estoque=1
+            )
+            self.caneca.delete()
+
+        self.assertEqual(self.nomes("cam"), ["Camisa Polo"])
+        self.assertEqual(self.nomes("alg"), [])
+        self.assertEqual(self.nomes("polo"), ["Camisa Polo"])
+        self.assertEqual(
+            self.nomes("ca"), ["Café Moído", "Caderno", "Camisa Polo"]
+        )
+        self.assertEqual(self.nomes("canec"), [])
+        self.assertEqual(indice_autocompletar.metricas()['reconstrucoes'], 1)
+
+    def test_consulta_nao_acessa_o_banco(self):
+        with self.assertNumQueries(0):
+            self.nomes("ca")
+            self.nomes("caneca t")
+
+    @override_settings(AUTOCOMPLETAR={'MEMORIA_MAXIMA_MB': 0.001})
+    def test_orcamento_de_memoria_mantem_os_mais_populares(self):
+        with self.assertLogs('apps.carrinho.autocompletar', 'WARNING'):
+            indice_autocompletar.construir()
+        metricas = indice_autocompletar.metricas()
+        self.assertTrue(metricas['truncado'])
+        self.assertEqual(metricas['produtos'], 1)
+        self.assertEqual(self.nomes("ca"), ["Café Moído"])
+
+    def test_comando_publica_nova_versao(self):
+        versao = indice_autocompletar.metricas()['versao']
+        saida = StringIO()
+        call_command('reconstruir_autocompletar', stdout=saida)
+        self.assertIn("produtos: 3", saida.getvalue())
+        self.assertNotEqual(indice_autocompletar.metricas()['versao'], versao)
+
+    def test_endpoint(self):
+        response = self.client.get(
+            reverse('produtos-autocompletar'), {'q': 'cane'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{
+            'num_produto': str(self.caneca.num_produto),
+            'nome': "Caneca Térmica",
+            'popularidade': 2,
+        }])
+
+    def test_limite_nao_positivo(self):
+        self.assertEqual(self.nomes("ca", limite=-2), ["Café Moído"])
+        response = self.client.get(
+            reverse('produtos-autocompletar'), {'q': 'ca', 'limite': -2}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
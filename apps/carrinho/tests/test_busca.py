@@ -0,0 +1,116 @@
+from io import StringIO
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from apps.carrinho.busca import TABELA_BUSCA, buscar_produtos, montar_consulta
+from apps.carrinho.models import Produto
+
+
+class BuscaProdutosTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='busca', email='busca@example.com',
+            password='password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.cafe = Produto.objects.create(
+            nome="Café Torrado", descricao="Grãos selecionados",
+            preco=20.0, estoque=5
+        )
+        self.caneca = Produto.objects.create(
+            nome="Caneca", descricao="Ideal para café",
+            preco=30.0, estoque=5
+        )
+        self.camiseta = Produto.objects.create(
+            nome="Camiseta Algodão", descricao="", preco=50.0, estoque=5
+        )
+
+    def nomes(self, termo, limite=20):
+        return [p.nome for p in buscar_produtos(termo, limite)]
+
+    def test_ignora_acentos_e_ordena_por_relevancia(self):
+        # O nome pesa mais que a descrição
+        self.assertEqual(self.nomes("cafe"), ["Café Torrado", "Caneca"])
+        self.assertEqual(self.nomes("ALGODAO"), ["Camiseta Algodão"])
+
+    def test_busca_por_prefixo_com_todas_as_palavras(self):
+        self.assertEqual(
+            set(self.nomes("ca")), {"Café Torrado", "Caneca", "Camiseta Algodão"} # noqa E501
+        )
+        self.assertEqual(self.nomes("cam alg"), ["Camiseta Algodão"])
+
+    def test_operadores_e_pontuacao_sao_neutralizados(self):
+        self.assertEqual(montar_consulta('café" OR NEAR(x'), '"café"* "OR"* "NEAR"*') # noqa E501
+        self.assertEqual(self.nomes('"torrado*'), ["Café Torrado"])
+        self.assertEqual(montar_consulta("a e o"), "")
+
+    def test_indice_acompanha_alteracao_e_exclusao(self):
+        self.caneca.nome = "Xícara"
+        self.caneca.save()
+        self.camiseta.delete()
+
+        self.assertEqual(self.nomes("xicara"), ["Xícara"])
+        self.assertEqual(self.nomes("caneca"), [])
+        self.assertEqual(self.nomes("camiseta"), [])
+
+    def test_trigger_de_update_ignora_estoque(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE name = %s",
+                [f'{TABELA_BUSCA}_au']
+            )
+            self.assertIn('UPDATE OF nome, descricao', cursor.fetchone()[0])
+
+    def test_comando_reconstroi_indice_e_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {TABELA_BUSCA}_ai")
+            cursor.execute(
+                f"INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}) VALUES ('delete-all')" # noqa E501
+            )
+        self.assertEqual(self.nomes("cafe"), [])
+
+        saida = StringIO()
+        call_command('reconstruir_busca_produtos', stdout=saida)
+        self.assertIn("3 produtos", saida.getvalue())
+        self.assertEqual(self.nomes("cafe"), ["Café Torrado", "Caneca"])
+
+        Produto.objects.create(
+            nome="Cafeteira", descricao="", preco=90.0, estoque=1
+        )
+        self.assertIn("Cafeteira", self.nomes("cafet"))
+
+    def test_endpoint_de_busca(self):
+        response = self.client.get(
+            reverse('produtos-busca'), {'q': 'café', 'limite': 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [p['nome'] for p in response.data], ["Café Torrado"]
+        )
+
+        response = self.client.get(reverse('produtos-busca'), {'q': ' '})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_limite_invalido(self):
+        for limite in (0, -1, 'x'):
+            response = self.client.get(
+                reverse('produtos-busca'), {'q': 'café', 'limite': limite}
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+
+        # Acima do máximo, o limite é reduzido a ele
+        response = self.client.get(
+            reverse('produtos-busca'), {'q': 'café', 'limite': 1000}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,98 @@
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from apps.carrinho.cache import cache_catalogo
+from apps.carrinho.models import Produto
+
+
+class CacheCatalogoTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='catalogo', email='catalogo@example.com',
+            password='password123', is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.produto = Produto.objects.create(
+            nome="Produto Cache", descricao="", preco=10.0, estoque=7
+        )
+        # Zera também o histórico do throttling (100/dia por usuário)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        cache_catalogo.invalidar()
+
+    def test_segunda_leitura_nao_consulta_o_banco(self):
+        url = reverse('produto-detail', args=[self.produto.num_produto])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['nome'], "Produto Cache")
+
+    def test_alteracao_pela_api_invalida_o_cache(self):
+        url = reverse('produto-detail', args=[self.produto.num_produto])
+        self.client.get(reverse('produtos'))
+        self.client.get(url)
+
+        response = self.client.put(url, {
+            'nome': "Produto Renomeado", 'descricao': "",
+            'preco': 12.0, 'estoque': 7
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(
+            self.client.get(url).data['nome'], "Produto Renomeado"
+        )
+        self.assertEqual(
+            self.client.get(reverse('produtos')).data['results'][0]['nome'],
+            "Produto Renomeado"
+        )
+
+    def test_exclusao_pela_api_invalida_o_cache(self):
+        url = reverse('produto-detail', args=[self.produto.num_produto])
+        self.client.get(url)
+        self.client.delete(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(CATALOGO_CACHE={'ESTOQUE_TTL': 0})
+    def test_estoque_vencido_e_relido_sem_invalidar(self):
+        url = reverse('produto-detail', args=[self.produto.num_produto])
+        self.client.get(url)
+        # UPDATE direto, como no add-to-cart: não dispara sinais
+        Produto.objects.filter(pk=self.produto.pk).update(estoque=3)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data['estoque'], 3)
+        self.assertEqual(cache_catalogo.metricas()['estoque_recarregado'], 1)
+
+    @override_settings(CATALOGO_CACHE={'MAX_ENTRADAS': 1})
+    def test_lru_despeja_entrada_mais_antiga(self):
+        outro = Produto.objects.create(
+            nome="Outro", descricao="", preco=1.0, estoque=1
+        )
+        cache_catalogo.invalidar()
+        despejos = cache_catalogo.metricas()['despejos']
+
+        self.client.get(
+            reverse('produto-detail', args=[self.produto.num_produto])
+        )
+        self.client.get(reverse('produto-detail', args=[outro.num_produto]))
+
+        metricas = cache_catalogo.metricas()
+        self.assertEqual(metricas['despejos'], despejos + 1)
+        self.assertEqual(metricas['entradas'], 1)
+
+    def test_metricas_apenas_para_administradores(self):
+        response = self.client.get(reverse('produtos-cache'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('taxa_acerto', response.data)
+
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get(reverse('produtos-cache'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
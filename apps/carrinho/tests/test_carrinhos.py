@@ -1,11 +1,16 @@
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.urls import reverse
-from apps.carrinho.models import Produto, CarrinhoDeCompras
+from apps.carrinho.managers.manager_carrinho import CarrinhoManager
+from apps.carrinho.models import Produto, CarrinhoDeCompras, ItemCarrinho
 from apps.perfil.models import Endereco, Perfil
-from apps.pedidos.models import InformacaoEnvio
+from apps.pedidos.frete import resolvedor_frete
+from apps.pedidos.models import InformacaoEnvio, Pedido, ResumoCliente
+from apps.pedidos.sequencias import alocador_sequencias
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 
 class BaseTestCase(TestCase):
@@ -55,7 +60,6 @@ class CarrinhoAPIViewTest(BaseTestCase):
         )
         self.carrinho = CarrinhoDeCompras.objects.create(
             cliente=self.perfil,
-            itens={},
             total=0.0,
             status=CarrinhoDeCompras.StatusCarrinho.ATIVO
         )
@@ -108,33 +112,382 @@ class CarrinhoAPIViewTest(BaseTestCase):
         esperado_total = quantidade * self.produto.preco + self.informacao_envio.custo_envio # noqa E501
         self.assertEqual(response.data['carrinho']['total'], esperado_total)
 
-    def test_remover_produto_do_carrinho(self):
-        self.carrinho.itens = {
-            str(self.produto.nome): {
-                "nome": self.produto.nome,
-                "descricao": self.produto.descricao,
-                "preco": self.produto.preco,
-                "quantidade": 2
-            }
-        }
+    def _preparar_carrinho_com_linhas(self, quantidade_linhas):
+        self.informacao_envio.num_regiao_envio = 4
+        self.informacao_envio.save()
+        self.carrinho.frete = self.informacao_envio
         self.carrinho.save()
+        resolvedor_frete.resolver('SP')
+        for i in range(quantidade_linhas):
+            produto = Produto.objects.create(
+                nome=f"Outro {i}", preco=1.0, estoque=5
+            )
+            ItemCarrinho.objects.create(
+                carrinho=self.carrinho, produto=produto,
+                quantidade=1, preco_unitario=produto.preco
+            )
+
+    def _url_adicionar(self, quantidade=1):
+        return reverse(
+            'adicionar-produto-carrinho',
+            kwargs={
+                "num_produto": str(self.produto.num_produto),
+                "quantidade": quantidade
+            }
+        )
+
+    def test_adicionar_produto_orcamento_de_consultas(self):
+        # 3 leituras + 3 escritas, mais SAVEPOINT/RELEASE da transação
+        self._preparar_carrinho_com_linhas(20)
+        self.client.post(self._url_adicionar(), format='json')
+
+        with self.assertNumQueries(8):
+            response = self.client.post(self._url_adicionar(), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_adicionar_produto_novo_orcamento_de_consultas(self):
+        # Linha nova: o mesmo upsert da linha existente, sem SAVEPOINT extra
+        self._preparar_carrinho_com_linhas(20)
+
+        with self.assertNumQueries(8):
+            response = self.client.post(self._url_adicionar(), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['carrinho']['itens']), 21)
+
+    def test_remover_produto_do_carrinho(self):
+        ItemCarrinho.objects.create(
+            carrinho=self.carrinho,
+            produto=self.produto,
+            quantidade=2,
+            preco_unitario=self.produto.preco
+        )
 
         url = reverse(
             'remover-produto-carrinho',
             kwargs={"nome": self.produto.nome}
         )
         response = self.client.delete(url, format='json')
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.carrinho.refresh_from_db()
         self.assertEqual(
-            self.carrinho.itens[str(self.produto.nome)]['quantidade'], 2
+            self.carrinho.itens[str(self.produto.num_produto)]['quantidade'], 1
+        )
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 11)
+
+    def test_remover_produto_ausente_do_carrinho(self):
+        url = reverse(
+            'remover-produto-carrinho',
+            kwargs={"nome": self.produto.nome}
+        )
+        response = self.client.delete(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_remover_produto_pelo_uuid(self):
+        ItemCarrinho.objects.create(
+            carrinho=self.carrinho,
+            produto=self.produto,
+            quantidade=3,
+            preco_unitario=self.produto.preco
         )
 
-    def test_finalizar_carrinho(self):
+        url = reverse(
+            'remover-produto-carrinho-uuid',
+            kwargs={"num_produto": self.produto.num_produto}
+        )
+        response = self.client.delete(f"{url}?quantidade=2", format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['removido'], 2)
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 12)
+
+        # Pedir mais do que há na linha remove só o que existe
+        response = self.client.delete(f"{url}?quantidade=5", format='json')
+        self.assertEqual(response.data['removido'], 1)
+        self.assertFalse(ItemCarrinho.objects.exists())
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 13)
+
+        response = self.client.delete(f"{url}?quantidade=0", format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_remover_por_nome_repetido_pede_o_uuid(self):
+        homonimo = Produto.objects.create(
+            nome=self.produto.nome, preco=1.0, estoque=1
+        )
+        for produto in (self.produto, homonimo):
+            ItemCarrinho.objects.create(
+                carrinho=self.carrinho, produto=produto,
+                quantidade=1, preco_unitario=produto.preco
+            )
+
+        url = reverse(
+            'remover-produto-carrinho',
+            kwargs={"nome": self.produto.nome}
+        )
+        response = self.client.delete(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ItemCarrinho.objects.count(), 2)
+
+    def test_finalizar_carrinho_so_pelo_checkout(self):
         url = reverse('atualizar-status-carrinho')
         response = self.client.patch(url, data={"status": "F"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('checkout', response.data['detail'])
+        self.carrinho.refresh_from_db()
+        self.assertEqual(
+            self.carrinho.status, CarrinhoDeCompras.StatusCarrinho.ATIVO
+        )
+
+
+class CarrinhoComprasLoteAPIViewTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.perfil = Perfil.objects.create(usuario=self.user)
+        Endereco.objects.create(
+            perfil=self.perfil, estado='SP', cidade='São Paulo',
+            rua='Rua Teste', numero='123', cep='01234-567'
+        )
+        self.frete = InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio="Entrega Normal", custo_envio=10,
+            num_regiao_envio=4
+        )
+        self.produtos = [
+            Produto.objects.create(
+                nome=f"Produto {i}", preco=10.0 * (i + 1), estoque=5
+            )
+            for i in range(3)
+        ]
+        self.carrinho = CarrinhoDeCompras.objects.create(
+            cliente=self.perfil, total=0.0
+        )
+        self.url = reverse('adicionar-produtos-carrinho')
+
+    def _item(self, produto, quantidade):
+        return {
+            "num_produto": str(produto.num_produto),
+            "quantidade": quantidade
+        }
+
+    def test_adicionar_varios_produtos(self):
+        ItemCarrinho.objects.create(
+            carrinho=self.carrinho, produto=self.produtos[0],
+            quantidade=1, preco_unitario=10.0
+        )
+        data = {"itens": [
+            self._item(produto, 2) for produto in self.produtos
+        ]}
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            all(r['adicionado'] for r in response.data['resultados'])
+        )
+        self.carrinho.refresh_from_db()
+        self.assertEqual(self.carrinho.quantidade_itens, 6)
+        self.assertEqual(self.carrinho.subtotal, 120.0)
+        self.assertEqual(self.carrinho.total, 130.0)
+        self.assertEqual(
+            self.carrinho.itens[str(self.produtos[0].num_produto)]['quantidade'], # noqa E501
+            3
+        )
+        self.assertEqual(
+            set(Produto.objects.values_list('estoque', flat=True)), {3}
+        )
+
+    def test_resultado_por_linha_com_falhas(self):
+        data = {"itens": [
+            self._item(self.produtos[0], 1),
+            self._item(self.produtos[1], 50),
+            {"num_produto": "2edc82f1-5ec4-493d-b29f-6786cd0e67e7",
+             "quantidade": 1},
+        ]}
+        response = self.client.post(self.url, data, format='json')
+
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        adicionados = [r['adicionado'] for r in response.data['resultados']]
+        self.assertEqual(adicionados, [True, False, False])
+        self.assertIn(
+            "Estoque insuficiente", response.data['resultados'][1]['detail']
+        )
+        self.produtos[1].refresh_from_db()
+        self.assertEqual(self.produtos[1].estoque, 5)
+
+    def test_tudo_ou_nada_desfaz_o_lote(self):
+        data = {
+            "itens": [
+                self._item(self.produtos[0], 1),
+                self._item(self.produtos[1], 50),
+            ],
+            "tudo_ou_nada": True,
+        }
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.produtos[0].refresh_from_db()
+        self.assertEqual(self.produtos[0].estoque, 5)
+        self.assertFalse(ItemCarrinho.objects.exists())
+
+    def test_consultas_nao_crescem_com_as_linhas(self):
+        # Só o decremento de estoque é feito por produto
+        self.carrinho.frete = self.frete
+        self.carrinho.save()
+        resolvedor_frete.resolver('SP')
+        novos = [
+            Produto.objects.create(nome=f"Novo {i}", preco=1.0, estoque=5)
+            for i in range(4)
+        ]
+
+        def consultas(produtos):
+            data = {"itens": [self._item(p, 1) for p in produtos]}
+            with CaptureQueriesContext(connection) as contexto:
+                response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(contexto.captured_queries)
+
+        self.assertEqual(consultas(novos[3:]) + 2, consultas(novos[:3]))
+
+    def test_remover_varios_produtos(self):
+        manager = CarrinhoManager()
+        for produto in self.produtos:
+            manager.add_produto_carrinho(self.carrinho, produto, 3)
+        data = {"itens": [
+            self._item(self.produtos[0], 1),
+            {"num_produto": str(self.produtos[1].num_produto)},
+            self._item(self.produtos[0], 1),
+            {"num_produto": "2edc82f1-5ec4-493d-b29f-6786cd0e67e7"},
+        ]}
+        response = self.client.post(
+            reverse('remover-produtos-carrinho'), data, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        removidos = [r['removido'] for r in response.data['resultados']]
+        self.assertEqual(removidos, [2, 3, 0])
+        self.carrinho.refresh_from_db()
+        self.assertEqual(self.carrinho.quantidade_itens, 4)
+        self.assertEqual(self.carrinho.subtotal, 10.0 + 90.0)
+        self.assertEqual(
+            list(Produto.objects.order_by('nome').values_list('estoque', flat=True)), # noqa E501
+            [4, 5, 2]
+        )
+
+    def test_remocao_em_lote_nao_cresce_com_as_linhas(self):
+        manager = CarrinhoManager()
+        for produto in self.produtos:
+            manager.add_produto_carrinho(self.carrinho, produto, 1)
+        url = reverse('remover-produtos-carrinho')
+
+        def consultas(produtos):
+            data = {"itens": [
+                {"num_produto": str(p.num_produto)} for p in produtos
+            ]}
+            with CaptureQueriesContext(connection) as contexto:
+                response = self.client.post(url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(contexto.captured_queries)
+
+        self.assertEqual(
+            consultas(self.produtos[:1]), consultas(self.produtos[1:])
+        )
+
+
+class FinalizarCompraAPIViewTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.perfil = Perfil.objects.create(usuario=self.user)
+        Endereco.objects.create(
+            perfil=self.perfil, estado='SP', cidade='São Paulo',
+            rua='Rua Teste', numero='123', cep='01234-567'
+        )
+        self.frete = InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio="Entrega Normal", custo_envio=10,
+            num_regiao_envio=4
+        )
+        self.manager = CarrinhoManager()
+        self.carrinho = self.manager.criar_carrinho_vazio(self.perfil)
+        self.url = reverse('finalizar-compra')
+
+    def _adicionar(self, quantidade):
+        produtos = [
+            Produto.objects.create(
+                nome=f"Produto {i}", preco=10.0 * (i + 1), estoque=5
+            )
+            for i in range(quantidade)
+        ]
+        self.manager.add_produtos_carrinho(
+            self.carrinho, {p.num_produto: 2 for p in produtos}
+        )
+        return produtos
+
+    def test_cria_pedido_com_as_linhas_do_carrinho(self):
+        produtos = self._adicionar(3)
+        response = self.client.post(self.url, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['num_pedido'], 1)
+        self.assertEqual(response.data['info_envio'], self.frete.pk)
+        self.assertEqual(
+            [
+                (d['num_produto'], d['quantidade'], d['subtotal'])
+                for d in response.data['detalhes']
+            ],
+            [(p.pk, 2, 2 * p.preco) for p in produtos]
+        )
+
+        pedido = Pedido.objects.get()
+        self.assertEqual(pedido.cliente, self.perfil)
+        self.assertEqual(pedido.estado, 'SP')
         self.carrinho.refresh_from_db()
         self.assertEqual(
             self.carrinho.status, CarrinhoDeCompras.StatusCarrinho.FINALIZADO
         )
+        self.assertEqual(self.carrinho.total, 120.0 + 10)
+        # O estoque foi reservado ao adicionar; o checkout não o altera
+        self.assertEqual(
+            set(Produto.objects.values_list('estoque', flat=True)), {3}
+        )
+
+        # Não há mais carrinho ativo para finalizar
+        response = self.client.post(self.url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Pedido.objects.count(), 1)
+
+    def test_carrinho_vazio_nao_gera_pedido(self):
+        response = self.client.post(self.url, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Pedido.objects.exists())
+        self.carrinho.refresh_from_db()
+        self.assertEqual(
+            self.carrinho.status, CarrinhoDeCompras.StatusCarrinho.ATIVO
+        )
+
+    def test_consultas_nao_crescem_com_as_linhas(self):
+        # Tabela de frete, contador de pedidos e resumo do cliente já
+        # criados
+        resolvedor_frete.resolver('SP')
+        alocador_sequencias.proximo('pedido')
+        ResumoCliente.objects.create(cliente=self.perfil)
+
+        def consultas(linhas):
+            Pedido.objects.all().delete()
+            CarrinhoDeCompras.objects.filter(pk=self.carrinho.pk).update(
+                status=CarrinhoDeCompras.StatusCarrinho.ATIVO
+            )
+            ItemCarrinho.objects.all().delete()
+            self._adicionar(linhas)
+            with CaptureQueriesContext(connection) as contexto:
+                response = self.client.post(self.url, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(response.data['detalhes']), linhas)
+            return len(contexto.captured_queries)
+
+        self.assertEqual(consultas(1), consultas(40))
+
+    def test_status_invalido(self):
+        response = self.client.patch(
+            reverse('atualizar-status-carrinho'), {"status": "X"},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
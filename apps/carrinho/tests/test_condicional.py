@@ -0,0 +1,141 @@
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from apps.carrinho.cache import cache_catalogo
+from apps.carrinho.managers.manager_carrinho import CarrinhoManager
+from apps.carrinho.models import Produto
+from apps.perfil.models import Perfil
+
+
+class BaseTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='condicional', email='condicional@example.com',
+            password='password123', is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.produto = Produto.objects.create(
+            nome="Produto Condicional", descricao="", preco=10.0, estoque=20
+        )
+        # Zera também o histórico do throttling (100/dia por usuário)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        cache_catalogo.invalidar()
+
+
+class CatalogoCondicionalTest(BaseTestCase):
+    def test_if_none_match_responde_304_sem_consulta(self):
+        url = reverse('produto-detail', args=[self.produto.num_produto])
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_alteracao_muda_o_etag(self):
+        url = reverse('produtos')
+        etag = self.client.get(url)['ETag']
+
+        self.produto.preco = 11.0
+        self.produto.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_304_numa_falha_sem_ler_a_pagina_inteira(self):
+        url = reverse('produtos')
+        etag = self.client.get(url)['ETag']
+        cache_catalogo.invalidar()
+
+        # Só a consulta leve da página, sem serialização nem cache
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cache_catalogo.metricas()['entradas'], 0)
+
+        # O corpo montado depois tem o mesmo validador
+        self.assertEqual(self.client.get(url)['ETag'], etag)
+
+    def test_pagina_que_ganha_next_muda_o_etag(self):
+        url = reverse('produtos') + '?tamanho=1'
+        response = self.client.get(url)
+        self.assertIsNone(response.data['next'])
+
+        Produto.objects.create(
+            nome="Produto Novo", descricao="", preco=1.0, estoque=1
+        )
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.data['next'])
+
+    @override_settings(CATALOGO_CACHE={'ESTOQUE_TTL': 0})
+    def test_reserva_de_estoque_muda_o_etag(self):
+        url = reverse('produto-detail', args=[self.produto.num_produto])
+        etag = self.client.get(url)['ETag']
+
+        CarrinhoManager().reservar_estoque(self.produto, 1)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['estoque'], 19)
+        self.assertEqual(response.data['versao'], 2)
+
+    def test_if_modified_since(self):
+        url = reverse('produto-detail', args=[self.produto.num_produto])
+        ultima_alteracao = self.client.get(url)['Last-Modified']
+
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=ultima_alteracao
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class CarrinhoCondicionalTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.perfil = Perfil.objects.create(usuario=self.user)
+        self.manager = CarrinhoManager()
+        self.carrinho = self.manager.criar_carrinho_vazio(self.perfil)
+        self.manager.add_produto_carrinho(self.carrinho, self.produto, 1)
+
+    def test_304_antes_de_carregar_as_linhas(self):
+        url = reverse('carrinhos')
+        response = self.client.get(url)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        # Perfil e validador; nenhuma consulta de linhas ou produtos
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_mudanca_nas_linhas_muda_o_etag(self):
+        url = reverse('carrinhos')
+        etag = self.client.get(url)['ETag']
+
+        self.manager.add_produto_carrinho(self.carrinho, self.produto, 1)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_produto_renomeado_muda_o_etag(self):
+        url = reverse('carrinhos')
+        etag = self.client.get(url)['ETag']
+
+        self.produto.nome = "Produto Renomeado"
+        self.produto.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item = response.data[0]['itens'][str(self.produto.num_produto)]
+        self.assertEqual(item['nome'], "Produto Renomeado")
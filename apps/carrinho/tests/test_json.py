@@ -0,0 +1,91 @@
+import datetime
+import decimal
+import io
+import json
+import uuid
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnList
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils.translation import gettext_lazy
+from api_carrinho.renderers import OrjsonParser, OrjsonRenderer
+from apps.carrinho.api.serializers import ProdutoSerializer
+from apps.carrinho.models import Produto
+
+
+class OrjsonRendererTest(SimpleTestCase):
+    def test_mesmo_conteudo_do_renderer_do_drf(self):
+        dados = ReturnList([{
+            'num_produto': uuid.UUID('2edc82f1-5ec4-493d-b29f-6786cd0e67e7'),
+            'criado_em': datetime.datetime(
+                2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc
+            ),
+            'dia': datetime.date(2024, 5, 1),
+            'preco': decimal.Decimal('19.90'),
+            'detail': gettext_lazy("Não encontrado."),
+            'itens': {1: 'chave inteira'},
+        }], serializer=None)
+
+        renderizado = OrjsonRenderer().render(dados)
+        self.assertEqual(
+            json.loads(renderizado),
+            json.loads(JSONRenderer().render(
+                [{**dados[0], 'itens': {'1': 'chave inteira'}}]
+            ))
+        )
+        self.assertIn(b'"2024-05-01T12:30:15.123456Z"', renderizado)
+        self.assertIn("Não".encode(), renderizado)
+
+    def test_indentacao_e_corpo_vazio(self):
+        renderer = OrjsonRenderer()
+        self.assertEqual(
+            renderer.render({'a': 1}, 'application/json; indent=4'),
+            b'{\n  "a": 1\n}'
+        )
+        self.assertEqual(renderer.render(None), b'')
+
+    def test_parser(self):
+        parser = OrjsonParser()
+        self.assertEqual(
+            parser.parse(io.BytesIO('{"nome": "Café"}'.encode())),
+            {'nome': "Café"}
+        )
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"nome": '))
+
+
+class OrjsonEndpointTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='json', email='json@example.com', password='password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_listagem_usa_o_renderer_configurado(self):
+        produto = Produto.objects.create(
+            nome="Café", descricao="", preco=20.0, estoque=5
+        )
+        response = self.client.get(reverse('produtos'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.accepted_renderer, OrjsonRenderer)
+        self.assertEqual(
+            response.json()['results'],
+            json.loads(json.dumps(ProdutoSerializer([produto], many=True).data)) # noqa E501
+        )
+
+    def test_json_invalido_responde_400(self):
+        response = self.client.post(
+            reverse('adicionar-produtos-carrinho'), '{"itens": [',
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("JSON parse error", response.json()['detail'])
@@ -0,0 +1,123 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import DatabaseError, IntegrityError, transaction
+from django.test import TestCase
+from apps.carrinho.managers.manager_carrinho import CarrinhoManager
+from apps.carrinho.models import CarrinhoDeCompras, Produto
+from apps.pedidos.models import InformacaoEnvio
+from apps.perfil.models import Perfil
+
+
+class CarrinhoManagerEstoqueTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='estoque', email='estoque@example.com',
+            password='password123'
+        )
+        self.perfil = Perfil.objects.create(usuario=self.user)
+        self.produto = Produto.objects.create(
+            nome="Produto Estoque", descricao="", preco=10.0, estoque=5
+        )
+        self.manager = CarrinhoManager()
+        self.carrinho = self.manager.criar_carrinho_vazio(self.perfil)
+
+    def test_reservar_estoque_decrementa_no_banco(self):
+        self.assertTrue(self.manager.reservar_estoque(self.produto, 3))
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 2)
+
+    def test_reservar_estoque_insuficiente_nao_altera(self):
+        self.assertFalse(self.manager.reservar_estoque(self.produto, 6))
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 5)
+
+    def test_reserva_usa_estoque_do_banco_e_nao_da_instancia(self):
+        # Outra requisição consumiu o estoque depois da leitura
+        Produto.objects.filter(pk=self.produto.pk).update(estoque=1)
+        with self.assertRaises(ValueError):
+            self.manager.add_produto_carrinho(
+                self.carrinho, self.produto, 2
+            )
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 1)
+
+    def test_adicionar_mesmo_produto_acumula_quantidade(self):
+        self.manager.add_produto_carrinho(self.carrinho, self.produto, 1)
+        self.manager.add_produto_carrinho(self.carrinho, self.produto, 2)
+        self.carrinho.refresh_from_db()
+        item = self.carrinho.itens[str(self.produto.num_produto)]
+        self.assertEqual(item['quantidade'], 3)
+        self.assertEqual(item['subtotal'], 30.0)
+
+    def test_falha_ao_gravar_carrinho_desfaz_reserva(self):
+        with mock.patch.object(
+            CarrinhoManager, 'aplicar_delta', side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                self.manager.add_produto_carrinho(
+                    self.carrinho, self.produto, 2
+                )
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 5)
+
+    def test_constraint_impede_estoque_negativo(self):
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Produto.objects.filter(pk=self.produto.pk).update(estoque=-1)
+
+
+class CarrinhoManagerTotaisTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='totais', email='totais@example.com',
+            password='password123'
+        )
+        self.perfil = Perfil.objects.create(usuario=self.user)
+        self.produto = Produto.objects.create(
+            nome="Produto Totais", descricao="", preco=10.0, estoque=50
+        )
+        self.frete = InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio="Normal", custo_envio=15,
+            num_regiao_envio=4
+        )
+        self.manager = CarrinhoManager()
+        self.carrinho = self.manager.criar_carrinho_vazio(self.perfil)
+
+    def test_totais_acompanham_adicao_e_remocao(self):
+        self.manager.add_produto_carrinho(
+            self.carrinho, self.produto, 3, self.frete
+        )
+        self.manager.remover_produtos_carrinho(
+            self.carrinho, {self.produto.num_produto: 1}
+        )
+
+        self.carrinho.refresh_from_db()
+        self.assertEqual(self.carrinho.subtotal, 20.0)
+        self.assertEqual(self.carrinho.quantidade_itens, 2)
+        self.assertEqual(self.carrinho.total, 35.0)
+        self.assertEqual(self.manager.recalcular(self.carrinho), {})
+
+    def test_delta_usa_preco_do_snapshot(self):
+        self.manager.add_produto_carrinho(self.carrinho, self.produto, 1)
+        self.produto.preco = 12.0
+        self.produto.save()
+        self.manager.add_produto_carrinho(self.carrinho, self.produto, 1)
+
+        self.carrinho.refresh_from_db()
+        self.assertEqual(self.carrinho.subtotal, 20.0)
+        self.assertEqual(self.manager.recalcular(self.carrinho), {})
+
+    def test_recalcular_detecta_e_corrige_divergencia(self):
+        self.manager.add_produto_carrinho(
+            self.carrinho, self.produto, 2, self.frete
+        )
+        CarrinhoDeCompras.objects.filter(pk=self.carrinho.pk).update(
+            subtotal=999.0
+        )
+        self.carrinho.refresh_from_db()
+
+        divergencias = self.manager.recalcular(self.carrinho, corrigir=True)
+        self.assertEqual(divergencias['subtotal'], (999.0, 20.0))
+        self.carrinho.refresh_from_db()
+        self.assertEqual(self.carrinho.subtotal, 20.0)
+        self.assertEqual(self.carrinho.total, 35.0)
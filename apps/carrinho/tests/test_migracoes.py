@@ -0,0 +1,54 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MigracaoItensCarrinhoTest(TransactionTestCase):
+    antes = [('carrinho', '0003_itemcarrinho')]
+    depois = [('carrinho', '0005_remove_carrinhodecompras_itens')]
+
+    def migrar(self, alvo):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(alvo)
+        return executor.loader.project_state(alvo).apps
+
+    def tearDown(self):
+        self.migrar(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_itens_json_viram_linhas(self):
+        apps = self.migrar(self.antes)
+        User = apps.get_model('auth', 'User')
+        Perfil = apps.get_model('perfil', 'Perfil')
+        Produto = apps.get_model('carrinho', 'Produto')
+        CarrinhoDeCompras = apps.get_model('carrinho', 'CarrinhoDeCompras')
+
+        perfil = Perfil.objects.create(
+            usuario=User.objects.create(username='legado')
+        )
+        produto = Produto.objects.create(
+            nome='Legado', descricao='', preco=5.0, estoque=1
+        )
+        outro = Produto.objects.create(
+            nome='Por id', descricao='', preco=2.0, estoque=1
+        )
+        carrinho = CarrinhoDeCompras.objects.create(
+            cliente=perfil,
+            itens={
+                str(produto.num_produto): {'preco': 4.5, 'quantidade': 2},
+                str(outro.id): {'preco': 2.0, 'quantidade': 1},
+                'Produto removido': {'preco': 1.0, 'quantidade': 3},
+            },
+        )
+
+        apps = self.migrar(self.depois)
+        ItemCarrinho = apps.get_model('carrinho', 'ItemCarrinho')
+        linhas = {
+            linha.produto_id: linha
+            for linha in ItemCarrinho.objects.filter(carrinho_id=carrinho.pk)
+        }
+
+        self.assertEqual(set(linhas), {produto.pk, outro.pk})
+        self.assertEqual(linhas[produto.pk].quantidade, 2)
+        self.assertEqual(linhas[produto.pk].preco_unitario, 4.5)
+        self.assertEqual(linhas[outro.pk].quantidade, 1)
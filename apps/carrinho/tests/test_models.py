@@ -1,7 +1,8 @@
+from django.db import IntegrityError
 from django.test import TestCase
 from apps.perfil.models import Perfil
 from apps.pedidos.models import InformacaoEnvio
-from apps.carrinho.models import Produto, CarrinhoDeCompras
+from apps.carrinho.models import Produto, CarrinhoDeCompras, ItemCarrinho
 from django.contrib.auth.models import User
 
 
@@ -40,18 +41,16 @@ class ProdutoCarrinhoTestCase(TestCase):
         # Criar um carrinho de compras
         self.carrinho = CarrinhoDeCompras.objects.create(
             cliente=self.perfil,
-            itens={
-                str(self.produto.id): {
-                    "nome": self.produto.nome,
-                    "descricao": self.produto.descricao,
-                    "preco": self.produto.preco,
-                    "quantidade": 2
-                }
-            },
             frete=self.informacao_envio,
             total=self.produto.preco * 2,
             status=CarrinhoDeCompras.StatusCarrinho.ATIVO
         )
+        ItemCarrinho.objects.create(
+            carrinho=self.carrinho,
+            produto=self.produto,
+            quantidade=2,
+            preco_unitario=self.produto.preco
+        )
 
     def test_produto_criacao(self):
         """Testa se o produto foi criado corretamente."""
@@ -62,7 +61,7 @@ class ProdutoCarrinhoTestCase(TestCase):
     def test_carrinho_criacao(self):
         """Testa se o carrinho foi criado corretamente."""
         self.assertEqual(self.carrinho.cliente, self.perfil)
-        self.assertIn(str(self.produto.id), self.carrinho.itens)
+        self.assertIn(str(self.produto.num_produto), self.carrinho.itens)
         self.assertEqual(self.carrinho.total, 199.98)
         self.assertEqual(
             self.carrinho.status,
@@ -81,10 +80,21 @@ class ProdutoCarrinhoTestCase(TestCase):
     def test_carrinho_itens_estrutura(self):
         """Testa a estrutura dos itens no carrinho."""
         itens = self.carrinho.itens
-        produto_info = itens.get(str(self.produto.id))
+        produto_info = itens.get(str(self.produto.num_produto))
         self.assertIsNotNone(produto_info)
         self.assertEqual(produto_info["nome"], self.produto.nome)
         self.assertEqual(produto_info["quantidade"], 2)
+        self.assertEqual(produto_info["subtotal"], self.produto.preco * 2)
+
+    def test_item_carrinho_unico_por_produto(self):
+        """Testa que um produto ocupa uma única linha por carrinho."""
+        with self.assertRaises(IntegrityError):
+            ItemCarrinho.objects.create(
+                carrinho=self.carrinho,
+                produto=self.produto,
+                quantidade=1,
+                preco_unitario=self.produto.preco
+            )
 
     def test_produto_estoque(self):
         """Testa se o estoque é suficiente para o carrinho."""
@@ -0,0 +1,98 @@
+from urllib.parse import parse_qs, urlparse
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from apps.carrinho.cache import cache_catalogo
+from apps.carrinho.models import Produto
+
+
+class PaginacaoProdutosTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='paginacao', email='paginacao@example.com',
+            password='password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        # Preços repetidos para exercitar o desempate pelo id
+        Produto.objects.bulk_create([
+            Produto(
+                nome=f"Produto {i:02d}", descricao="",
+                preco=float(i % 3), estoque=1
+            )
+            for i in range(10)
+        ])
+        # Zera também o histórico do throttling (100/dia por usuário)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        cache_catalogo.invalidar()
+
+    def percorrer(self, ordenacao, tamanho=3):
+        url = f"{reverse('produtos')}?ordenacao={ordenacao}&tamanho={tamanho}" # noqa E501
+        paginas = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            paginas.append(response.data)
+            url = response.data['next']
+        return paginas
+
+    def nomes(self, paginas):
+        return [p['nome'] for pagina in paginas for p in pagina['results']]
+
+    def test_percorre_todas_as_ordenacoes_sem_repetir(self):
+        for ordenacao, esperado in (
+            ('id', Produto.objects.order_by('id')),
+            ('-nome', Produto.objects.order_by('-nome', '-id')),
+            ('preco', Produto.objects.order_by('preco', 'id')),
+            ('-preco', Produto.objects.order_by('-preco', '-id')),
+        ):
+            with self.subTest(ordenacao=ordenacao):
+                paginas = self.percorrer(ordenacao)
+                self.assertEqual(len(paginas), 4)
+                self.assertEqual(
+                    self.nomes(paginas),
+                    list(esperado.values_list('nome', flat=True))
+                )
+
+    def test_previous_volta_para_a_pagina_anterior(self):
+        paginas = self.percorrer('preco')
+        self.assertIsNone(paginas[0]['previous'])
+
+        response = self.client.get(paginas[2]['previous'])
+        self.assertEqual(response.data['results'], paginas[1]['results'])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(response.data['results'], paginas[0]['results'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_pagina_profunda_usa_uma_consulta_sem_offset(self):
+        paginas = self.percorrer('nome')
+        # A página só com as chaves e as marcas, e depois os produtos dela
+        with self.assertNumQueries(2) as contexto:
+            cache_catalogo.invalidar()
+            self.client.get(paginas[2]['next'])
+        for consulta in contexto.captured_queries:
+            self.assertNotIn('OFFSET', consulta['sql'])
+
+    def test_tamanho_da_pagina_respeita_o_maximo(self):
+        with self.settings(CATALOGO_PAGINACAO={'TAMANHO_MAXIMO': 4}):
+            response = self.client.get(reverse('produtos'), {'tamanho': 50})
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_cursor_opaco_invalido(self):
+        response = self.client.get(reverse('produtos'), {'cursor': 'x!'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_ordenacao_invalida(self):
+        response = self.client.get(
+            reverse('produtos'), {'ordenacao': 'estoque'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_nao_expoe_parametros(self):
+        proximo = self.percorrer('nome')[0]['next']
+        params = parse_qs(urlparse(proximo).query)
+        self.assertEqual(set(params), {'ordenacao', 'tamanho', 'cursor'})
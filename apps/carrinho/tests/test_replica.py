@@ -0,0 +1,102 @@
+import time
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from api_carrinho.replica import (
+    CHAVE_SINCRONIZACAO, ReplicaMiddleware, RoteadorReplica,
+    lendo_do_principal
+)
+from apps.carrinho.models import Produto
+
+
+# Sem a transação do TestCase, que mandaria toda leitura para o default
+class RoteadorReplicaTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # Nos testes não há réplica; aqui ela finge existir, recém copiada
+        patcher = mock.patch(
+            'api_carrinho.replica.replica_disponivel', return_value=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.set(CHAVE_SINCRONIZACAO, time.time())
+
+        self.roteador = RoteadorReplica()
+        self.fabrica = RequestFactory()
+        self.rotas = []
+
+    def _requisitar(self, metodo, token='abc', modelo=Produto, dentro=None):
+        def view(request):
+            if dentro is not None:
+                with dentro():
+                    self.rotas.append(self.roteador.db_for_read(modelo))
+            else:
+                self.rotas.append(self.roteador.db_for_read(modelo))
+            return HttpResponse()
+
+        request = getattr(self.fabrica, metodo)(
+            '/produtos/', HTTP_AUTHORIZATION=f'Token {token}'
+        )
+        ReplicaMiddleware(view)(request)
+        return self.rotas[-1]
+
+    def test_get_le_da_replica(self):
+        self.assertEqual(self._requisitar('get'), 'replica')
+
+    def test_fora_de_requisicao_le_do_default(self):
+        self.assertIsNone(self.roteador.db_for_read(Produto))
+        self.assertEqual(self.roteador.db_for_write(Produto), 'default')
+
+    def test_escrita_fixa_o_cliente_no_default(self):
+        self.assertIsNone(self._requisitar('post'))
+        # Quem gravou lê o que gravou; os outros clientes seguem na réplica
+        self.assertIsNone(self._requisitar('get'))
+        self.assertEqual(self._requisitar('get', token='outro'), 'replica')
+
+    def test_replica_atrasada_le_do_default(self):
+        # Sincronização parada há mais de JANELA_ESCRITA segundos
+        cache.set(CHAVE_SINCRONIZACAO, time.time() - 5)
+        self.assertIsNone(self._requisitar('get'))
+        cache.delete(CHAVE_SINCRONIZACAO)
+        self.assertIsNone(self._requisitar('get'))
+
+    def test_transacao_le_do_default(self):
+        self.assertIsNone(self._requisitar('get', dentro=transaction.atomic))
+
+    def test_lendo_do_principal(self):
+        self.assertIsNone(self._requisitar('get', dentro=lendo_do_principal))
+
+    def test_usuarios_e_tokens_no_default(self):
+        self.assertIsNone(self._requisitar('get', modelo=User))
+
+    def test_replica_nao_recebe_migracoes(self):
+        self.assertFalse(self.roteador.allow_migrate('replica', 'carrinho'))
+        self.assertIsNone(self.roteador.allow_migrate('default', 'carrinho'))
+
+
+class SemReplicaTest(TestCase):
+    def test_sem_replica_le_do_default(self):
+        # Sem REPLICA_LEITURA não há o alias da réplica
+        request = RequestFactory().get('/produtos/')
+        rotas = []
+        ReplicaMiddleware(lambda r: rotas.append(
+            RoteadorReplica().db_for_read(Produto)
+        ) or HttpResponse())(request)
+        self.assertEqual(rotas, [None])
+
+    def test_sincronizar_exige_replica_separada(self):
+        with self.assertRaises(CommandError):
+            call_command('sincronizar_replica')
+
+    @mock.patch(
+        'apps.carrinho.management.commands.sincronizar_replica.copia_local',
+        return_value=True
+    )
+    def test_intervalo_menor_que_a_janela(self, copia_local):
+        with self.assertRaisesMessage(CommandError, 'JANELA_ESCRITA'):
+            call_command('sincronizar_replica', intervalo=5)
@@ -0,0 +1,34 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from api_carrinho.sqlite import configurar_conexao
+
+
+class PerfilSQLiteTest(TestCase):
+    def _pragma(self, nome):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {nome}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_na_conexao(self):
+        # O banco de testes é em memória: journal_mode fica 'memory'
+        self.assertEqual(self._pragma('busy_timeout'), 5000)
+        self.assertEqual(self._pragma('cache_size'), -20000)
+        self.assertEqual(self._pragma('temp_store'), 2)  # MEMORY
+
+    @override_settings(SQLITE_PRAGMAS={
+        'busy_timeout': 1234, 'cache_size': None, 'journal_mode': None,
+        'synchronous': None, 'mmap_size': None, 'temp_store': None,
+    })
+    def test_pragmas_configuraveis(self):
+        # A conexão de testes é compartilhada entre os testes
+        self.addCleanup(
+            connection.cursor().execute, 'PRAGMA busy_timeout = 5000'
+        )
+        configurar_conexao(sender=None, connection=connection)
+        self.assertEqual(self._pragma('busy_timeout'), 1234)
+        # None mantém o valor atual
+        self.assertEqual(self._pragma('cache_size'), -20000)
+
+    def test_transacoes_de_escrita_imediatas(self):
+        # transaction.atomic() abre com BEGIN IMMEDIATE
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
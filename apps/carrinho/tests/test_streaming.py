@@ -0,0 +1,68 @@
+import json
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from apps.carrinho.api.serializers import ProdutoSerializer
+from apps.carrinho.models import Produto
+
+
+@override_settings(STREAMING={'TAMANHO_LOTE': 2})
+class ListagemEmStreamingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='streaming', email='streaming@example.com',
+            password='password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.produtos = [
+            Produto.objects.create(
+                nome=f"Produto {i}", descricao="", preco=10.0, estoque=5
+            )
+            for i in range(5)
+        ]
+        self.esperado = json.loads(json.dumps(
+            ProdutoSerializer(self.produtos, many=True).data
+        ))
+
+    def corpo(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_array_json_com_todo_o_catalogo(self):
+        response = self.client.get(reverse('produtos'), {'stream': 1})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        # Uma única consulta, lida em lotes pelo iterator
+        with self.assertNumQueries(1):
+            corpo = self.corpo(response)
+        self.assertEqual(json.loads(corpo), self.esperado)
+
+    def test_ndjson_pelo_accept(self):
+        response = self.client.get(
+            reverse('produtos'), HTTP_ACCEPT='application/x-ndjson'
+        )
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        linhas = self.corpo(response).splitlines()
+        self.assertEqual([json.loads(linha) for linha in linhas], self.esperado) # noqa E501
+
+    def test_lista_vazia(self):
+        Produto.objects.all().delete()
+        response = self.client.get(reverse('produtos'), {'stream': 'true'})
+        self.assertEqual(self.corpo(response), b'[]')
+
+    def test_sem_stream_continua_paginado(self):
+        response = self.client.get(reverse('produtos'))
+        self.assertFalse(response.streaming)
+        self.assertIn('results', response.data)
+
+    def test_outras_listagens(self):
+        for nome in ('usuarios', 'perfil-list-create', 'informacao-envio'):
+            response = self.client.get(reverse(nome), {'stream': 1})
+            self.assertIsInstance(json.loads(self.corpo(response)), list)
@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import RespostaIdempotente
+
+
+# Admin para RespostaIdempotente (somente consulta)
+@admin.register(RespostaIdempotente)
+class RespostaIdempotenteAdmin(admin.ModelAdmin):
+    list_display = ('chave', 'usuario', 'status', 'criado_em')
+    search_fields = ('chave', 'usuario__username')
+    list_filter = ('status',)
+    readonly_fields = (
+        'usuario', 'chave', 'impressao', 'status', 'corpo', 'criado_em'
+    )
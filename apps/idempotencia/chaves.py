@@ -0,0 +1,171 @@
+"""
+Idempotency-Key nas mutações de carrinho e pedido.
+
+Clientes em redes instáveis repetem POSTs que podem já ter sido
+executados. Com o cabeçalho Idempotency-Key a primeira execução grava a
+resposta (status e corpo já em JSON) junto com a impressão da requisição
+(sha256 de método, caminho e corpo); repetições com a mesma chave
+devolvem a resposta gravada, sem executar a view de novo:
+
+- mesma chave, requisição diferente: 422;
+- mesma chave enquanto a primeira ainda executa: 409;
+- resposta 5xx ou exceção: a chave é liberada para uma nova tentativa.
+
+Por isso as views decoradas deixam DatabaseError subir em vez de
+convertê-lo em 400: uma falha transitória do banco ("database is locked")
+gravada sob a chave seria repetida para o cliente por todo o TTL.
+
+A busca é uma leitura pontual no índice único (usuario, chave). As
+chaves valem por TTL segundos; `manage.py limpar_idempotencia` apaga as
+vencidas. Uma chave presa "em andamento" (processo derrubado no meio da
+execução) é liberada depois de TEMPO_EM_ANDAMENTO segundos.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http.request import RawPostDataException
+from django.utils import timezone
+from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.response import Response
+from api_carrinho.renderers import para_json
+from apps.idempotencia.models import RespostaIdempotente
+
+CONFIGURACAO_PADRAO = {
+    'TTL': 24 * 60 * 60,
+    'TEMPO_EM_ANDAMENTO': 60,
+}
+
+CABECALHO = 'Idempotency-Key'
+CABECALHO_REPETICAO = 'Idempotent-Replayed'
+TAMANHO_MAXIMO_CHAVE = 255
+
+PARAMETRO_IDEMPOTENCIA = openapi.Parameter(
+    CABECALHO, openapi.IN_HEADER,
+    description="Chave única por operação: repetições com a mesma chave devolvem a resposta da primeira execução", # noqa E501
+    type=openapi.TYPE_STRING
+)
+
+
+def configuracao():
+    return {**CONFIGURACAO_PADRAO, **getattr(settings, 'IDEMPOTENCIA', {})}
+
+
+def impressao(request):
+    # O corpo cru ainda não foi lido pelo parser quando o handler começa;
+    # se já foi, usa os dados interpretados.
+    try:
+        corpo = request.body
+    except RawPostDataException:
+        corpo = para_json(request.data)
+    return hashlib.sha256(b'\n'.join([
+        request.method.encode(), request.get_full_path().encode(), corpo
+    ])).digest()
+
+
+def limpar_expiradas():
+    # Apaga as chaves com mais de TTL segundos (índice em criado_em)
+    limite = timezone.now() - timedelta(seconds=configuracao()['TTL'])
+    apagadas, _ = RespostaIdempotente.objects.filter(
+        criado_em__lt=limite
+    ).delete()
+    return apagadas
+
+
+def idempotente(metodo):
+    """
+    Decora o handler (post/delete) de uma APIView autenticada. Sem o
+    cabeçalho Idempotency-Key a view é executada normalmente.
+    """
+
+    @wraps(metodo)
+    def handler(view, request, *args, **kwargs):
+        chave = request.headers.get(CABECALHO)
+        if chave is None or not request.user.is_authenticated:
+            return metodo(view, request, *args, **kwargs)
+
+        if not chave or len(chave) > TAMANHO_MAXIMO_CHAVE:
+            return Response(
+                {'detail': f"{CABECALHO} deve ter de 1 a {TAMANHO_MAXIMO_CHAVE} caracteres."}, # noqa E501
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        registro, resposta = _reservar(
+            request.user.pk, chave, impressao(request)
+        )
+        if resposta is not None:
+            return resposta
+
+        try:
+            resposta = metodo(view, request, *args, **kwargs)
+        except BaseException:
+            registro.delete()
+            raise
+
+        _guardar(registro, resposta)
+        return resposta
+
+    return handler
+
+
+def _reservar(usuario_id, chave, assinatura):
+    # Devolve (registro em andamento, None) para executar a view ou
+    # (None, resposta) quando a chave já foi usada.
+    try:
+        registro = RespostaIdempotente.objects.get(
+            usuario_id=usuario_id, chave=chave
+        )
+    except RespostaIdempotente.DoesNotExist:
+        registro = None
+
+    if registro is not None:
+        config = configuracao()
+        idade = (timezone.now() - registro.criado_em).total_seconds()
+        if idade > config['TTL'] or (
+            registro.status is None and idade > config['TEMPO_EM_ANDAMENTO']
+        ):
+            # Vencida ou abandonada: a chave volta a ficar livre
+            RespostaIdempotente.objects.filter(pk=registro.pk).delete()
+        elif bytes(registro.impressao) != assinatura:
+            return None, Response(
+                {'detail': f"{CABECALHO} já usada com outra requisição."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        elif registro.status is None:
+            return None, _em_andamento()
+        else:
+            return None, Response(
+                json.loads(registro.corpo), status=registro.status,
+                headers={CABECALHO_REPETICAO: 'true'}
+            )
+
+    # A restrição única resolve a corrida entre duas primeiras execuções
+    try:
+        with transaction.atomic():
+            registro = RespostaIdempotente.objects.create(
+                usuario_id=usuario_id, chave=chave, impressao=assinatura
+            )
+    except IntegrityError:
+        return None, _em_andamento()
+    return registro, None
+
+
+def _guardar(registro, resposta):
+    # Erros do servidor não são guardados: a chave pode ser repetida
+    if resposta.status_code >= 500 or not hasattr(resposta, 'data'):
+        registro.delete()
+        return
+
+    registro.status = resposta.status_code
+    registro.corpo = para_json(resposta.data)
+    registro.save(update_fields=['status', 'corpo'])
+
+
+def _em_andamento():
+    return Response(
+        {'detail': f"Requisição com este {CABECALHO} ainda em andamento."},
+        status=status.HTTP_409_CONFLICT
+    )
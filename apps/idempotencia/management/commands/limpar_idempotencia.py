@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from apps.idempotencia.chaves import configuracao, limpar_expiradas
+
+
+class Command(BaseCommand):
+    help = (
+        "Apaga as respostas guardadas para Idempotency-Key com mais de TTL "
+        "segundos. Feito para rodar periodicamente (cron)."
+    )
+
+    def handle(self, *args, **options):
+        apagadas = limpar_expiradas()
+        self.stdout.write(self.style.SUCCESS(
+            f"{apagadas} chaves vencidas apagadas "
+            f"(TTL de {configuracao()['TTL']}s)."
+        ))
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespostaIdempotente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=255)),
+                ('impressao', models.BinaryField(max_length=32)),
+                ('status', models.PositiveSmallIntegerField(null=True)),
+                ('corpo', models.BinaryField(null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('usuario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resposta Idempotente',
+                'verbose_name_plural': 'Respostas Idempotentes',
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'chave'), name='idempotencia_usuario_chave')],
+            },
+        ),
+    ]
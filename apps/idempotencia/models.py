@@ -0,0 +1,28 @@
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class RespostaIdempotente(models.Model):
+    """Resposta guardada para um Idempotency-Key (ver chaves.py)."""
+    # Sem índice próprio: a restrição única já começa pelo usuário
+    usuario = models.ForeignKey(
+        User, on_delete=models.CASCADE, db_index=False
+    )
+    chave = models.CharField(max_length=255)
+    impressao = models.BinaryField(max_length=32)
+    status = models.PositiveSmallIntegerField(null=True)
+    corpo = models.BinaryField(null=True)
+    criado_em = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Resposta Idempotente'
+        verbose_name_plural = 'Respostas Idempotentes'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'chave'],
+                name='idempotencia_usuario_chave'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_id}: {self.chave} ({self.status or 'em andamento'})" # noqa E501
@@ -0,0 +1,190 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.carrinho.managers.manager_carrinho import CarrinhoManager
+from apps.carrinho.models import Produto
+from apps.idempotencia.chaves import limpar_expiradas
+from apps.idempotencia.models import RespostaIdempotente
+from apps.pedidos.models import InformacaoEnvio, Pedido
+from apps.pedidos.sequencias import alocador_sequencias
+from apps.perfil.models import Endereco, Perfil
+
+
+class IdempotencyKeyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        alocador_sequencias.descartar()
+        self.addCleanup(alocador_sequencias.descartar)
+
+        self.user = User.objects.create_user(
+            username='idempotencia', email='idempotencia@example.com',
+            password='password123'
+        )
+        self.perfil = Perfil.objects.create(usuario=self.user)
+        Endereco.objects.create(
+            perfil=self.perfil, estado='SP', cidade='São Paulo',
+            rua='Rua Teste', numero='123', cep='01234-567'
+        )
+        self.info_envio = InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio="Normal", custo_envio=10,
+            num_regiao_envio=4
+        )
+        self.produto = Produto.objects.create(
+            nome="Produto", preco=10.0, estoque=10
+        )
+        CarrinhoManager().criar_carrinho_vazio(self.perfil)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse(
+            'adicionar-produto-carrinho',
+            args=[self.produto.num_produto, 2]
+        )
+
+    def _adicionar(self, chave=None, url=None):
+        headers = {'Idempotency-Key': chave} if chave else {}
+        return self.client.post(url or self.url, headers=headers)
+
+    def _estoque(self):
+        self.produto.refresh_from_db()
+        return self.produto.estoque
+
+    def test_repeticao_devolve_a_resposta_sem_executar(self):
+        primeira = self._adicionar('chave-1')
+        self.assertEqual(primeira.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Idempotent-Replayed', primeira)
+
+        # Uma leitura pontual no índice (usuario, chave) e nada mais
+        with self.assertNumQueries(1):
+            repetida = self._adicionar('chave-1')
+        self.assertEqual(repetida.status_code, status.HTTP_200_OK)
+        self.assertEqual(repetida['Idempotent-Replayed'], 'true')
+        self.assertEqual(repetida.json(), primeira.json())
+        self.assertEqual(self._estoque(), 8)
+
+        # Outra chave é outra operação
+        self._adicionar('chave-2')
+        self.assertEqual(self._estoque(), 6)
+
+    def test_sem_chave_cada_requisicao_executa(self):
+        self._adicionar()
+        self._adicionar()
+        self.assertEqual(self._estoque(), 6)
+        self.assertFalse(RespostaIdempotente.objects.exists())
+
+    def test_chave_reutilizada_com_outra_requisicao(self):
+        self._adicionar('chave')
+        outra = reverse(
+            'adicionar-produto-carrinho', args=[self.produto.num_produto, 3]
+        )
+        response = self._adicionar('chave', url=outra)
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertEqual(self._estoque(), 8)
+
+    def test_chave_em_andamento(self):
+        self._adicionar('chave')
+        RespostaIdempotente.objects.update(status=None, corpo=None)
+
+        response = self._adicionar('chave')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self._estoque(), 8)
+
+        # Abandonada (processo derrubado): liberada depois do limite
+        RespostaIdempotente.objects.update(
+            criado_em=timezone.now() - timedelta(minutes=5)
+        )
+        response = self._adicionar('chave')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._estoque(), 6)
+
+    def test_falha_transitoria_do_banco_libera_a_chave(self):
+        self.client.raise_request_exception = False
+        with mock.patch.object(
+            CarrinhoManager, 'add_produto_carrinho',
+            side_effect=OperationalError('database is locked')
+        ):
+            response = self._adicionar('chave')
+        self.assertEqual(
+            response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+        self.assertFalse(RespostaIdempotente.objects.exists())
+
+        # A nova tentativa com a mesma chave executa
+        response = self._adicionar('chave')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(self._estoque(), 8)
+
+    def test_chave_maior_que_o_limite(self):
+        response = self._adicionar('x' * 256)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._estoque(), 10)
+
+    def test_pedido_nao_e_duplicado(self):
+        data = {"info_envio": self.info_envio.id, "detalhes": []}
+        headers = {'Idempotency-Key': 'pedido-1'}
+        primeira = self.client.post(
+            reverse('pedidos'), data, format='json', headers=headers
+        )
+        repetida = self.client.post(
+            reverse('pedidos'), data, format='json', headers=headers
+        )
+        self.assertEqual(primeira.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(repetida.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(repetida.json(), primeira.json())
+        self.assertEqual(Pedido.objects.count(), 1)
+
+        # Mesmo caminho, corpo diferente
+        data['estado'] = 'RJ'
+        response = self.client.post(
+            reverse('pedidos'), data, format='json', headers=headers
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    def test_checkout_repetido_devolve_o_mesmo_pedido(self):
+        self._adicionar()
+        headers = {'Idempotency-Key': 'checkout'}
+        primeira = self.client.post(reverse('finalizar-compra'), headers=headers) # noqa E501
+        repetida = self.client.post(reverse('finalizar-compra'), headers=headers) # noqa E501
+        self.assertEqual(primeira.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(repetida.json(), primeira.json())
+        self.assertEqual(Pedido.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCIA={'TTL': 60})
+    def test_chaves_vencidas(self):
+        self._adicionar('antiga')
+        self._adicionar('recente')
+        RespostaIdempotente.objects.filter(chave='antiga').update(
+            criado_em=timezone.now() - timedelta(minutes=2)
+        )
+
+        # Vencida: a chave vale de novo para uma nova operação
+        self._adicionar('antiga')
+        self.assertEqual(self._estoque(), 4)
+
+        RespostaIdempotente.objects.update(
+            criado_em=timezone.now() - timedelta(minutes=2)
+        )
+        self._adicionar('nova')
+        self.assertEqual(limpar_expiradas(), 2)
+        self.assertEqual(
+            list(RespostaIdempotente.objects.values_list('chave', flat=True)),
+            ['nova']
+        )
+
+        saida = StringIO()
+        call_command('limpar_idempotencia', stdout=saida)
+        self.assertIn("0 chaves vencidas apagadas", saida.getvalue())
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import InformacaoEnvio, Pedido, DetalhesDoPedido
+from .models import ContagemVendasProduto, InformacaoEnvio, Pedido, DetalhesDoPedido, ResumoCliente, VendaDiaria # noqa E501
 
 
 # TabularInline para DetalhesDoPedido
@@ -33,3 +33,30 @@ class PedidoAdmin(admin.ModelAdmin):
     search_fields = ('num_pedido', 'cliente__user__username', 'estado')
     list_filter = ('estado', 'data_criacao')
     inlines = [DetalhesDoPedidoInline]  # Inclui o TabularInline no admin
+
+
+# Admin para ResumoCliente (mantido pelos pedidos; somente consulta)
+@admin.register(ResumoCliente)
+class ResumoClienteAdmin(admin.ModelAdmin):
+    list_display = (
+        'cliente', 'quantidade_pedidos', 'quantidade_itens', 'total_gasto',
+        'ultimo_pedido'
+    )
+    readonly_fields = list_display
+
+
+# Admin para VendaDiaria (consolidada pelos pedidos; somente consulta)
+@admin.register(VendaDiaria)
+class VendaDiariaAdmin(admin.ModelAdmin):
+    list_display = ('dia', 'num_produto', 'regiao', 'quantidade', 'receita')
+    list_filter = ('regiao', 'dia')
+    readonly_fields = list_display
+
+
+# Admin para ContagemVendasProduto (snapshot do ranking; somente consulta)
+@admin.register(ContagemVendasProduto)
+class ContagemVendasProdutoAdmin(admin.ModelAdmin):
+    list_display = ('num_produto', 'nome_produto', 'regiao', 'quantidade')
+    list_filter = ('regiao',)
+    search_fields = ('nome_produto',)
+    readonly_fields = list_display
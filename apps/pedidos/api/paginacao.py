@@ -0,0 +1,13 @@
+from apps.carrinho.api.paginacao import PaginacaoPorChave
+
+
+class PaginacaoPedidos(PaginacaoPorChave):
+    """
+    Paginação keyset dos pedidos do cliente, do mais recente para o mais
+    antigo por padrão.
+    """
+
+    ordenacoes = ('id', 'num_pedido')
+    tipos = {'id': int, 'num_pedido': int}
+    ordenacao_padrao = '-id'
+    nome_configuracao = 'PEDIDOS_PAGINACAO'
@@ -1,10 +1,14 @@
+from datetime import timedelta
+from django.utils import timezone
 from rest_framework import serializers
-from apps.pedidos.models import InformacaoEnvio
+from apps.pedidos.managers.managers_pedido import AGRUPAMENTOS_VENDAS
+from apps.pedidos.models import InformacaoEnvio, VendaDiaria
 
 
 class InformacaoEnvioSerializer(serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
-    num_envio = serializers.IntegerField()
+    # Gerado no servidor quando omitido
+    num_envio = serializers.IntegerField(required=False)
     tipo_envio = serializers.CharField(max_length=50)
     custo_envio = serializers.IntegerField()
     num_regiao_envio = serializers.IntegerField(read_only=True)
@@ -22,10 +26,48 @@ class DetalhesDoPedidoSerializer(serializers.Serializer):
 
 class PedidoSerializer(serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
-    num_pedido = serializers.IntegerField()
+    # Gerado no servidor quando omitido
+    num_pedido = serializers.IntegerField(required=False)
     data_criacao = serializers.DateTimeField(read_only=True)
     data_envio = serializers.DateTimeField(allow_null=True, required=False)
     info_envio = serializers.PrimaryKeyRelatedField(
         queryset=InformacaoEnvio.objects.all()
     )
     detalhes = DetalhesDoPedidoSerializer(many=True, required=False)
+
+
+class PedidoResumoSerializer(PedidoSerializer):
+    # Sem as linhas: só a quantidade de itens e o total agregados
+    detalhes = None
+    quantidade_itens = serializers.IntegerField(read_only=True)
+    total = serializers.FloatField(read_only=True)
+
+
+class ResumoClienteSerializer(serializers.Serializer):
+    cliente = serializers.IntegerField(source='cliente_id', read_only=True)
+    quantidade_pedidos = serializers.IntegerField(read_only=True)
+    quantidade_itens = serializers.IntegerField(read_only=True)
+    total_gasto = serializers.FloatField(read_only=True)
+    ultimo_pedido = serializers.DateTimeField(read_only=True)
+
+
+class ConsultaVendasSerializer(serializers.Serializer):
+    # Parâmetros de pedidos/vendas/; sem datas, os últimos 30 dias
+    inicio = serializers.DateField(required=False)
+    fim = serializers.DateField(required=False)
+    agrupar = serializers.ChoiceField(
+        choices=list(AGRUPAMENTOS_VENDAS), default='dia'
+    )
+    num_produto = serializers.IntegerField(required=False)
+    regiao = serializers.ChoiceField(
+        choices=VendaDiaria.REGIAO_CHOICES, required=False
+    )
+
+    def validate(self, data):
+        data.setdefault('fim', timezone.localdate())
+        data.setdefault('inicio', data['fim'] - timedelta(days=29))
+        if data['inicio'] > data['fim']:
+            raise serializers.ValidationError(
+                "A data de início deve ser anterior à data de fim."
+            )
+        return data
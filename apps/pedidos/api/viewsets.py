@@ -1,15 +1,22 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework import status
-from apps.pedidos.managers.managers_pedido import InformacaoEnvioManager, PedidoManager  # noqa E501
-from apps.pedidos.models import DetalhesDoPedido, Pedido, InformacaoEnvio
+from django.db import DatabaseError
+from apps.pedidos.frete import resolvedor_frete
+from apps.pedidos.managers.managers_pedido import InformacaoEnvioManager, PedidoManager, VendaDiariaManager  # noqa E501
+from apps.pedidos.models import Pedido, InformacaoEnvio, ResumoCliente
+from apps.pedidos.sequencias import alocador_sequencias
 from apps.perfil.models import Perfil
-from .serializers import DetalhesDoPedidoSerializer, PedidoSerializer, InformacaoEnvioSerializer # noqa E501
+from .serializers import ConsultaVendasSerializer, DetalhesDoPedidoSerializer, PedidoResumoSerializer, PedidoSerializer, InformacaoEnvioSerializer, ResumoClienteSerializer # noqa E501
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.parsers import JSONParser
 from rest_framework.exceptions import NotFound
+from api_carrinho.assincrono import APIViewAssincrona
+from api_carrinho.streaming import PARAMETRO_STREAM, VALORES_VERDADEIROS, resposta_em_streaming, streaming_solicitado # noqa E501
+from apps.pedidos.api.paginacao import PaginacaoPedidos
+from apps.idempotencia.chaves import PARAMETRO_IDEMPOTENCIA, idempotente
 
 
 class InformacaoEnvioAPIView(APIView):
@@ -19,9 +26,15 @@ class InformacaoEnvioAPIView(APIView):
 
     @swagger_auto_schema(
         responses={200: InformacaoEnvioSerializer(many=True)},
+        manual_parameters=[PARAMETRO_STREAM],
     )
     def get(self, request, *args, **kwargs):
         infos = InformacaoEnvio.objects.all()
+        if streaming_solicitado(request):
+            return resposta_em_streaming(
+                request, infos,
+                lambda lote: InformacaoEnvioSerializer(lote, many=True).data
+            )
         serializer = InformacaoEnvioSerializer(infos, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -64,9 +77,19 @@ class InformacaoEnvioAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            # Número gerado no servidor, salvo se o cliente enviar um
+            num_envio = serializer.validated_data.get('num_envio')
+            if num_envio is None:
+                num_envio = alocador_sequencias.proximo('envio')
+            elif not alocador_sequencias.reservar_numero('envio', num_envio):
+                return Response(
+                    {'detail': f"Número de envio {num_envio} indisponível."},
+                    status=status.HTTP_409_CONFLICT
+                )
+
             # Criar a informação de envio com a região associada
             info_envio = InformacaoEnvio.objects.create(
-                num_envio=serializer.validated_data['num_envio'],
+                num_envio=num_envio,
                 tipo_envio=serializer.validated_data['tipo_envio'],
                 custo_envio=serializer.validated_data['custo_envio'],
                 num_regiao_envio=num_regiao_envio
@@ -216,6 +239,18 @@ class InformacaoEnvioDetails(APIView):
             )
 
 
+class ResolvedorFreteAPIView(APIView):
+    permission_classes = [IsAdminUser]
+    http_method_names = ['get']
+
+    @swagger_auto_schema(
+        responses={200: "Métricas do resolvedor de frete em memória."},
+        operation_description="Acertos, falhas e recargas da tabela UF -> frete deste processo." # noqa E501
+    )
+    def get(self, request, *args, **kwargs):
+        return Response(resolvedor_frete.metricas(), status=status.HTTP_200_OK)
+
+
 class PedidoAPIView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = PedidoSerializer
@@ -223,40 +258,67 @@ class PedidoAPIView(APIView):
     parser_classes = [JSONParser]
 
     @swagger_auto_schema(
-        responses={200: PedidoSerializer(many=True)}
+        responses={200: PedidoSerializer(many=True)},
+        operation_description="Pedidos do usuário logado, paginados por cursor. Com ?resumo=1, sem as linhas de cada pedido.", # noqa E501
+        manual_parameters=[
+            openapi.Parameter(
+                'resumo', openapi.IN_QUERY,
+                description="1 para omitir os detalhes e trazer só quantidade de itens e total", # noqa E501
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'ordenacao', openapi.IN_QUERY,
+                description="id ou num_pedido; prefixo '-' para decrescente (padrão -id)", # noqa E501
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'tamanho', openapi.IN_QUERY,
+                description="Quantidade de pedidos por página",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'cursor', openapi.IN_QUERY,
+                description="Cursor devolvido em next/previous",
+                type=openapi.TYPE_STRING
+            ),
+            PARAMETRO_STREAM,
+        ],
     )
     def get(self, request, *args, **kwargs):
-        try:
-            # Instanciar o manager diretamente
-            pedido_manager = PedidoManager()
-            pedido_manager.model = Pedido  # Associar o modelo ao manager
-
-            # Obter pedidos
-            pedidos = pedido_manager.all()
-
-            # Montar os dados manualmente para incluir os detalhes
-            pedidos_com_detalhes = []
-            for pedido in pedidos:
-                detalhes = DetalhesDoPedido.objects.filter(pedido=pedido)
-                detalhes_serializados = DetalhesDoPedidoSerializer(
-                    detalhes, many=True
-                ).data
-
-                pedido_data = PedidoSerializer(pedido).data
-                pedido_data['detalhes'] = detalhes_serializados
-                pedidos_com_detalhes.append(pedido_data)
-
-            return Response(pedidos_com_detalhes, status=status.HTTP_200_OK)
-        except Exception as e:
+        perfil = getattr(request.user, 'perfil', None)
+        if not perfil:
             return Response(
-                {'detail': f'Erro ao listar pedidos: {str(e)}'},
+                {'detail': 'Perfil do usuário não encontrado.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Uma consulta para os pedidos da página (com o frete) e, fora do
+        # modo resumo, uma para as linhas de todos eles, seja qual for o
+        # tamanho da página.
+        resumo = request.query_params.get('resumo', '').lower() in VALORES_VERDADEIROS # noqa E501
+        pedidos = PedidoManager().pedidos_do_cliente(
+            perfil, detalhes=not resumo
+        )
+        serializer_class = PedidoResumoSerializer if resumo else PedidoSerializer # noqa E501
+
+        if streaming_solicitado(request):
+            return resposta_em_streaming(
+                request, pedidos.order_by('id'),
+                lambda lote: serializer_class(lote, many=True).data
+            )
+
+        paginacao = PaginacaoPedidos()
+        pagina = paginacao.paginate_queryset(pedidos, request, self)
+        return paginacao.get_paginated_response(
+            serializer_class(pagina, many=True).data
+        )
+
     @swagger_auto_schema(
         responses={201: PedidoSerializer(many=False)},
-        request_body=PedidoSerializer
+        request_body=PedidoSerializer,
+        manual_parameters=[PARAMETRO_IDEMPOTENCIA]
     )
+    @idempotente
     def post(self, request, *args, **kwargs):
         serializer = PedidoSerializer(data=request.data)
         if serializer.is_valid():
@@ -268,12 +330,12 @@ class PedidoAPIView(APIView):
                     raise NotFound("Perfil do usuário logado não encontrado.")
 
                 # Determinar o estado a partir do perfil do cliente
-                if cliente.enderecos.exists():
-                    estado = cliente.enderecos.first().estado
-                else:
+                endereco = cliente.enderecos.first()
+                if endereco is None:
                     raise NotFound(
                         "Endereço associado ao cliente não encontrado."
                     )
+                estado = endereco.estado
 
                 # Extraindo os dados validados
                 detalhes_data = serializer.validated_data.pop('detalhes', [])
@@ -285,30 +347,28 @@ class PedidoAPIView(APIView):
                     from django.utils.timezone import now
                     data_envio = now()
 
-                # Criando o pedido
-                pedido_manager = PedidoManager()
-                pedido_manager.model = Pedido
-                pedido = pedido_manager.create(
+                # Número gerado no servidor, salvo se o cliente enviar um
+                if num_pedido is None:
+                    num_pedido = alocador_sequencias.proximo('pedido')
+                elif not alocador_sequencias.reservar_numero(
+                    'pedido', num_pedido
+                ):
+                    return Response(
+                        {'detail': f"Número de pedido {num_pedido} indisponível."}, # noqa E501
+                        status=status.HTTP_409_CONFLICT
+                    )
+
+                # Pedido e detalhes, com os subtotais já calculados
+                pedido = PedidoManager().criar_pedido(
                     num_pedido=num_pedido,
                     cliente=cliente,
                     estado=estado,
                     info_envio=info_envio,
+                    detalhes=detalhes_data,
                     data_envio=data_envio
                 )
-
-                # Criar os detalhes do pedido
-                for detalhe in detalhes_data:
-                    DetalhesDoPedido.objects.create(
-                        pedido=pedido,
-                        **detalhe
-                    )
-
-                # Recalcular os subtotais dos detalhes do pedido
-                pedido_manager.calcular_subtotal(pedido)
-
-                # Serializar o pedido e adicionar os detalhes atualizados
                 detalhes_serializados = DetalhesDoPedidoSerializer(
-                    pedido.detalhesdopedido_set.all(), many=True
+                    pedido.detalhes, many=True
                 ).data
 
                 # Retornar os dados completos do pedido
@@ -328,6 +388,8 @@ class PedidoAPIView(APIView):
                 }
 
                 return Response(pedido_data, status=status.HTTP_201_CREATED)
+            except DatabaseError:
+                raise
             except Exception as e:
                 return Response(
                     {'detail': f'Erro ao criar pedido: {str(e)}'},
@@ -336,6 +398,116 @@ class PedidoAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class PedidoAsyncAPIView(APIViewAssincrona):
+    permission_classes = [IsAuthenticated]
+    serializer_class = PedidoSerializer
+    http_method_names = ['get']
+
+    @swagger_auto_schema(
+        responses={200: PedidoSerializer(many=True)},
+        operation_description="Variante assíncrona (ORM assíncrono) da listagem de pedidos, sem o modo streaming.", # noqa E501
+        manual_parameters=[
+            openapi.Parameter(
+                'resumo', openapi.IN_QUERY,
+                description="1 para omitir os detalhes e trazer só quantidade de itens e total", # noqa E501
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'ordenacao', openapi.IN_QUERY,
+                description="id ou num_pedido; prefixo '-' para decrescente (padrão -id)", # noqa E501
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'tamanho', openapi.IN_QUERY,
+                description="Quantidade de pedidos por página",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'cursor', openapi.IN_QUERY,
+                description="Cursor devolvido em next/previous",
+                type=openapi.TYPE_STRING
+            ),
+        ],
+    )
+    async def get(self, request, *args, **kwargs):
+        perfil = await Perfil.objects.filter(usuario=request.user).afirst()
+        if not perfil:
+            return Response(
+                {'detail': 'Perfil do usuário não encontrado.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # As mesmas consultas da view síncrona: a página (com o frete) e,
+        # fora do modo resumo, as linhas de todos os pedidos dela
+        resumo = request.query_params.get('resumo', '').lower() in VALORES_VERDADEIROS # noqa E501
+        pedidos = PedidoManager().pedidos_do_cliente(
+            perfil, detalhes=not resumo
+        )
+        serializer_class = PedidoResumoSerializer if resumo else PedidoSerializer # noqa E501
+
+        paginacao = PaginacaoPedidos()
+        pagina = await paginacao.apaginate_queryset(pedidos, request, self)
+        return paginacao.get_paginated_response(
+            serializer_class(pagina, many=True).data
+        )
+
+
+class ResumoClienteAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = ResumoClienteSerializer
+    http_method_names = ['get',]
+
+    @swagger_auto_schema(
+        responses={200: ResumoClienteSerializer(many=False)},
+        operation_description="Quantidade de pedidos, itens, total gasto e data do último pedido do cliente logado, lidos do resumo mantido a cada pedido." # noqa E501
+    )
+    def get(self, request, *args, **kwargs):
+        # Uma leitura pela chave primária (o id do perfil é o do usuário);
+        # sem resumo, o cliente ainda não fez pedidos.
+        resumo = ResumoCliente.objects.filter(cliente_id=request.user.pk).first() # noqa E501
+        if resumo is None:
+            resumo = ResumoCliente(cliente_id=request.user.pk)
+        return Response(
+            ResumoClienteSerializer(resumo).data, status=status.HTTP_200_OK
+        )
+
+
+class VendasDiariasAPIView(APIView):
+    permission_classes = [IsAdminUser]
+    http_method_names = ['get',]
+
+    @swagger_auto_schema(
+        query_serializer=ConsultaVendasSerializer,
+        responses={200: "Quantidade e receita do período, agrupadas por dia, produto ou região."}, # noqa E501
+        operation_description="Vendas do período (padrão: últimos 30 dias) lidas das vendas diárias consolidadas, sem varrer pedidos e detalhes." # noqa E501
+    )
+    def get(self, request, *args, **kwargs):
+        consulta = ConsultaVendasSerializer(data=request.query_params)
+        consulta.is_valid(raise_exception=True)
+        parametros = consulta.validated_data
+
+        agrupar = parametros['agrupar']
+        linhas = VendaDiariaManager().periodo(
+            parametros['inicio'], parametros['fim'], agrupar,
+            num_produto=parametros.get('num_produto'),
+            regiao=parametros.get('regiao')
+        )
+        return Response(
+            {
+                "inicio": parametros['inicio'],
+                "fim": parametros['fim'],
+                "agrupar": agrupar,
+                "quantidade": sum(linha[1] for linha in linhas),
+                "receita": sum(linha[2] for linha in linhas),
+                "resultados": [
+                    {agrupar: chave, "quantidade": quantidade, "receita": receita} # noqa E501
+                    for chave, quantidade, receita in linhas
+                ],
+            },
+            status=status.HTTP_200_OK
+        )
+
+
 class PedidoDetailsAPIView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = PedidoSerializer
@@ -371,8 +543,9 @@ class PedidoDetailsAPIView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Deletar o pedido e os detalhes associados
-            pedido.delete()
+            # Deletar o pedido e os detalhes associados, descontando-o do
+            # resumo do cliente
+            PedidoManager().excluir_pedido(pedido)
 
             return Response(
                 {'detail': 'Pedido deletado com sucesso.'},
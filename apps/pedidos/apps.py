@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PedidosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.pedidos'
+
+    def ready(self):
+        from apps.pedidos import signals  # noqa F401
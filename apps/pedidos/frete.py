@@ -0,0 +1,106 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+REGIAO_POR_ESTADO = {
+    # Centro-Oeste
+    'DF': 1, 'GO': 1, 'MT': 1, 'MS': 1,
+    # Nordeste
+    'AL': 2, 'BA': 2, 'CE': 2, 'MA': 2, 'PB': 2, 'PE': 2, 'PI': 2, 'RN': 2, 'SE': 2, # noqa E501
+    # Norte
+    'AC': 3, 'AP': 3, 'AM': 3, 'PA': 3, 'RO': 3, 'RR': 3, 'TO': 3,
+    # Sudeste
+    'ES': 4, 'MG': 4, 'RJ': 4, 'SP': 4,
+    # Sul
+    'PR': 5, 'RS': 5, 'SC': 5,
+}
+
+
+class ResolvedorFrete:
+    """
+    Tabela UF -> InformacaoEnvio mantida em memória pelo processo.
+
+    A tabela é montada com uma única consulta e descartada quando uma
+    InformacaoEnvio muda (sinais post_save/post_delete). Para que outros
+    processos percebam a mudança, a versão também é publicada no cache do
+    Django; cada processo confere essa versão no máximo uma vez a cada
+    FRETE_INTERVALO_VERIFICACAO segundos.
+    """
+
+    CHAVE_VERSAO = 'pedidos:frete:versao'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tabela = None
+        self._versao = None
+        self._verificado_em = 0.0
+        self.acertos = 0
+        self.falhas = 0
+        self.recargas = 0
+
+    @staticmethod
+    def regiao(estado):
+        return REGIAO_POR_ESTADO.get((estado or '').upper())
+
+    def resolver(self, estado):
+        """Devolve a InformacaoEnvio usada para a UF, ou None."""
+        tabela = self._tabela
+        if tabela is None or self._versao_expirada():
+            self.falhas += 1
+            tabela = self._recarregar()
+        else:
+            self.acertos += 1
+        return tabela.get((estado or '').upper())
+
+    def invalidar(self):
+        with self._lock:
+            self._tabela = None
+        try:
+            cache.incr(self.CHAVE_VERSAO)
+        except ValueError:
+            cache.set(self.CHAVE_VERSAO, 1, timeout=None)
+
+    def metricas(self):
+        consultas = self.acertos + self.falhas
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'recargas': self.recargas,
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+            'versao': self._versao,
+        }
+
+    def _versao_expirada(self):
+        agora = time.monotonic()
+        intervalo = getattr(settings, 'FRETE_INTERVALO_VERIFICACAO', 1.0)
+        if agora - self._verificado_em < intervalo:
+            return False
+        self._verificado_em = agora
+        return cache.get(self.CHAVE_VERSAO, 0) != self._versao
+
+    def _recarregar(self):
+        from apps.pedidos.models import InformacaoEnvio
+
+        with self._lock:
+            versao = cache.get(self.CHAVE_VERSAO, 0)
+
+            # Mesmo critério de antes: a primeira InformacaoEnvio da região
+            por_regiao = {}
+            for info in InformacaoEnvio.objects.filter(
+                num_regiao_envio__isnull=False
+            ).order_by('pk'):
+                por_regiao.setdefault(info.num_regiao_envio, info)
+
+            tabela = {
+                estado: por_regiao.get(regiao)
+                for estado, regiao in REGIAO_POR_ESTADO.items()
+            }
+            self._tabela = tabela
+            self._versao = versao
+            self._verificado_em = time.monotonic()
+            self.recargas += 1
+            return tabela
+
+
+resolvedor_frete = ResolvedorFrete()
@@ -0,0 +1,271 @@
+import heapq
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from api_carrinho.replica import lendo_do_principal
+from apps.pedidos.models import ContagemVendasProduto
+from apps.pedidos.upsert import somar_em_lote
+
+CONFIGURACAO_PADRAO = {
+    'TAMANHO': 20,
+    'INTERVALO_SNAPSHOT': 30.0,
+    'MAX_AGE': 60,
+}
+
+# Escopo do ranking geral; os demais escopos são os números de região
+GERAL = None
+
+logger = logging.getLogger(__name__)
+
+
+class RankingMaisVendidos:
+    """
+    Top-N de produtos por unidades vendidas, geral e por região.
+
+    Cada escopo tem um mapa produto -> unidades e um heap mínimo com os N
+    primeiros. Uma venda soma no mapa e só mexe no heap se o produto já
+    está nele ou passou o último colocado (O(N), com N pequeno). Uma
+    contagem que diminui (pedido excluído ou editado) pode tirar o produto
+    do topo sem que se saiba quem entra: aí o heap do escopo é remontado
+    a partir do mapa. A lista ordenada de cada escopo fica pronta até a
+    próxima mudança, então a leitura não depende do tamanho do catálogo.
+
+    As vendas chegam por transaction.on_commit, só de pedidos confirmados
+    neste processo. Uma thread do processo, iniciada na primeira leitura,
+    faz o snapshot a cada INTERVALO_SNAPSHOT segundos (None desliga): o
+    que foi vendido desde o último é somado à tabela ContagemVendasProduto,
+    que é relida para trazer as vendas dos outros processos. A leitura não
+    grava nada; só a primeira de um processo novo consulta a tabela, e se
+    ela falhar o ranking sai vazio até a próxima. Um snapshot que falha
+    fica no log e o ranking atual continua sendo servido. O que ainda não
+    foi gravado se perde se o processo cair; o comando
+    reconstruir_mais_vendidos refaz a tabela a partir dos pedidos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lock_snapshot = threading.Lock()
+        self._contagens = None
+        self._topos = {}
+        self._listas = {}
+        self._nomes = {}
+        self._pendentes = {}
+        self._agendador = None
+        self.leituras = 0
+        self.vendas = 0
+        self.remontagens = 0
+        self.snapshots = 0
+        self.falhas = 0
+
+    def configuracao(self):
+        return {**CONFIGURACAO_PADRAO, **getattr(settings, 'MAIS_VENDIDOS', {})} # noqa E501
+
+    def mais_vendidos(self, regiao=GERAL, limite=None):
+        """
+        Lista [{posicao, num_produto, nome_produto, quantidade}] do escopo,
+        do mais para o menos vendido.
+        """
+        config = self._garantir_carga()
+        self._iniciar_agendador(config)
+
+        with self._lock:
+            self.leituras += 1
+            lista = self._listas.get(regiao)
+            if lista is None:
+                lista = self._listas[regiao] = [
+                    {
+                        'posicao': posicao,
+                        'num_produto': num_produto,
+                        'nome_produto': self._nomes.get(num_produto, ''),
+                        'quantidade': unidades,
+                    }
+                    for posicao, (unidades, num_produto) in enumerate(
+                        sorted(self._topos.get(regiao, ()), reverse=True),
+                        start=1
+                    )
+                ]
+        return lista[:limite] if limite else lista
+
+    def registrar(self, linhas):
+        """
+        Soma vendas confirmadas: linhas (regiao, num_produto, nome_produto,
+        unidades); unidades negativas descontam.
+        """
+        tamanho = self.configuracao()['TAMANHO']
+        with self._lock:
+            for regiao, num_produto, nome_produto, unidades in linhas:
+                if not unidades:
+                    continue
+                chave = (regiao, num_produto)
+                self._pendentes[chave] = (
+                    self._pendentes.get(chave, 0) + unidades
+                )
+                self._nomes[num_produto] = nome_produto
+                self.vendas += 1
+                # Antes da primeira carga a venda só fica pendente
+                if self._contagens is not None:
+                    for escopo in (GERAL, regiao):
+                        self._somar(escopo, num_produto, unidades, tamanho)
+
+    def snapshot(self):
+        """Grava as vendas pendentes na tabela e recarrega o ranking dela."""
+        tamanho = self.configuracao()['TAMANHO']
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+            nomes = dict(self._nomes)
+
+        try:
+            with transaction.atomic():
+                somar_em_lote(
+                    ContagemVendasProduto, ('regiao', 'num_produto'),
+                    ('quantidade',),
+                    [
+                        (regiao, num_produto, unidades, nomes.get(num_produto, '')) # noqa E501
+                        for (regiao, num_produto), unidades in pendentes.items() # noqa E501
+                    ],
+                    substituir=('nome_produto',)
+                )
+        except Exception:
+            # Nada foi gravado: as vendas voltam para o próximo snapshot
+            with self._lock:
+                for chave, unidades in pendentes.items():
+                    self._pendentes[chave] = (
+                        self._pendentes.get(chave, 0) + unidades
+                    )
+            raise
+
+        self._recarregar(tamanho)
+
+    def _recarregar(self, tamanho):
+        # Relê do default: a réplica ainda não tem o que acabou de ser somado
+        with lendo_do_principal():
+            linhas = list(
+                ContagemVendasProduto.objects.filter(quantidade__gt=0)
+                .values_list('regiao', 'num_produto', 'nome_produto', 'quantidade') # noqa E501
+            )
+        contagens = {GERAL: {}}
+        nomes_gravados = {}
+        for regiao, num_produto, nome_produto, unidades in linhas:
+            contagens.setdefault(regiao, {})[num_produto] = unidades
+            geral = contagens[GERAL]
+            geral[num_produto] = geral.get(num_produto, 0) + unidades
+            nomes_gravados[num_produto] = nome_produto
+
+        with self._lock:
+            # Vendas registradas durante a leitura ainda estão pendentes
+            for (regiao, num_produto), unidades in self._pendentes.items():
+                for escopo in (GERAL, regiao):
+                    mapa = contagens.setdefault(escopo, {})
+                    mapa[num_produto] = mapa.get(num_produto, 0) + unidades
+            self._contagens = contagens
+            self._nomes = {**nomes_gravados, **self._nomes}
+            self._topos = {}
+            self._listas = {}
+            for escopo in contagens:
+                self._remontar(escopo, tamanho)
+            self.snapshots += 1
+
+    def descartar(self):
+        # Esquece o ranking e as vendas ainda não gravadas
+        with self._lock:
+            self._contagens = None
+            self._topos = {}
+            self._listas = {}
+            self._nomes = {}
+            self._pendentes = {}
+
+    def metricas(self):
+        return {
+            'carregado': self._contagens is not None,
+            'produtos': len(self._contagens[GERAL]) if self._contagens else 0, # noqa E501
+            'pendentes': len(self._pendentes),
+            'leituras': self.leituras,
+            'vendas': self.vendas,
+            'remontagens': self.remontagens,
+            'snapshots': self.snapshots,
+            'falhas': self.falhas,
+        }
+
+    def _garantir_carga(self):
+        # Só a primeira leitura do processo vai ao banco (uma thread lê, as
+        # demais esperam por ela); uma falha serve o ranking vazio
+        config = self.configuracao()
+        if self._contagens is not None:
+            return config
+        with self._lock_snapshot:
+            if self._contagens is None:
+                try:
+                    self._recarregar(config['TAMANHO'])
+                except DatabaseError:
+                    self.falhas += 1
+                    logger.exception("Mais vendidos: ranking não carregado.") # noqa E501
+        return config
+
+    def _iniciar_agendador(self, config):
+        if self._agendador is not None or not config['INTERVALO_SNAPSHOT']:
+            return
+        with self._lock:
+            if self._agendador is None:
+                self._agendador = threading.Thread(
+                    target=self._agendar, name='mais-vendidos', daemon=True
+                )
+                self._agendador.start()
+
+    def _agendar(self):
+        while True:
+            intervalo = self.configuracao()['INTERVALO_SNAPSHOT']
+            if not intervalo:
+                self._agendador = None
+                return
+            time.sleep(intervalo)
+            try:
+                with self._lock_snapshot:
+                    self.snapshot()
+            except Exception:
+                # As vendas voltam para o próximo snapshot
+                self.falhas += 1
+                logger.exception("Mais vendidos: snapshot falhou.")
+            finally:
+                # Conexões desta thread não passam pelo request_finished
+                connections.close_all()
+
+    def _somar(self, escopo, num_produto, unidades, tamanho):
+        contagens = self._contagens.setdefault(escopo, {})
+        total = contagens.get(num_produto, 0) + unidades
+        if total > 0:
+            contagens[num_produto] = total
+        else:
+            contagens.pop(num_produto, None)
+        self._listas.pop(escopo, None)
+
+        topo = self._topos.setdefault(escopo, [])
+        posicao = next(
+            (i for i, (_, produto) in enumerate(topo) if produto == num_produto), # noqa E501
+            None
+        )
+        if unidades < 0:
+            # Quem entra no lugar só se sabe olhando o mapa inteiro
+            if posicao is not None:
+                self._remontar(escopo, tamanho)
+        elif posicao is not None:
+            topo[posicao] = (total, num_produto)
+            heapq.heapify(topo)
+        elif len(topo) < tamanho:
+            heapq.heappush(topo, (total, num_produto))
+        elif (total, num_produto) > topo[0]:
+            heapq.heapreplace(topo, (total, num_produto))
+
+    def _remontar(self, escopo, tamanho):
+        topo = heapq.nlargest(tamanho, (
+            (unidades, num_produto)
+            for num_produto, unidades in self._contagens.get(escopo, {}).items() # noqa E501
+        ))
+        heapq.heapify(topo)
+        self._topos[escopo] = topo
+        self._listas.pop(escopo, None)
+        self.remontagens += 1
+
+
+ranking_mais_vendidos = RankingMaisVendidos()
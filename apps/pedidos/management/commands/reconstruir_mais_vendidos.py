@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Sum
+from apps.pedidos.mais_vendidos import ranking_mais_vendidos
+from apps.pedidos.managers.managers_pedido import VendaDiariaManager
+from apps.pedidos.models import ContagemVendasProduto, DetalhesDoPedido
+
+
+class Command(BaseCommand):
+    help = (
+        "Refaz a tabela de contagens do ranking de mais vendidos a partir "
+        "dos pedidos gravados. Os processos do servidor passam a usá-la no "
+        "próximo snapshot; vendas que eles ainda não gravaram entram de "
+        "novo por cima, então prefira rodar com o servidor parado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help="Quantidade de linhas por INSERT."
+        )
+
+    def handle(self, *args, **options):
+        contagens = {}
+        for num_produto, estado, nome_produto, unidades in (
+            DetalhesDoPedido.objects.values(
+                'num_produto', 'pedido__estado'
+            ).annotate(
+                unidades=Sum('quantidade'), nome=Max('nome_produto')
+            ).values_list('num_produto', 'pedido__estado', 'nome', 'unidades') # noqa E501
+        ):
+            chave = (VendaDiariaManager.regiao(estado), num_produto)
+            contagem = contagens.setdefault(chave, ContagemVendasProduto(
+                regiao=chave[0], num_produto=num_produto,
+                nome_produto=nome_produto, quantidade=0
+            ))
+            contagem.quantidade += unidades
+
+        with transaction.atomic():
+            ContagemVendasProduto.objects.all().delete()
+            ContagemVendasProduto.objects.bulk_create(
+                contagens.values(), batch_size=options['lote']
+            )
+
+        ranking_mais_vendidos.descartar()
+        ranking_mais_vendidos.snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(contagens)} contagens (produto, região) gravadas; "
+            f"{len(ranking_mais_vendidos.mais_vendidos())} produtos no "
+            f"ranking geral."
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from apps.pedidos.managers.managers_pedido import ResumoClienteManager
+from apps.perfil.models import Perfil
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula do zero o resumo de pedidos de cada cliente (quantidade "
+        "de pedidos, itens, total gasto e último pedido), em lotes de "
+        "clientes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help="Quantidade de clientes recalculados por transação."
+        )
+
+    def handle(self, *args, **options):
+        manager = ResumoClienteManager()
+        perfis = Perfil.objects.order_by('pk').values_list('pk', flat=True)
+
+        # Lotes por chave (pk > último visto), sem OFFSET
+        clientes = gravados = 0
+        ultimo = None
+        while True:
+            lote = perfis if ultimo is None else perfis.filter(pk__gt=ultimo)
+            lote = list(lote[:options['lote']])
+            if not lote:
+                break
+            clientes += len(lote)
+            gravados += manager.recalcular(lote)
+            ultimo = lote[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{clientes} clientes verificados, {gravados} resumos gravados."
+        ))
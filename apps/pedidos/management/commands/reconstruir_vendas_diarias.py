@@ -0,0 +1,49 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+from apps.pedidos.managers.managers_pedido import VendaDiariaManager
+from apps.pedidos.models import Pedido, VendaDiaria
+
+
+class Command(BaseCommand):
+    help = (
+        "Refaz as vendas diárias (dia, produto, região) a partir dos "
+        "pedidos gravados, trocando um período de dias por transação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=7,
+            help="Quantidade de dias refeitos por transação."
+        )
+
+    def handle(self, *args, **options):
+        manager = VendaDiariaManager()
+        passo = timedelta(days=max(1, options['dias']))
+
+        # Do primeiro pedido até hoje: os pedidos criados durante a
+        # reconstrução caem em hoje e entram pelo próprio upsert ou pela
+        # troca do último período. Não há pedidos antes do primeiro dia.
+        hoje = timezone.localdate()
+        primeiro = Pedido.objects.aggregate(
+            primeiro=Min('data_criacao')
+        )['primeiro']
+        inicio = timezone.localdate(primeiro) if primeiro else hoje
+        VendaDiaria.objects.filter(dia__lt=inicio).delete()
+
+        processados = linhas = 0
+        while inicio <= hoje:
+            pedidos, gravadas = manager.refazer_dias(inicio, inicio + passo)
+            processados += pedidos
+            linhas += gravadas
+            inicio += passo
+            self.stdout.write(
+                f"Vendas refeitas até {inicio - timedelta(days=1)} "
+                f"({processados} pedidos)..."
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{processados} pedidos agregados em {linhas} linhas de vendas "
+            "diárias."
+        ))
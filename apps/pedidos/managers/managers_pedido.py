@@ -1,39 +1,97 @@
-from django.db import models
-from apps.pedidos.models import DetalhesDoPedido
+from datetime import datetime, time
+from functools import partial
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Prefetch, Subquery, Sum, Value, When # noqa E501
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+from apps.pedidos.frete import REGIAO_POR_ESTADO
+from apps.pedidos.mais_vendidos import ranking_mais_vendidos
+from apps.pedidos.models import DetalhesDoPedido, Pedido, ResumoCliente, VendaDiaria # noqa E501
+from apps.pedidos.upsert import somar_em_lote
+
+# Agrupamentos da consulta de vendas por período: nome -> campo
+AGRUPAMENTOS_VENDAS = {
+    'dia': 'dia',
+    'produto': 'num_produto',
+    'regiao': 'regiao',
+}
 
 
 class PedidoManager(models.Manager):
-    def criar_pedido(self, num_pedido, cliente, estado, info_envio, detalhes):
-        # Criação do pedido
-        pedido = self.create(
-            num_pedido=num_pedido,
-            cliente=cliente, estado=estado,
-            info_envio=info_envio
-        )
+    def criar_pedido(self, num_pedido, cliente, estado, info_envio, detalhes,
+                     data_envio=None):
 
-        # Adiciona os detalhes do pedido
-        for detalhe in detalhes:
-            pedido.detalhesdopedido_set.create(
-                num_produto=detalhe['num_produto'],
-                nome_produto=detalhe['nome_produto'],
-                quantidade=detalhe['quantidade'],
-                custo_unidade=detalhe['custo_unidade'],
-                subtotal=detalhe['quantidade'] * detalhe['custo_unidade']
+        # Pedido e detalhes em dois INSERTs, qualquer que seja o número de
+        # linhas: o subtotal de cada detalhe é calculado antes de gravar.
+        with transaction.atomic():
+            pedido = Pedido.objects.create(
+                num_pedido=num_pedido,
+                cliente=cliente, estado=estado,
+                info_envio=info_envio,
+                data_envio=data_envio
             )
+            pedido.detalhes = DetalhesDoPedido.objects.bulk_create([
+                self._novo_detalhe(pedido, detalhe) for detalhe in detalhes
+            ])
+            ResumoClienteManager().registrar_pedido(pedido, pedido.detalhes)
+            VendaDiariaManager().registrar_pedido(pedido, pedido.detalhes)
         return pedido
 
+    def excluir_pedido(self, pedido):
+
+        # Exclui o pedido (e os detalhes, em cascata) descontando-o do
+        # resumo do cliente e das vendas diárias na mesma transação.
+        with transaction.atomic():
+            ResumoClienteManager().remover_pedido(pedido)
+            VendaDiariaManager().registrar_pedido(
+                pedido, DetalhesDoPedido.objects.filter(pedido=pedido), -1
+            )
+            pedido.delete()
+
+    @staticmethod
+    def _novo_detalhe(pedido, detalhe):
+        return DetalhesDoPedido(
+            pedido=pedido,
+            num_produto=detalhe['num_produto'],
+            nome_produto=detalhe['nome_produto'],
+            quantidade=detalhe['quantidade'],
+            custo_unidade=detalhe['custo_unidade'],
+            subtotal=detalhe['quantidade'] * detalhe['custo_unidade']
+        )
+
+    def pedidos_do_cliente(self, cliente, detalhes=True):
+
+        # Pedidos do cliente com o frete no mesmo SELECT. Com detalhes, as
+        # linhas de todos os pedidos vêm numa única consulta extra, em
+        # pedido.detalhes; sem eles, cada pedido traz a quantidade de itens
+        # e o total agregados no próprio SELECT.
+        pedidos = Pedido.objects.filter(cliente=cliente).select_related(
+            'info_envio'
+        )
+        if detalhes:
+            return pedidos.prefetch_related(Prefetch(
+                'detalhesdopedido_set',
+                queryset=DetalhesDoPedido.objects.order_by('id'),
+                to_attr='detalhes'
+            ))
+        return pedidos.annotate(
+            quantidade_itens=Coalesce(Sum('detalhesdopedido__quantidade'), 0),
+            total=Coalesce(Sum('detalhesdopedido__subtotal'), 0.0),
+        )
+
     def calcular_subtotal(self, pedido):
-        # Recalcular subtotal para cada detalhe associado ao pedido
-        detalhes = pedido.detalhesdopedido_set.all()
-        for detalhe in detalhes:
-            detalhe.subtotal = detalhe.quantidade * detalhe.custo_unidade
-            detalhe.save()
+
+        # Recalcula o subtotal de todos os detalhes do pedido em um UPDATE
+        detalhes = DetalhesDoPedido.objects.filter(pedido=pedido)
+        detalhes.update(subtotal=F('quantidade') * F('custo_unidade'))
 
         # Retorna os detalhes atualizados
         return detalhes
 
     def update(self, instance, validated_data):
         detalhes_data = validated_data.pop('detalhes', [])
+        cliente_anterior = instance.cliente_id
+        estado_anterior = instance.estado
         instance.num_pedido = validated_data.get(
             'num_pedido', instance.num_pedido
         )
@@ -45,43 +103,323 @@ class PedidoManager(models.Manager):
         instance.info_envio = validated_data.get(
             'info_envio', instance.info_envio
         )
-        instance.save()
 
-        # Atualizar ou criar detalhes
+        # Detalhes repetidos no payload viram um só; o último valor de cada
+        # campo prevalece
+        por_produto = {}
         for detalhe_data in detalhes_data:
-            detalhe_instance = DetalhesDoPedido.objects.filter(
-                pedido=instance,
-                num_produto=detalhe_data['num_produto']
-            ).first()
-            if detalhe_instance:
-                for attr, value in detalhe_data.items():
+            por_produto.setdefault(
+                detalhe_data['num_produto'], {}
+            ).update(detalhe_data)
+
+        with transaction.atomic():
+            instance.save()
+
+            # Uma leitura dos detalhes do pedido, indexados por produto; os
+            # alterados vão num bulk_update e os novos num bulk_create.
+            todos = list(DetalhesDoPedido.objects.filter(pedido=instance))
+            antes = VendaDiariaManager.linhas(todos)
+            existentes = {detalhe.num_produto: detalhe for detalhe in todos}
+            alterados, campos, novos = [], set(), []
+            for num_produto, detalhe_data in por_produto.items():
+                detalhe_instance = existentes.get(num_produto)
+                if detalhe_instance is None:
+                    novos.append(self._novo_detalhe(instance, detalhe_data))
+                    continue
+
+                mudou = {
+                    attr: value for attr, value in detalhe_data.items()
+                    if getattr(detalhe_instance, attr) != value
+                }
+                for attr, value in mudou.items():
                     setattr(detalhe_instance, attr, value)
-                detalhe_instance.save()
-            else:
-                DetalhesDoPedido.objects.create(
-                    pedido=instance, **detalhe_data
+                subtotal = (
+                    detalhe_instance.quantidade * detalhe_instance.custo_unidade # noqa E501
+                )
+                if detalhe_instance.subtotal != subtotal:
+                    detalhe_instance.subtotal = subtotal
+                    mudou['subtotal'] = subtotal
+                if mudou:
+                    alterados.append(detalhe_instance)
+                    campos.update(mudou)
+
+            if alterados:
+                DetalhesDoPedido.objects.bulk_update(alterados, list(campos))
+            if novos:
+                DetalhesDoPedido.objects.bulk_create(novos)
+
+            # Edição é rara: o resumo dos clientes afetados é recalculado
+            if alterados or novos or cliente_anterior != instance.cliente_id:
+                ResumoClienteManager().recalcular(
+                    {cliente_anterior, instance.cliente_id}
                 )
 
+            # Nas vendas diárias o pedido sai como estava e entra como ficou
+            if alterados or novos or estado_anterior != instance.estado:
+                vendas = VendaDiariaManager()
+                variacao = vendas.acumular(
+                    {}, instance.data_criacao, estado_anterior, antes, -1
+                )
+                vendas.acumular(
+                    variacao, instance.data_criacao, instance.estado,
+                    VendaDiariaManager.linhas(todos + novos)
+                )
+                vendas.somar(variacao)
+                nomes = {
+                    detalhe.num_produto: detalhe.nome_produto
+                    for detalhe in todos + novos
+                }
+                vendas.ranking([
+                    (regiao, num_produto, nomes[num_produto], quantidade)
+                    for (_, num_produto, regiao), (quantidade, _)
+                    in variacao.items()
+                ])
+
         return instance
 
 
+class ResumoClienteManager(models.Manager):
+
+    def registrar_pedido(self, pedido, detalhes):
+
+        # Soma um pedido novo ao resumo do cliente. Chamado na transação que
+        # cria o pedido: um UPDATE com F(); o INSERT só no primeiro pedido.
+        quantidade_itens = sum(detalhe.quantidade for detalhe in detalhes)
+        total = sum(detalhe.subtotal for detalhe in detalhes)
+        data = Value(pedido.data_criacao)
+        resumos = ResumoCliente.objects.filter(cliente_id=pedido.cliente_id)
+        incremento = {
+            'quantidade_pedidos': F('quantidade_pedidos') + 1,
+            'quantidade_itens': F('quantidade_itens') + quantidade_itens,
+            'total_gasto': F('total_gasto') + total,
+            'ultimo_pedido': Greatest(Coalesce('ultimo_pedido', data), data),
+        }
+        if resumos.update(**incremento):
+            return
+
+        try:
+            with transaction.atomic():
+                ResumoCliente.objects.create(
+                    cliente_id=pedido.cliente_id,
+                    quantidade_pedidos=1,
+                    quantidade_itens=quantidade_itens,
+                    total_gasto=total,
+                    ultimo_pedido=pedido.data_criacao
+                )
+        except IntegrityError:
+            # Outra transação criou o resumo antes: soma sobre ele
+            resumos.update(**incremento)
+
+    def remover_pedido(self, pedido):
+
+        # Desconta do resumo um pedido prestes a ser excluído: uma agregação
+        # dos detalhes e um UPDATE. A data do último pedido só é buscada de
+        # novo quando o excluído era o mais recente.
+        agregado = DetalhesDoPedido.objects.filter(pedido=pedido).aggregate(
+            itens=Sum('quantidade'), total=Sum('subtotal')
+        )
+        anterior = Pedido.objects.filter(
+            cliente_id=OuterRef('cliente_id')
+        ).exclude(pk=pedido.pk).order_by('-data_criacao').values(
+            'data_criacao'
+        )[:1]
+        ResumoCliente.objects.filter(cliente_id=pedido.cliente_id).update(
+            quantidade_pedidos=F('quantidade_pedidos') - 1,
+            quantidade_itens=F('quantidade_itens') - (agregado['itens'] or 0),
+            total_gasto=F('total_gasto') - (agregado['total'] or 0.0),
+            ultimo_pedido=Case(
+                When(
+                    ultimo_pedido=pedido.data_criacao,
+                    then=Subquery(anterior)
+                ),
+                default=F('ultimo_pedido')
+            )
+        )
+
+    def recalcular(self, clientes):
+
+        # Recalcula do zero os resumos dos clientes (ids): uma agregação dos
+        # pedidos, uma dos detalhes e um upsert. Clientes sem pedidos ficam
+        # sem resumo. Devolve a quantidade de resumos gravados.
+        clientes = list(clientes)
+        pedidos = Pedido.objects.filter(cliente_id__in=clientes).values(
+            'cliente_id'
+        ).annotate(
+            quantidade=Count('id'), ultimo=Max('data_criacao')
+        ).values_list('cliente_id', 'quantidade', 'ultimo')
+        detalhes = {
+            cliente_id: (itens, total)
+            for cliente_id, itens, total in DetalhesDoPedido.objects.filter(
+                pedido__cliente_id__in=clientes
+            ).values('pedido__cliente_id').annotate(
+                itens=Sum('quantidade'), total=Sum('subtotal')
+            ).values_list('pedido__cliente_id', 'itens', 'total')
+        }
+
+        resumos = []
+        for cliente_id, quantidade, ultimo in pedidos:
+            itens, total = detalhes.get(cliente_id, (0, 0.0))
+            resumos.append(ResumoCliente(
+                cliente_id=cliente_id,
+                quantidade_pedidos=quantidade,
+                quantidade_itens=itens,
+                total_gasto=total,
+                ultimo_pedido=ultimo
+            ))
+
+        with transaction.atomic():
+            ResumoCliente.objects.filter(cliente_id__in=clientes).exclude(
+                cliente_id__in=[resumo.cliente_id for resumo in resumos]
+            ).delete()
+            ResumoCliente.objects.bulk_create(
+                resumos,
+                update_conflicts=True,
+                unique_fields=['cliente'],
+                update_fields=[
+                    'quantidade_pedidos', 'quantidade_itens', 'total_gasto',
+                    'ultimo_pedido',
+                ]
+            )
+        return len(resumos)
+
+
+class VendaDiariaManager(models.Manager):
+
+    @staticmethod
+    def linhas(detalhes):
+
+        return [
+            (detalhe.num_produto, detalhe.quantidade, detalhe.subtotal)
+            for detalhe in detalhes
+        ]
+
+    @staticmethod
+    def regiao(estado):
+
+        return REGIAO_POR_ESTADO.get(
+            (estado or '').upper(), VendaDiaria.REGIAO_NAO_IDENTIFICADA
+        )
+
+    @staticmethod
+    def acumular(vendas, data, estado, linhas, sinal=1):
+
+        # Soma (ou, com sinal=-1, desconta) linhas (num_produto, quantidade,
+        # receita) de um pedido em {(dia, num_produto, regiao): [quantidade,
+        # receita]}. O dia é a data no fuso do projeto.
+        dia = timezone.localdate(data)
+        regiao = VendaDiariaManager.regiao(estado)
+        for num_produto, quantidade, receita in linhas:
+            venda = vendas.setdefault((dia, num_produto, regiao), [0, 0.0])
+            venda[0] += sinal * quantidade
+            venda[1] += sinal * receita
+        return vendas
+
+    def registrar_pedido(self, pedido, detalhes, sinal=1):
+
+        # Chamado na transação que cria (ou, com sinal=-1, exclui) o pedido.
+        # O ranking de mais vendidos só recebe a venda depois do commit.
+        detalhes = list(detalhes)
+        self.somar(self.acumular(
+            {}, pedido.data_criacao, pedido.estado, self.linhas(detalhes),
+            sinal
+        ))
+        regiao = self.regiao(pedido.estado)
+        self.ranking([
+            (regiao, detalhe.num_produto, detalhe.nome_produto,
+             sinal * detalhe.quantidade)
+            for detalhe in detalhes
+        ])
+
+    @staticmethod
+    def ranking(linhas):
+
+        transaction.on_commit(
+            partial(ranking_mais_vendidos.registrar, linhas)
+        )
+
+    def somar(self, vendas):
+
+        # Soma às vendas já gravadas, em upserts aditivos por lote de linhas
+        somar_em_lote(
+            VendaDiaria, ('dia', 'num_produto', 'regiao'),
+            ('quantidade', 'receita'),
+            [
+                (
+                    connection.ops.adapt_datefield_value(dia), num_produto,
+                    regiao, quantidade, receita
+                )
+                for (dia, num_produto, regiao), (quantidade, receita)
+                in vendas.items()
+                if quantidade or receita
+            ]
+        )
+
+    def refazer_dias(self, inicio, fim):
+
+        # Reconstrução: troca as vendas dos dias inicio <= dia < fim pelas
+        # linhas dos pedidos desses dias, agregadas no banco por dia,
+        # produto e estado. Na mesma transação, para que o painel nunca
+        # veja o período pela metade e os upserts concorrentes caiam antes
+        # (e sejam refeitos) ou depois (e somem ao resultado). Devolve
+        # (pedidos, linhas gravadas).
+        de, ate = (
+            timezone.make_aware(datetime.combine(dia, time.min))
+            for dia in (inicio, fim)
+        )
+        with transaction.atomic():
+            VendaDiaria.objects.filter(dia__gte=inicio, dia__lt=fim).delete()
+            pedidos = Pedido.objects.filter(
+                data_criacao__gte=de, data_criacao__lt=ate
+            ).count()
+            vendas = {}
+            agregado = DetalhesDoPedido.objects.filter(
+                pedido__data_criacao__gte=de, pedido__data_criacao__lt=ate
+            ).values(
+                'num_produto', 'pedido__estado',
+                dia=TruncDate('pedido__data_criacao')
+            ).annotate(
+                total_quantidade=Sum('quantidade'),
+                total_receita=Sum('subtotal')
+            ).values_list(
+                'dia', 'pedido__estado', 'num_produto', 'total_quantidade',
+                'total_receita'
+            )
+            for dia, estado, num_produto, quantidade, receita in agregado:
+                venda = vendas.setdefault(
+                    (dia, num_produto, self.regiao(estado)), [0, 0.0]
+                )
+                venda[0] += quantidade
+                venda[1] += receita
+            self.somar(vendas)
+        return pedidos, len(vendas)
+
+    def periodo(self, inicio, fim, agrupar, num_produto=None, regiao=None):
+
+        # Totais do período [inicio, fim] agrupados por dia, produto ou
+        # região (AGRUPAMENTOS_VENDAS), em uma consulta sobre a faixa de
+        # datas do índice único. Devolve [(chave, quantidade, receita)].
+        vendas = VendaDiaria.objects.filter(dia__range=(inicio, fim))
+        if num_produto is not None:
+            vendas = vendas.filter(num_produto=num_produto)
+        if regiao is not None:
+            vendas = vendas.filter(regiao=regiao)
+        campo = AGRUPAMENTOS_VENDAS[agrupar]
+        return list(
+            vendas.values(campo).annotate(
+                total_quantidade=Sum('quantidade'),
+                total_receita=Sum('receita')
+            ).order_by(campo).values_list(
+                campo, 'total_quantidade', 'total_receita'
+            )
+        )
+
+
 class InformacaoEnvioManager(models.Manager):
 
     @staticmethod
     def get_regiao_por_estado():
 
-        return {
-            # Centro-Oeste
-            'DF': 1, 'GO': 1, 'MT': 1, 'MS': 1,
-            # Nordeste
-            'AL': 2, 'BA': 2, 'CE': 2, 'MA': 2, 'PB': 2, 'PE': 2, 'PI': 2, 'RN': 2, 'SE': 2, # noqa E501
-            # Norte
-            'AC': 3, 'AP': 3, 'AM': 3, 'PA': 3, 'RO': 3, 'RR': 3, 'TO': 3,
-            # Sudeste
-            'ES': 4, 'MG': 4, 'RJ': 4, 'SP': 4,
-            # Sul
-            'PR': 5, 'RS': 5, 'SC': 5,
-        }
+        return REGIAO_POR_ESTADO
 
     def get_by_id(self, info_envio_id):
         try:
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0002_alter_informacaoenvio_num_regiao_envio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequencia',
+            fields=[
+                ('nome', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('proximo', models.BigIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Sequência',
+                'verbose_name_plural': 'Sequências',
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def popular_resumos(apps, schema_editor):
+    # Resumo inicial a partir dos pedidos já gravados; daqui em diante ele
+    # é mantido a cada pedido criado ou excluído.
+    Pedido = apps.get_model('pedidos', 'Pedido')
+    DetalhesDoPedido = apps.get_model('pedidos', 'DetalhesDoPedido')
+    ResumoCliente = apps.get_model('pedidos', 'ResumoCliente')
+
+    detalhes = {
+        linha['pedido__cliente_id']: linha
+        for linha in DetalhesDoPedido.objects.values(
+            'pedido__cliente_id'
+        ).annotate(itens=Sum('quantidade'), total=Sum('subtotal'))
+    }
+    ResumoCliente.objects.bulk_create([
+        ResumoCliente(
+            cliente_id=linha['cliente_id'],
+            quantidade_pedidos=linha['quantidade'],
+            quantidade_itens=detalhes.get(linha['cliente_id'], {}).get('itens') or 0, # noqa E501
+            total_gasto=detalhes.get(linha['cliente_id'], {}).get('total') or 0.0, # noqa E501
+            ultimo_pedido=linha['ultimo']
+        )
+        for linha in Pedido.objects.values('cliente_id').annotate(
+            quantidade=Count('id'), ultimo=Max('data_criacao')
+        )
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0003_sequencia'),
+        ('perfil', '0002_endereco'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoCliente',
+            fields=[
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo_pedidos', serialize=False, to='perfil.perfil')),
+                ('quantidade_pedidos', models.IntegerField(default=0)),
+                ('quantidade_itens', models.IntegerField(default=0)),
+                ('total_gasto', models.FloatField(default=0.0)),
+                ('ultimo_pedido', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Resumo de Pedidos do Cliente',
+                'verbose_name_plural': 'Resumos de Pedidos dos Clientes',
+            },
+        ),
+        migrations.RunPython(popular_resumos, migrations.RunPython.noop),
+    ]
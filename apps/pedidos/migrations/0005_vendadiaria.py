@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0004_resumocliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('num_produto', models.IntegerField()),
+                ('regiao', models.IntegerField(choices=[(0, 'Não identificada'), (1, 'Centro-Oeste'), (2, 'Nordeste'), (3, 'Norte'), (4, 'Sudeste'), (5, 'Sul')])),
+                ('quantidade', models.IntegerField(default=0)),
+                ('receita', models.FloatField(default=0.0)),
+            ],
+            options={
+                'verbose_name': 'Venda Diária',
+                'verbose_name_plural': 'Vendas Diárias',
+                'constraints': [models.UniqueConstraint(fields=('dia', 'num_produto', 'regiao'), name='venda_diaria_dia_produto_regiao')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0005_vendadiaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContagemVendasProduto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('regiao', models.IntegerField(choices=[(0, 'Não identificada'), (1, 'Centro-Oeste'), (2, 'Nordeste'), (3, 'Norte'), (4, 'Sudeste'), (5, 'Sul')])),
+                ('num_produto', models.IntegerField()),
+                ('nome_produto', models.CharField(max_length=100)),
+                ('quantidade', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contagem de Vendas do Produto',
+                'verbose_name_plural': 'Contagens de Vendas dos Produtos',
+                'constraints': [models.UniqueConstraint(fields=('regiao', 'num_produto'), name='contagem_vendas_regiao_produto')],
+            },
+        ),
+    ]
@@ -59,3 +59,85 @@ class DetalhesDoPedido(models.Model):
 
     def __str__(self):
         return f"Detalhe do pedido {self.pedido.num_pedido} - Produto: {self.nome_produto}" # noqa E501
+
+
+class Sequencia(models.Model):
+    """Contador de uma numeração gerada no servidor (ver sequencias.py)."""
+    nome = models.CharField(max_length=50, primary_key=True)
+    proximo = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = 'Sequência'
+        verbose_name_plural = 'Sequências'
+
+    def __str__(self):
+        return f"Sequência {self.nome}: {self.proximo}"
+
+
+class ResumoCliente(models.Model):
+    """Totais de pedidos do cliente, mantidos pelo ResumoClienteManager."""
+    cliente = models.OneToOneField(
+        Perfil,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumo_pedidos'
+    )
+    quantidade_pedidos = models.IntegerField(default=0)
+    quantidade_itens = models.IntegerField(default=0)
+    total_gasto = models.FloatField(default=0.0)
+    ultimo_pedido = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Resumo de Pedidos do Cliente'
+        verbose_name_plural = 'Resumos de Pedidos dos Clientes'
+
+    def __str__(self):
+        return f"Resumo do cliente {self.cliente_id}: {self.quantidade_pedidos} pedidos" # noqa E501
+
+
+class VendaDiaria(models.Model):
+    """Vendas por dia, produto e região, mantidas pelo VendaDiariaManager."""
+    REGIAO_NAO_IDENTIFICADA = 0
+    REGIAO_CHOICES = [
+        (REGIAO_NAO_IDENTIFICADA, 'Não identificada')
+    ] + InformacaoEnvio.REGIAO_CHOICES
+
+    dia = models.DateField()
+    num_produto = models.IntegerField()
+    regiao = models.IntegerField(choices=REGIAO_CHOICES)
+    quantidade = models.IntegerField(default=0)
+    receita = models.FloatField(default=0.0)
+
+    class Meta:
+        verbose_name = 'Venda Diária'
+        verbose_name_plural = 'Vendas Diárias'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dia', 'num_produto', 'regiao'],
+                name='venda_diaria_dia_produto_regiao'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} - Produto {self.num_produto} - Região {self.regiao}: {self.quantidade}" # noqa E501
+
+
+class ContagemVendasProduto(models.Model):
+    """Snapshot do ranking de mais vendidos (ver mais_vendidos.py)."""
+    regiao = models.IntegerField(choices=VendaDiaria.REGIAO_CHOICES)
+    num_produto = models.IntegerField()
+    nome_produto = models.CharField(max_length=100)
+    quantidade = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Contagem de Vendas do Produto'
+        verbose_name_plural = 'Contagens de Vendas dos Produtos'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['regiao', 'num_produto'],
+                name='contagem_vendas_regiao_produto'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Produto {self.num_produto} - Região {self.regiao}: {self.quantidade}" # noqa E501
@@ -0,0 +1,137 @@
+import threading
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from apps.pedidos.models import InformacaoEnvio, Pedido, Sequencia
+
+CONFIGURACAO_PADRAO = {
+    'TAMANHO_BLOCO': 50,
+}
+
+# Numerações geradas no servidor: nome -> (modelo, campo único). A
+# sequência começa depois do maior número já gravado no campo.
+SEQUENCIAS = {
+    'pedido': (Pedido, 'num_pedido'),
+    'envio': (InformacaoEnvio, 'num_envio'),
+}
+
+
+class AlocadorSequencias:
+    """
+    Números únicos entre processos, distribuídos em blocos.
+
+    Cada processo reserva uma faixa [inicio, fim) com um único UPDATE
+    (proximo = proximo + TAMANHO_BLOCO) e entrega os números da faixa a
+    partir da memória, sem ir ao banco a cada pedido. O UPDATE trava a
+    linha do contador até o commit, então duas reservas nunca se
+    sobrepõem. Números de uma faixa não usada (processo reiniciado) ficam
+    sem uso: a numeração é única e crescente por processo, mas pode ter
+    buracos.
+
+    Dentro de uma transação aberta pelo chamador a reserva seria desfeita
+    junto com ela, mas a faixa continuaria na memória; nesse caso é
+    reservado só o número pedido, sem guardar bloco.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocos = {}
+        self.reservas = 0
+        self.entregues = 0
+
+    def configuracao(self):
+        return {**CONFIGURACAO_PADRAO, **getattr(settings, 'SEQUENCIAS', {})}
+
+    def proximo(self, nome):
+        """Devolve o próximo número livre da sequência `nome`."""
+        if transaction.get_connection().in_atomic_block:
+            inicio, _ = self._reservar(nome, 1)
+            self.entregues += 1
+            return inicio
+
+        with self._lock:
+            bloco = self._blocos.get(nome)
+            if bloco is None or bloco[0] >= bloco[1]:
+                bloco = self._blocos[nome] = list(
+                    self._reservar(nome, self.configuracao()['TAMANHO_BLOCO'])
+                )
+            numero = bloco[0]
+            bloco[0] += 1
+            self.entregues += 1
+            return numero
+
+    def reservar_numero(self, nome, numero):
+        """
+        Reserva um número escolhido pelo cliente (legado). Só é aceito se
+        ainda não foi entregue a nenhum bloco, isto é, se for >= proximo:
+        o mesmo UPDATE que confere isso faz a sequência recomeçar depois
+        dele. Devolve False para números abaixo de proximo, que podem
+        estar na faixa em memória de algum processo.
+        """
+        with transaction.atomic():
+            if Sequencia.objects.filter(nome=nome, proximo__lte=numero).update(
+                proximo=numero + 1
+            ):
+                return True
+            if Sequencia.objects.filter(nome=nome).exists():
+                return False
+
+            # Sem contador ainda: ele nasce depois do número reservado
+            modelo, campo = SEQUENCIAS[nome]
+            ultimo = modelo.objects.aggregate(ultimo=Max(campo))['ultimo'] or 0 # noqa E501
+            if numero <= ultimo:
+                return False
+            try:
+                with transaction.atomic():
+                    Sequencia.objects.create(nome=nome, proximo=numero + 1)
+                return True
+            except IntegrityError:
+                # Outro processo criou o contador antes: confere sobre ele
+                return bool(Sequencia.objects.filter(
+                    nome=nome, proximo__lte=numero
+                ).update(proximo=numero + 1))
+
+    def descartar(self):
+        # Esquece as faixas em memória; os números não usados se perdem
+        with self._lock:
+            self._blocos.clear()
+
+    def metricas(self):
+        return {
+            'reservas': self.reservas,
+            'entregues': self.entregues,
+            'blocos': {
+                nome: {'proximo': inicio, 'restantes': fim - inicio}
+                for nome, (inicio, fim) in self._blocos.items()
+            },
+        }
+
+    def _reservar(self, nome, quantidade):
+        with transaction.atomic():
+            # UPDATE primeiro: a trava de escrita vem antes da leitura
+            if not Sequencia.objects.filter(nome=nome).update(
+                proximo=F('proximo') + quantidade
+            ):
+                self._criar(nome, quantidade)
+            fim = Sequencia.objects.filter(nome=nome).values_list(
+                'proximo', flat=True
+            ).get()
+        self.reservas += 1
+        return fim - quantidade, fim
+
+    def _criar(self, nome, quantidade):
+        modelo, campo = SEQUENCIAS[nome]
+        ultimo = modelo.objects.aggregate(ultimo=Max(campo))['ultimo'] or 0
+        try:
+            with transaction.atomic():
+                Sequencia.objects.create(
+                    nome=nome, proximo=ultimo + 1 + quantidade
+                )
+        except IntegrityError:
+            # Outro processo criou o contador antes: reserva sobre ele
+            Sequencia.objects.filter(nome=nome).update(
+                proximo=F('proximo') + quantidade
+            )
+
+
+alocador_sequencias = AlocadorSequencias()
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from api_carrinho.sinais import invalidar_agora_e_apos_commit
+from apps.pedidos.frete import resolvedor_frete
+from apps.pedidos.models import InformacaoEnvio
+
+
+@receiver(post_save, sender=InformacaoEnvio)
+@receiver(post_delete, sender=InformacaoEnvio)
+def invalidar_resolvedor_frete(sender, **kwargs):
+    invalidar_agora_e_apos_commit(resolvedor_frete.invalidar)
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from apps.pedidos.frete import ResolvedorFrete, resolvedor_frete
+from apps.pedidos.models import InformacaoEnvio
+
+
+class ResolvedorFreteTest(TestCase):
+    def setUp(self):
+        self.sudeste = InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio="Normal", custo_envio=20,
+            num_regiao_envio=4
+        )
+        self.resolvedor = ResolvedorFrete()
+
+    def test_resolve_primeiro_frete_da_regiao(self):
+        InformacaoEnvio.objects.create(
+            num_envio=2, tipo_envio="Expresso", custo_envio=50,
+            num_regiao_envio=4
+        )
+        self.assertEqual(self.resolvedor.resolver('sp'), self.sudeste)
+        self.assertIsNone(self.resolvedor.resolver('RS'))
+        self.assertIsNone(self.resolvedor.resolver('XX'))
+
+    def test_consultas_seguintes_nao_vao_ao_banco(self):
+        self.resolvedor.resolver('SP')
+        with self.assertNumQueries(0):
+            for estado in ('SP', 'RJ', 'MG', 'BA'):
+                self.resolvedor.resolver(estado)
+        metricas = self.resolvedor.metricas()
+        self.assertEqual(metricas['falhas'], 1)
+        self.assertEqual(metricas['acertos'], 4)
+
+    def test_sinais_invalidam_o_resolvedor_global(self):
+        self.assertEqual(resolvedor_frete.resolver('SP'), self.sudeste)
+
+        self.sudeste.delete()
+        self.assertIsNone(resolvedor_frete.resolver('SP'))
+
+        novo = InformacaoEnvio.objects.create(
+            num_envio=3, tipo_envio="Normal", custo_envio=25,
+            num_regiao_envio=4
+        )
+        self.assertEqual(resolvedor_frete.resolver('SP'), novo)
+
+    @override_settings(FRETE_INTERVALO_VERIFICACAO=0)
+    def test_versao_publicada_por_outro_processo_recarrega(self):
+        self.resolvedor.resolver('SP')
+        recargas = self.resolvedor.metricas()['recargas']
+
+        # Outro processo alterou os fretes e publicou uma nova versão
+        cache.set(
+            ResolvedorFrete.CHAVE_VERSAO,
+            cache.get(ResolvedorFrete.CHAVE_VERSAO, 0) + 1,
+            timeout=None
+        )
+        self.resolvedor.resolver('SP')
+        self.assertEqual(
+            self.resolvedor.metricas()['recargas'], recargas + 1
+        )
@@ -0,0 +1,221 @@
+import threading
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.pedidos.mais_vendidos import ranking_mais_vendidos
+from apps.pedidos.managers.managers_pedido import PedidoManager
+from apps.pedidos.models import ContagemVendasProduto, InformacaoEnvio
+from apps.pedidos.sequencias import alocador_sequencias
+from apps.perfil.models import Perfil
+
+
+# Sem a thread de snapshots: os testes chamam snapshot() quando precisam
+@override_settings(MAIS_VENDIDOS={'TAMANHO': 3, 'INTERVALO_SNAPSHOT': None})
+class RankingMaisVendidosTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        ranking_mais_vendidos.descartar()
+        self.addCleanup(ranking_mais_vendidos.descartar)
+        alocador_sequencias.descartar()
+        self.addCleanup(alocador_sequencias.descartar)
+
+        self.user = User.objects.create_user(
+            username='ranking', email='ranking@example.com',
+            password='password123'
+        )
+        self.perfil = Perfil.objects.create(usuario=self.user)
+        self.info_envio = InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio="Normal", custo_envio=10,
+            num_regiao_envio=4
+        )
+        self.manager = PedidoManager()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _pedido(self, estado, quantidades):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.manager.criar_pedido(
+                num_pedido=alocador_sequencias.proximo('pedido'),
+                cliente=self.perfil, estado=estado,
+                info_envio=self.info_envio,
+                detalhes=[
+                    {
+                        'num_produto': num_produto,
+                        'nome_produto': f"Produto {num_produto}",
+                        'quantidade': quantidade, 'custo_unidade': 5.0,
+                    }
+                    for num_produto, quantidade in quantidades.items()
+                ]
+            )
+
+    def _ranking(self, regiao=None):
+        return [
+            (item['num_produto'], item['quantidade'])
+            for item in ranking_mais_vendidos.mais_vendidos(regiao)
+        ]
+
+    def test_top_n_geral_e_por_regiao(self):
+        self._pedido('SP', {1: 5, 2: 3, 3: 1})
+        self._pedido('BA', {4: 4, 3: 1})
+
+        self.assertEqual(self._ranking(), [(1, 5), (4, 4), (2, 3)])
+        self.assertEqual(self._ranking(4), [(1, 5), (2, 3), (3, 1)])
+        self.assertEqual(self._ranking(2), [(4, 4), (3, 1)])
+
+        # Com o ranking carregado, a venda entra direto no heap
+        self._pedido('SP', {3: 6})
+        self.assertEqual(self._ranking(), [(3, 8), (1, 5), (4, 4)])
+        self.assertEqual(
+            ranking_mais_vendidos.mais_vendidos()[0]['nome_produto'],
+            "Produto 3"
+        )
+
+    def test_exclusao_remonta_o_topo(self):
+        self._pedido('SP', {1: 5, 2: 4, 3: 3, 4: 2})
+        pedido = self._pedido('SP', {1: 4})
+        self.assertEqual(self._ranking(), [(1, 9), (2, 4), (3, 3)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager.excluir_pedido(pedido)
+        self.assertEqual(self._ranking(), [(1, 5), (2, 4), (3, 3)])
+
+        # Quem sai do topo abre espaço para o próximo do mapa
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager.update(pedido.__class__.objects.get(), {
+                'detalhes': [{'num_produto': 1, 'quantidade': 1}]
+            })
+        self.assertEqual(self._ranking(), [(2, 4), (3, 3), (4, 2)])
+
+    def test_pedido_desfeito_nao_conta(self):
+        self._pedido('SP', {1: 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.manager.criar_pedido(
+                        num_pedido=alocador_sequencias.proximo('pedido'),
+                        cliente=self.perfil, estado='SP',
+                        info_envio=self.info_envio,
+                        detalhes=[{
+                            'num_produto': 2, 'nome_produto': "Produto 2",
+                            'quantidade': 10, 'custo_unidade': 5.0,
+                        }]
+                    )
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self._ranking(), [(1, 1)])
+
+    def test_snapshot_sobrevive_ao_reinicio(self):
+        self._pedido('SP', {1: 2, 2: 1})
+        self._pedido('RS', {2: 3})
+        ranking_mais_vendidos.snapshot()
+        self.assertEqual(
+            set(ContagemVendasProduto.objects.values_list(
+                'regiao', 'num_produto', 'quantidade'
+            )),
+            {(4, 1, 2), (4, 2, 1), (5, 2, 3)}
+        )
+
+        # Processo novo: começa pela tabela
+        ranking_mais_vendidos.descartar()
+        self.assertEqual(self._ranking(), [(2, 4), (1, 2)])
+        self.assertEqual(self._ranking(5), [(2, 3)])
+
+    def test_reconstrucao_a_partir_dos_pedidos(self):
+        self._pedido('SP', {1: 2})
+        self._pedido('SP', {2: 5})
+        ContagemVendasProduto.objects.all().delete()
+        ranking_mais_vendidos.descartar()
+
+        saida = StringIO()
+        call_command('reconstruir_mais_vendidos', stdout=saida)
+        self.assertIn("2 contagens", saida.getvalue())
+        self.assertEqual(self._ranking(), [(2, 5), (1, 2)])
+
+    def test_endpoint(self):
+        self._pedido('SP', {1: 2, 2: 1})
+        self._pedido('PR', {3: 7})
+        url = reverse('produtos-mais-vendidos')
+        self.client.get(url)
+
+        # Ranking já carregado: nenhuma consulta ao banco
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'limite': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'posicao': 1, 'num_produto': 3, 'nome_produto': "Produto 3",
+             'quantidade': 7},
+            {'posicao': 2, 'num_produto': 1, 'nome_produto': "Produto 1",
+             'quantidade': 2},
+        ])
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+        response = self.client.get(url, {'regiao': 4})
+        self.assertEqual([item['num_produto'] for item in response.data], [1, 2]) # noqa E501
+
+        response = self.client.get(url, {'regiao': 9})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_leitura_nao_grava(self):
+        self._pedido('SP', {1: 2})
+        self.assertEqual(self._ranking(), [(1, 2)])
+        # As vendas ficam pendentes até o snapshot da thread
+        self.assertFalse(ContagemVendasProduto.objects.exists())
+        self.assertEqual(ranking_mais_vendidos.metricas()['pendentes'], 1)
+
+    def test_carga_que_falha_serve_ranking_vazio(self):
+        url = reverse('produtos-mais-vendidos')
+        with mock.patch.object(
+            ranking_mais_vendidos, '_recarregar',
+            side_effect=OperationalError('database is locked')
+        ), self.assertLogs('apps.pedidos.mais_vendidos', 'ERROR'):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+        # A leitura seguinte tenta carregar de novo
+        self._pedido('SP', {1: 2})
+        self.assertEqual(self.client.get(url).data[0]['num_produto'], 1)
+
+    def test_snapshot_que_falha_mantem_o_ranking(self):
+        self._pedido('SP', {1: 2})
+        self.assertEqual(self._ranking(), [(1, 2)])
+        falhas = ranking_mais_vendidos.metricas()['falhas']
+
+        # Um ciclo da thread de snapshots (o segundo sleep a encerra)
+        sleep = mock.patch(
+            'apps.pedidos.mais_vendidos.time.sleep',
+            side_effect=[None, SystemExit]
+        )
+        upsert = mock.patch(
+            'apps.pedidos.mais_vendidos.somar_em_lote',
+            side_effect=OperationalError('database is locked')
+        )
+        with override_settings(MAIS_VENDIDOS={'INTERVALO_SNAPSHOT': 1}), \
+                sleep, upsert, \
+                self.assertLogs('apps.pedidos.mais_vendidos', 'ERROR'):
+            thread = threading.Thread(target=ranking_mais_vendidos._agendar)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(
+            ranking_mais_vendidos.metricas()['falhas'], falhas + 1
+        )
+        self.assertEqual(ranking_mais_vendidos.metricas()['pendentes'], 1)
+        self.assertEqual(self._ranking(), [(1, 2)])
+
+    def test_limite_invalido(self):
+        url = reverse('produtos-mais-vendidos')
+        for limite in (-3, 0):
+            response = self.client.get(url, {'limite': limite})
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
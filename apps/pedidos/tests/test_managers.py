@@ -0,0 +1,110 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from apps.pedidos.managers.managers_pedido import PedidoManager
+from apps.pedidos.models import DetalhesDoPedido, InformacaoEnvio
+from apps.perfil.models import Perfil
+
+
+class PedidoManagerEmLoteTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='lote', email='lote@example.com', password='password123'
+        )
+        self.perfil = Perfil.objects.create(usuario=self.user)
+        self.info_envio = InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio="Normal", custo_envio=10,
+            num_regiao_envio=4
+        )
+        self.manager = PedidoManager()
+
+    def _detalhes(self, quantidade):
+        return [
+            {
+                'num_produto': i, 'nome_produto': f"Produto {i}",
+                'quantidade': 2, 'custo_unidade': 5.0, 'subtotal': 0.0,
+            }
+            for i in range(quantidade)
+        ]
+
+    def comandos(self, funcao, *args):
+        # Comandos SQL, sem os savepoints da transação. O bulk_create é
+        # dividido em lotes pelo limite de parâmetros do SQLite.
+        with CaptureQueriesContext(connection) as contexto:
+            resultado = funcao(*args)
+        sql = [
+            consulta['sql'].split()[0] for consulta in contexto.captured_queries # noqa E501
+            if 'SAVEPOINT' not in consulta['sql']
+        ]
+        return resultado, sql
+
+    def _criar(self, detalhes):
+        return self.manager.criar_pedido(
+            num_pedido=1, cliente=self.perfil, estado="SP",
+            info_envio=self.info_envio, detalhes=detalhes
+        )
+
+    def test_criar_pedido_com_200_linhas_em_lote(self):
+        pedido, sql = self.comandos(self._criar, self._detalhes(200))
+        # Pedido e detalhes; o UPDATE (e, no primeiro pedido, um INSERT) é
+        # o do resumo do cliente e as vendas diárias entram em upserts de
+        # até 100 linhas
+        self.assertEqual(set(sql), {'INSERT', 'UPDATE'})
+        self.assertEqual(sql.count('UPDATE'), 1)
+        self.assertLess(len(sql), 9)
+
+        self.assertEqual(len(pedido.detalhes), 200)
+        self.assertEqual(
+            set(DetalhesDoPedido.objects.values_list('subtotal', flat=True)),
+            {10.0}
+        )
+
+    def test_update_altera_e_cria_detalhes_em_lote(self):
+        pedido = self._criar(self._detalhes(200))
+        detalhes = [
+            {'num_produto': 0, 'quantidade': 3},
+            {'num_produto': 1, 'custo_unidade': 5.0},
+            {'num_produto': 2, 'nome_produto': "Renomeado"},
+            {'num_produto': 2, 'quantidade': 4},
+            {'num_produto': 500, 'nome_produto': "Novo",
+             'quantidade': 1, 'custo_unidade': 7.0},
+        ] + [{'num_produto': i, 'quantidade': 1} for i in range(10, 200)]
+
+        # Pedido, leitura dos detalhes, bulk_update e bulk_create; depois o
+        # resumo do cliente recalculado (duas agregações e o upsert)
+        _, sql = self.comandos(
+            self.manager.update, pedido,
+            {'estado': "RJ", 'detalhes': detalhes}
+        )
+        self.assertEqual(sql[:2], ['UPDATE', 'SELECT'])
+        self.assertEqual(sql.count('SELECT'), 3)
+        self.assertLess(len(sql), 12)
+
+        linhas = {
+            detalhe.num_produto: detalhe
+            for detalhe in DetalhesDoPedido.objects.filter(pedido=pedido)
+        }
+        self.assertEqual(len(linhas), 201)
+        self.assertEqual(
+            (linhas[0].quantidade, linhas[0].subtotal), (3, 15.0)
+        )
+        self.assertEqual(linhas[1].subtotal, 10.0)
+        self.assertEqual(
+            (linhas[2].nome_produto, linhas[2].subtotal), ("Renomeado", 20.0)
+        )
+        self.assertEqual(linhas[150].subtotal, 5.0)
+        self.assertEqual(linhas[500].subtotal, 7.0)
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.estado, "RJ")
+
+    def test_calcular_subtotal_em_um_update(self):
+        pedido = self._criar(self._detalhes(3))
+        DetalhesDoPedido.objects.update(subtotal=0.0)
+
+        with self.assertNumQueries(1):
+            self.manager.calcular_subtotal(pedido)
+        self.assertEqual(
+            set(DetalhesDoPedido.objects.values_list('subtotal', flat=True)),
+            {10.0}
+        )
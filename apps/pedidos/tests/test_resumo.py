@@ -0,0 +1,149 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.pedidos.managers.managers_pedido import PedidoManager
+from apps.pedidos.models import InformacaoEnvio, Pedido, ResumoCliente
+from apps.pedidos.sequencias import alocador_sequencias
+from apps.perfil.models import Endereco, Perfil
+
+
+class ResumoClienteTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        alocador_sequencias.descartar()
+        self.addCleanup(alocador_sequencias.descartar)
+
+        self.user = User.objects.create_user(
+            username='resumo', email='resumo@example.com',
+            password='password123'
+        )
+        self.perfil = Perfil.objects.create(usuario=self.user)
+        Endereco.objects.create(
+            perfil=self.perfil, estado='SP', cidade='São Paulo',
+            rua='Rua Teste', numero='123', cep='01234-567'
+        )
+        self.info_envio = InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio="Normal", custo_envio=10,
+            num_regiao_envio=4
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _pedido(self, *quantidades):
+        detalhes = [
+            {
+                "num_produto": i, "nome_produto": f"Produto {i}",
+                "quantidade": quantidade, "custo_unidade": 5.0,
+                "subtotal": 0.0
+            }
+            for i, quantidade in enumerate(quantidades)
+        ]
+        response = self.client.post(
+            reverse('pedidos'),
+            {"info_envio": self.info_envio.id, "detalhes": detalhes},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Pedido.objects.get(pk=response.data['id'])
+
+    def _resumo(self):
+        return ResumoCliente.objects.get(cliente=self.perfil)
+
+    def test_cliente_sem_pedidos(self):
+        response = self.client.get(reverse('pedidos-resumo'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['quantidade_pedidos'], 0)
+        self.assertEqual(response.data['total_gasto'], 0.0)
+        self.assertIsNone(response.data['ultimo_pedido'])
+
+    def test_criacao_soma_ao_resumo(self):
+        self._pedido(2, 1)
+        segundo = self._pedido(4)
+
+        # Uma leitura pontual, sem varrer pedidos e detalhes
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('pedidos-resumo'))
+        self.assertEqual(response.data['cliente'], self.perfil.pk)
+        self.assertEqual(response.data['quantidade_pedidos'], 2)
+        self.assertEqual(response.data['quantidade_itens'], 7)
+        self.assertEqual(response.data['total_gasto'], 35.0)
+        self.assertEqual(self._resumo().ultimo_pedido, segundo.data_criacao)
+
+    def test_exclusao_desconta_do_resumo(self):
+        primeiro = self._pedido(2)
+        segundo = self._pedido(3)
+
+        response = self.client.delete(
+            reverse('pedido-detail', args=[segundo.id])
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        resumo = self._resumo()
+        self.assertEqual(
+            (resumo.quantidade_pedidos, resumo.quantidade_itens), (1, 2)
+        )
+        self.assertEqual(resumo.total_gasto, 10.0)
+        # O excluído era o mais recente: vale a data do anterior
+        self.assertEqual(resumo.ultimo_pedido, primeiro.data_criacao)
+
+        self.client.delete(reverse('pedido-detail', args=[primeiro.id]))
+        resumo = self._resumo()
+        self.assertEqual(resumo.quantidade_pedidos, 0)
+        self.assertIsNone(resumo.ultimo_pedido)
+
+    def test_edicao_recalcula_o_resumo(self):
+        pedido = self._pedido(2)
+        PedidoManager().update(
+            pedido, {'detalhes': [{'num_produto': 0, 'quantidade': 5}]}
+        )
+        resumo = self._resumo()
+        self.assertEqual(
+            (resumo.quantidade_itens, resumo.total_gasto), (5, 25.0)
+        )
+
+    def test_troca_de_cliente_recalcula_os_dois(self):
+        pedido = self._pedido(2)
+        outro = Perfil.objects.create(
+            usuario=User.objects.create_user(username='outro')
+        )
+        PedidoManager().update(pedido, {'cliente': outro})
+        self.assertFalse(
+            ResumoCliente.objects.filter(cliente=self.perfil).exists()
+        )
+        resumo = ResumoCliente.objects.get(cliente=outro)
+        self.assertEqual(
+            (resumo.quantidade_pedidos, resumo.quantidade_itens), (1, 2)
+        )
+
+    def test_reconstrucao_em_lotes(self):
+        self._pedido(2, 2)
+        self._pedido(1)
+        sem_pedidos = Perfil.objects.create(
+            usuario=User.objects.create_user(username='sem_pedidos')
+        )
+        ResumoCliente.objects.create(cliente=sem_pedidos, quantidade_pedidos=3) # noqa E501
+        ResumoCliente.objects.filter(cliente=self.perfil).update(
+            quantidade_pedidos=0, total_gasto=0.0, ultimo_pedido=None
+        )
+
+        saida = StringIO()
+        call_command('reconstruir_resumo_clientes', lote=1, stdout=saida)
+        self.assertIn("2 clientes verificados, 1 resumos gravados", saida.getvalue()) # noqa E501
+
+        resumo = self._resumo()
+        self.assertEqual(
+            (resumo.quantidade_pedidos, resumo.quantidade_itens), (2, 5)
+        )
+        self.assertEqual(resumo.total_gasto, 25.0)
+        self.assertEqual(
+            resumo.ultimo_pedido,
+            Pedido.objects.latest('data_criacao').data_criacao
+        )
+        self.assertFalse(
+            ResumoCliente.objects.filter(cliente=sem_pedidos).exists()
+        )
@@ -0,0 +1,237 @@
+import threading
+import time
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.pedidos.models import InformacaoEnvio, Pedido, Sequencia
+from apps.pedidos.sequencias import AlocadorSequencias, alocador_sequencias
+from apps.perfil.models import Endereco, Perfil
+
+
+@override_settings(SEQUENCIAS={'TAMANHO_BLOCO': 10})
+class AlocadorEmBlocosTest(TransactionTestCase):
+    def setUp(self):
+        alocador_sequencias.descartar()
+        self.addCleanup(alocador_sequencias.descartar)
+
+    def test_um_update_por_bloco(self):
+        # O primeiro bloco também cria o contador
+        numeros = [alocador_sequencias.proximo('pedido') for _ in range(10)]
+        self.assertEqual(numeros, list(range(1, 11)))
+        self.assertEqual(Sequencia.objects.get(nome='pedido').proximo, 11)
+
+        # BEGIN, UPDATE, leitura do contador e COMMIT para o bloco seguinte;
+        # o resto sai da memória
+        with self.assertNumQueries(4):
+            numeros = [alocador_sequencias.proximo('pedido') for _ in range(10)] # noqa E501
+        self.assertEqual(numeros, list(range(11, 21)))
+        self.assertEqual(Sequencia.objects.get(nome='pedido').proximo, 21)
+
+    def test_processos_diferentes_nao_repetem_numeros(self):
+        # Outro processo (ou reinício) começa um bloco novo: sobram buracos,
+        # nunca repetições
+        primeiro = alocador_sequencias.proximo('envio')
+        alocador_sequencias.descartar()
+        segundo = alocador_sequencias.proximo('envio')
+        self.assertEqual((primeiro, segundo), (1, 11))
+
+    def test_numero_do_cliente_dentro_de_um_bloco(self):
+        # O bloco 1..10 está na memória deste processo: 5 já é dele
+        self.assertEqual(alocador_sequencias.proximo('pedido'), 1)
+        self.assertFalse(alocador_sequencias.reservar_numero('pedido', 5))
+        self.assertEqual(alocador_sequencias.proximo('pedido'), 2)
+
+        # Acima do contador o número é livre e a sequência pula para depois
+        self.assertTrue(alocador_sequencias.reservar_numero('pedido', 15))
+        self.assertFalse(alocador_sequencias.reservar_numero('pedido', 15))
+        self.assertEqual(Sequencia.objects.get(nome='pedido').proximo, 16)
+        numeros = [alocador_sequencias.proximo('pedido') for _ in range(9)]
+        self.assertEqual(numeros, [3, 4, 5, 6, 7, 8, 9, 10, 16])
+
+    def test_numero_do_cliente_sem_contador(self):
+        InformacaoEnvio.objects.create(
+            num_envio=41, tipo_envio="Normal", custo_envio=10
+        )
+        self.assertFalse(alocador_sequencias.reservar_numero('envio', 41))
+        self.assertTrue(alocador_sequencias.reservar_numero('envio', 50))
+        self.assertEqual(alocador_sequencias.proximo('envio'), 51)
+
+    def test_comeca_depois_do_maior_numero_gravado(self):
+        InformacaoEnvio.objects.create(
+            num_envio=41, tipo_envio="Normal", custo_envio=10
+        )
+        self.assertEqual(alocador_sequencias.proximo('envio'), 42)
+
+
+class AlocadorEmTransacaoTest(TestCase):
+    def setUp(self):
+        alocador_sequencias.descartar()
+        self.addCleanup(alocador_sequencias.descartar)
+        self.user = User.objects.create_user(
+            username='sequencia', email='sequencia@example.com',
+            password='password123'
+        )
+        self.perfil = Perfil.objects.create(usuario=self.user)
+        Endereco.objects.create(
+            perfil=self.perfil, estado='SP', cidade='São Paulo',
+            rua='Rua Teste', numero='123', cep='01234-567'
+        )
+        self.info_envio = InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio="Normal", custo_envio=10,
+            num_regiao_envio=4
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_reserva_desfeita_nao_fica_em_memoria(self):
+        try:
+            with transaction.atomic():
+                self.assertEqual(alocador_sequencias.proximo('pedido'), 1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(alocador_sequencias.metricas()['blocos'], {})
+        self.assertEqual(alocador_sequencias.proximo('pedido'), 1)
+
+    def test_pedido_sem_numero_recebe_o_proximo(self):
+        Pedido.objects.create(
+            num_pedido=7, cliente=self.perfil, estado="SP",
+            info_envio=self.info_envio
+        )
+        data = {"info_envio": self.info_envio.id, "detalhes": []}
+
+        response = self.client.post(reverse('pedidos'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['num_pedido'], 8)
+
+        # Número escolhido pelo cliente empurra a sequência adiante
+        data['num_pedido'] = 20
+        response = self.client.post(reverse('pedidos'), data, format='json')
+        self.assertEqual(response.data['num_pedido'], 20)
+        del data['num_pedido']
+        response = self.client.post(reverse('pedidos'), data, format='json')
+        self.assertEqual(response.data['num_pedido'], 21)
+
+        # Abaixo do contador o número pode estar no bloco de um processo
+        data['num_pedido'] = 15
+        response = self.client.post(reverse('pedidos'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Pedido.objects.filter(num_pedido=15).exists())
+
+    def test_informacao_envio_sem_numero(self):
+        response = self.client.post(
+            reverse('informacao-envio'),
+            {"tipo_envio": "Expresso", "custo_envio": 30}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['num_envio'], 2)
+
+
+
+@override_settings(SEQUENCIAS={'TAMANHO_BLOCO': 5})
+class AlocadorConcorrenteTest(TransactionTestCase):
+    THREADS = 6
+    PEDIDOS_POR_THREAD = 15
+
+    def setUp(self):
+        alocador_sequencias.descartar()
+        self.addCleanup(alocador_sequencias.descartar)
+        self.info_envio = InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio="Normal", custo_envio=10,
+            num_regiao_envio=4
+        )
+
+    @staticmethod
+    def _repetindo(funcao, *args, **kwargs):
+        # O banco de testes é SQLite em memória com cache compartilhado,
+        # que responde "table is locked" na hora em vez de esperar o
+        # busy_timeout como o arquivo em WAL; essas tentativas se repetem
+        while True:
+            try:
+                return funcao(*args, **kwargs)
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+            time.sleep(0.001)
+
+    def _em_paralelo(self, alvo):
+        erros = []
+
+        def executar(indice):
+            try:
+                alvo(indice)
+            except Exception as e:  # pragma: no cover - falha do teste
+                erros.append(e)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=executar, args=(i,))
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(erros, [])
+
+    def test_processos_concorrentes_nao_repetem_numeros(self):
+        # Cada thread com o próprio alocador faz o papel de um processo
+        numeros = []
+
+        def alocar(_):
+            alocador = AlocadorSequencias()
+            numeros.extend(
+                self._repetindo(alocador.proximo, 'pedido')
+                for _ in range(50)
+            )
+
+        self._em_paralelo(alocar)
+        self.assertEqual(len(numeros), self.THREADS * 50)
+        self.assertEqual(len(set(numeros)), len(numeros))
+
+    def test_pedidos_concorrentes_com_numeros_do_cliente(self):
+        # Metade dos clientes manda números próprios, alguns já entregues
+        # a blocos (409) e outros à frente do contador; nenhum pedido pode
+        # falhar por número repetido
+        respostas = []
+
+        def criar(indice):
+            user = self._repetindo(
+                User.objects.create_user, username=f'concorrente{indice}'
+            )
+            perfil = self._repetindo(Perfil.objects.create, usuario=user)
+            self._repetindo(
+                Endereco.objects.create, perfil=perfil, estado='SP',
+                cidade='São Paulo', rua='Rua Teste', numero='123',
+                cep='01234-567'
+            )
+            client = APIClient()
+            client.force_authenticate(user=user)
+            # O cliente de testes guarda as exceções de qualquer thread
+            # (sinal got_request_exception); o "table is locked" sobe da
+            # view e chega aqui como 500, repetido
+            client.raise_request_exception = False
+            for i in range(self.PEDIDOS_POR_THREAD):
+                data = {"info_envio": self.info_envio.id, "detalhes": []}
+                if indice % 2 and i % 3 == 0:
+                    data['num_pedido'] = indice * 7 + i * 4
+                while True:
+                    response = client.post(
+                        reverse('pedidos'), data, format='json'
+                    )
+                    if response.status_code != 500:
+                        break
+                respostas.append((response.status_code, response.data))
+
+        self._em_paralelo(criar)
+        self.assertEqual(
+            [r for r in respostas if r[0] not in (201, 409)], []
+        )
+        criados = [data['num_pedido'] for codigo, data in respostas
+                   if codigo == status.HTTP_201_CREATED]
+        self.assertEqual(len(set(criados)), len(criados))
+        self.assertEqual(Pedido.objects.count(), len(criados))
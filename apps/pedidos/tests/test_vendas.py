@@ -0,0 +1,179 @@
+from datetime import date, datetime, timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.pedidos.managers.managers_pedido import PedidoManager
+from apps.pedidos.models import InformacaoEnvio, Pedido, VendaDiaria
+from apps.pedidos.sequencias import alocador_sequencias
+from apps.perfil.models import Perfil
+
+
+class VendasDiariasTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        alocador_sequencias.descartar()
+        self.addCleanup(alocador_sequencias.descartar)
+
+        self.user = User.objects.create_user(
+            username='vendas', email='vendas@example.com',
+            password='password123', is_staff=True
+        )
+        self.perfil = Perfil.objects.create(usuario=self.user)
+        self.info_envio = InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio="Normal", custo_envio=10,
+            num_regiao_envio=4
+        )
+        self.manager = PedidoManager()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.hoje = timezone.localdate()
+
+    def _pedido(self, estado, quantidades, dia=None):
+        pedido = self.manager.criar_pedido(
+            num_pedido=alocador_sequencias.proximo('pedido'),
+            cliente=self.perfil, estado=estado, info_envio=self.info_envio,
+            detalhes=[
+                {
+                    'num_produto': num_produto,
+                    'nome_produto': f"Produto {num_produto}",
+                    'quantidade': quantidade, 'custo_unidade': 5.0,
+                }
+                for num_produto, quantidade in quantidades.items()
+            ]
+        )
+        if dia is not None:
+            # data_criacao é auto_now_add: pedidos antigos são movidos depois
+            # e entram nas vendas pela reconstrução
+            Pedido.objects.filter(pk=pedido.pk).update(
+                data_criacao=timezone.make_aware(
+                    datetime.combine(dia, datetime.min.time())
+                )
+            )
+        return pedido
+
+    def _vendas(self):
+        return {
+            (venda.dia, venda.num_produto, venda.regiao):
+                (venda.quantidade, venda.receita)
+            for venda in VendaDiaria.objects.all()
+        }
+
+    def test_criacao_soma_por_dia_produto_e_regiao(self):
+        self._pedido('SP', {1: 2, 2: 1})
+        self._pedido('SP', {1: 3})
+        self._pedido('ba', {1: 1})
+        self._pedido('XX', {2: 1})
+
+        self.assertEqual(self._vendas(), {
+            (self.hoje, 1, 4): (5, 25.0),
+            (self.hoje, 2, 4): (1, 5.0),
+            (self.hoje, 1, 2): (1, 5.0),
+            (self.hoje, 2, VendaDiaria.REGIAO_NAO_IDENTIFICADA): (1, 5.0),
+        })
+
+    def test_exclusao_e_edicao_ajustam_as_vendas(self):
+        primeiro = self._pedido('SP', {1: 2, 2: 1})
+        self._pedido('SP', {1: 1})
+
+        self.manager.excluir_pedido(primeiro)
+        self.assertEqual(self._vendas(), {
+            (self.hoje, 1, 4): (1, 5.0),
+            (self.hoje, 2, 4): (0, 0.0),
+        })
+
+        # Estado novo: o pedido sai do Sudeste e entra no Sul
+        pedido = Pedido.objects.get()
+        self.manager.update(pedido, {
+            'estado': 'RS',
+            'detalhes': [{'num_produto': 1, 'quantidade': 4}],
+        })
+        vendas = self._vendas()
+        self.assertEqual(vendas[(self.hoje, 1, 4)], (0, 0.0))
+        self.assertEqual(vendas[(self.hoje, 1, 5)], (4, 20.0))
+
+    def test_reconstrucao_em_lotes(self):
+        ontem = self.hoje - timedelta(days=1)
+        self._pedido('SP', {1: 2}, dia=ontem)
+        self._pedido('SP', {1: 1}, dia=ontem)
+        self._pedido('RJ', {2: 1})
+        VendaDiaria.objects.update(quantidade=99)
+        # Sobra de um pedido excluído e de um dia sem pedidos nenhum
+        VendaDiaria.objects.create(
+            dia=ontem, num_produto=3, regiao=4, quantidade=-2, receita=-10.0
+        )
+        VendaDiaria.objects.create(
+            dia=ontem - timedelta(days=30), num_produto=1, regiao=4,
+            quantidade=-1, receita=-5.0
+        )
+
+        saida = StringIO()
+        call_command('reconstruir_vendas_diarias', dias=1, stdout=saida)
+        self.assertIn("3 pedidos agregados", saida.getvalue())
+        self.assertEqual(self._vendas(), {
+            (ontem, 1, 4): (3, 15.0),
+            (self.hoje, 2, 4): (1, 5.0),
+        })
+
+    def test_reconstrucao_troca_o_periodo_inteiro(self):
+        # Um pedido excluído antes de seu período ser refeito deixa o
+        # desconto nas vendas; a troca do período o apaga junto
+        pedido = self._pedido('SP', {1: 2})
+        self._pedido('SP', {2: 1})
+        self.manager.excluir_pedido(pedido)
+        VendaDiaria.objects.filter(num_produto=1).update(quantidade=-2)
+
+        call_command('reconstruir_vendas_diarias', stdout=StringIO())
+        self.assertEqual(self._vendas(), {(self.hoje, 2, 4): (1, 5.0)})
+
+    def test_consulta_por_periodo(self):
+        ontem = self.hoje - timedelta(days=1)
+        self._pedido('SP', {1: 2}, dia=ontem)
+        self._pedido('SP', {1: 1, 2: 2})
+        self._pedido('PR', {2: 1})
+        call_command('reconstruir_vendas_diarias', stdout=StringIO())
+
+        url = reverse('pedidos-vendas')
+        # Uma consulta agregada sobre as vendas consolidadas
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['inicio'], self.hoje - timedelta(days=29)) # noqa E501
+        self.assertEqual(
+            (response.data['quantidade'], response.data['receita']), (6, 30.0)
+        )
+        self.assertEqual(response.data['resultados'], [
+            {'dia': ontem, 'quantidade': 2, 'receita': 10.0},
+            {'dia': self.hoje, 'quantidade': 4, 'receita': 20.0},
+        ])
+
+        response = self.client.get(url, {'agrupar': 'regiao', 'num_produto': 2}) # noqa E501
+        self.assertEqual(response.data['resultados'], [
+            {'regiao': 4, 'quantidade': 2, 'receita': 10.0},
+            {'regiao': 5, 'quantidade': 1, 'receita': 5.0},
+        ])
+
+        response = self.client.get(url, {
+            'agrupar': 'produto', 'inicio': ontem.isoformat(),
+            'fim': ontem.isoformat()
+        })
+        self.assertEqual(response.data['resultados'], [
+            {'produto': 1, 'quantidade': 2, 'receita': 10.0},
+        ])
+
+    def test_consulta_invalida(self):
+        response = self.client.get(reverse('pedidos-vendas'), {
+            'inicio': date(2024, 2, 1), 'fim': date(2024, 1, 1)
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get(reverse('pedidos-vendas'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -1,9 +1,10 @@
-from django.test import TestCase
+import json
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.urls import reverse
-from apps.pedidos.models import InformacaoEnvio, Pedido
+from apps.pedidos.models import DetalhesDoPedido, InformacaoEnvio, Pedido
 from apps.perfil.models import Perfil, Endereco
 
 User = get_user_model()
@@ -57,7 +58,81 @@ class PedidoViewSetTest(BaseTestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def _criar_pedidos(self, cliente, quantidade, inicio=0):
+        for num in range(inicio, inicio + quantidade):
+            pedido = Pedido.objects.create(
+                num_pedido=num, cliente=cliente, estado="SP",
+                info_envio=self.info_envio
+            )
+            for produto in range(2):
+                DetalhesDoPedido.objects.create(
+                    pedido=pedido, num_produto=produto,
+                    nome_produto="Produto", quantidade=produto + 1,
+                    custo_unidade=10.0, subtotal=10.0 * (produto + 1)
+                )
+
+    def test_list_pedidos_apenas_do_cliente(self):
+        outro = User.objects.create_user(
+            username="outro", email="outro@example.com",
+            password="password123"
+        )
+        self._criar_pedidos(Perfil.objects.create(usuario=outro), 2)
+        self._criar_pedidos(self.perfil, 1, inicio=10)
+
+        response = self.client.get(reverse('pedidos'))
+        self.assertEqual(
+            [p['num_pedido'] for p in response.data['results']], [10]
+        )
+        self.assertEqual(len(response.data['results'][0]['detalhes']), 2)
+
+    def test_list_pedidos_consultas_constantes(self):
+        self._criar_pedidos(self.perfil, 12)
+        # O perfil fica em cache no usuário autenticado após a 1ª requisição
+        self.client.get(reverse('pedidos'))
+        # Pedidos da página e detalhes, para qualquer tamanho
+        for tamanho in (1, 5, 12):
+            with self.assertNumQueries(2):
+                response = self.client.get(
+                    reverse('pedidos'), {'tamanho': tamanho}
+                )
+            self.assertEqual(len(response.data['results']), tamanho)
+
+    def test_list_pedidos_paginados_e_resumo(self):
+        self._criar_pedidos(self.perfil, 3)
+
+        response = self.client.get(
+            reverse('pedidos'), {'tamanho': 2, 'resumo': 1}
+        )
+        self.assertEqual(
+            [p['num_pedido'] for p in response.data['results']], [2, 1]
+        )
+        self.assertNotIn('detalhes', response.data['results'][0])
+        self.assertEqual(response.data['results'][0]['quantidade_itens'], 3)
+        self.assertEqual(response.data['results'][0]['total'], 30.0)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(
+            [p['num_pedido'] for p in response.data['results']], [0]
+        )
+        self.assertIsNone(response.data['next'])
+
+    @override_settings(STREAMING={'TAMANHO_LOTE': 2})
+    def test_list_pedidos_em_streaming(self):
+        self._criar_pedidos(self.perfil, 5)
+
+        response = self.client.get(reverse('pedidos'), {'stream': 1})
+        self.assertTrue(response.streaming)
+        # Uma consulta de pedidos e um prefetch de detalhes por lote
+        with self.assertNumQueries(4):
+            corpo = b''.join(response.streaming_content)
+
+        pedidos = json.loads(corpo)
+        self.assertEqual([p['num_pedido'] for p in pedidos], list(range(5)))
+        self.assertEqual(
+            [d['num_produto'] for d in pedidos[0]['detalhes']], [0, 1]
+        )
 
     def test_create_pedido(self):
         url = reverse('pedidos')
@@ -0,0 +1,33 @@
+from django.db import connection
+
+# Linhas por INSERT, abaixo do limite de parâmetros do SQLite
+LINHAS_POR_LOTE = 100
+
+
+def somar_em_lote(modelo, chaves, campos, linhas, substituir=()):
+    """
+    Upsert aditivo: INSERT ... ON CONFLICT (chaves) DO UPDATE, somando os
+    `campos` aos valores já gravados (SQLite 3.24+ e PostgreSQL). Cada
+    linha traz os valores de chaves + campos + substituir, já adaptados
+    para o banco; as colunas de `substituir` ficam com o valor novo.
+    """
+    if not linhas:
+        return
+
+    tabela = connection.ops.quote_name(modelo._meta.db_table)
+    colunas = [*chaves, *campos, *substituir]
+    atribuicoes = [
+        f"{campo} = {tabela}.{campo} + excluded.{campo}" for campo in campos
+    ] + [f"{campo} = excluded.{campo}" for campo in substituir]
+    marcadores = '(' + ', '.join(['%s'] * len(colunas)) + ')'
+
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(linhas), LINHAS_POR_LOTE):
+            lote = linhas[inicio:inicio + LINHAS_POR_LOTE]
+            cursor.execute(
+                f"INSERT INTO {tabela} ({', '.join(colunas)}) "
+                f"VALUES {', '.join([marcadores] * len(lote))} "
+                f"ON CONFLICT ({', '.join(chaves)}) DO UPDATE SET "
+                f"{', '.join(atribuicoes)}",
+                [valor for linha in lote for valor in linha]
+            )
@@ -8,6 +8,7 @@ from apps.perfil.managers.managers import UsuarioManager, PerfilManager, Enderec
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from drf_yasg import openapi
+from api_carrinho.streaming import PARAMETRO_STREAM, resposta_em_streaming, streaming_solicitado # noqa E501
 
 from apps.perfil.models import Perfil
 
@@ -19,9 +20,15 @@ class UsuarioAPIView(APIView):
 
     @swagger_auto_schema(
         responses={200: UsuarioSerializer(many=True)},
+        manual_parameters=[PARAMETRO_STREAM],
     )
     def get(self, request):
         usuarios = UsuarioManager.listar_usuarios()
+        if streaming_solicitado(request):
+            return resposta_em_streaming(
+                request, usuarios,
+                lambda lote: UsuarioSerializer(lote, many=True).data
+            )
         serializer = UsuarioSerializer(usuarios, many=True)
         return Response(serializer.data, status=HTTP_200_OK)
 
@@ -150,9 +157,15 @@ class PerfilAPIView(APIView):
 
     @swagger_auto_schema(
         responses={200: PerfilSerializer(many=True)},
+        manual_parameters=[PARAMETRO_STREAM],
     )
     def get(self, request):
         perfis = PerfilManager.listar_perfis()
+        if streaming_solicitado(request):
+            return resposta_em_streaming(
+                request, perfis,
+                lambda lote: PerfilSerializer(lote, many=True).data
+            )
         serializer = PerfilSerializer(perfis, many=True)
         return Response(serializer.data, status=HTTP_200_OK)
 
@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def configurar(caminho_banco=None, caminho_replica=None):
+    """
+    Inicializa o Django apontando para um SQLite descartável e migrado.
+    Com caminho_replica, liga a réplica de leitura nesse arquivo.
+    """
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_carrinho.settings')
+    if caminho_replica:
+        # Lido pelo settings.py, que ainda não foi carregado
+        os.environ['REPLICA_LEITURA'] = caminho_replica
+
+    import django
+    from django.conf import settings
+
+    if caminho_banco is None:
+        caminho_banco = os.path.join(
+            tempfile.mkdtemp(prefix='bench_'), 'bench.sqlite3'
+        )
+    settings.DATABASES['default']['NAME'] = caminho_banco
+    settings.DEBUG = False
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return caminho_banco
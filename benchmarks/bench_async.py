@@ -0,0 +1,203 @@
+"""
+Teste de carga das leituras sob ASGI: views síncronas (produtos/,
+carrinhos/, pedidos/...) contra as variantes assíncronas (async/...), no
+mesmo worker - um processo e um event loop.
+
+Cada conexão simulada faz requisições em sequência, pelo handler ASGI do
+Django e sem servidor HTTP no meio, então o tempo medido é só o da
+aplicação. Com --espera, cada requisição também aguarda esse tempo (em
+ms) numa dependência de I/O - asyncio.sleep na assíncrona, time.sleep na
+síncrona -, simulando uma chamada externa.
+
+Além de requisições/s e p99, mede o pico de threads vivas: sob ASGI o
+Django dá a cada requisição em andamento uma thread própria para o código
+síncrono. Na view síncrona ela trabalha do início ao fim; na assíncrona
+só na autenticação e nas consultas, mas continua alocada até a resposta.
+
+    python benchmarks/bench_async.py --conexoes 1 16 64 --requisicoes 2000
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from _django import configurar
+
+ROTAS = (
+    ('produtos (cache)', '/produtos/', '/async/produtos/', b'tamanho=20'),
+    ('produto (cache)', '/produtos/{uuid}/', '/async/produtos/{uuid}/', b''),
+    ('carrinho ativo', '/carrinhos/', '/async/carrinhos/', b''),
+    ('finalizados', '/carrinhos/finalizados/', '/async/carrinhos/finalizados/', b''), # noqa E501
+    ('pedidos', '/pedidos/', '/async/pedidos/', b'tamanho=20'),
+)
+
+
+async def requisitar(aplicacao, caminho, consulta, token):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': caminho,
+        'raw_path': caminho.encode(), 'query_string': consulta,
+        'root_path': '', 'client': ('127.0.0.1', 5000),
+        'server': ('testserver', 80),
+        'headers': [
+            (b'host', b'testserver'),
+            (b'authorization', f'Token {token}'.encode()),
+        ],
+    }
+    mensagens = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    resposta = {}
+
+    async def receive():
+        if mensagens:
+            return mensagens.pop()
+        # O Django fica escutando a desconexão até a resposta sair
+        await asyncio.Event().wait()
+
+    async def send(mensagem):
+        if mensagem['type'] == 'http.response.start':
+            resposta['status'] = mensagem['status']
+
+    await aplicacao(scope, receive, send)
+    return resposta['status']
+
+
+async def carga(aplicacao, caminho, consulta, token, conexoes, total):
+    latencias = []
+    restantes = [total]
+
+    async def conexao():
+        while restantes[0] > 0:
+            restantes[0] -= 1
+            inicio = time.perf_counter()
+            status = await requisitar(aplicacao, caminho, consulta, token)
+            latencias.append(time.perf_counter() - inicio)
+            assert status == 200, (caminho, status)
+
+    async def amostrar_threads():
+        while True:
+            pico[0] = max(pico[0], threading.active_count())
+            await asyncio.sleep(0.001)
+
+    pico = [threading.active_count()]
+    amostragem = asyncio.create_task(amostrar_threads())
+    inicio = time.perf_counter()
+    await asyncio.gather(*(conexao() for _ in range(conexoes)))
+    duracao = time.perf_counter() - inicio
+    amostragem.cancel()
+    latencias.sort()
+    return (
+        total / duracao,
+        latencias[int(len(latencias) * 0.99) - 1] * 1e3,
+        pico[0],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--conexoes', type=int, nargs='+', default=[1, 16, 64]) # noqa E501
+    parser.add_argument('--requisicoes', type=int, default=2000)
+    parser.add_argument('--produtos', type=int, default=1000)
+    parser.add_argument('--pedidos', type=int, default=200)
+    parser.add_argument('--espera', type=float, default=0.0)
+    args = parser.parse_args()
+
+    configurar()
+
+    from django.conf import settings
+    settings.ALLOWED_HOSTS = ['testserver']
+
+    from django.contrib.auth.models import User
+    from django.core.asgi import get_asgi_application
+    from rest_framework.authtoken.models import Token
+    from rest_framework.views import APIView
+    from apps.carrinho.models import CarrinhoDeCompras, ItemCarrinho, Produto
+    from apps.pedidos.managers.managers_pedido import PedidoManager
+    from apps.pedidos.models import InformacaoEnvio
+    from apps.perfil.models import Perfil
+
+    # O throttling (100 requisições/dia por usuário) barraria a carga
+    APIView.throttle_classes = []
+
+    user = User.objects.create_user('bench')
+    perfil = Perfil.objects.create(usuario=user)
+    token = Token.objects.create(user=user).key
+    produtos = Produto.objects.bulk_create([
+        Produto(nome=f'Produto {i}', descricao='', preco=1.0, estoque=10)
+        for i in range(args.produtos)
+    ])
+    info_envio = InformacaoEnvio.objects.create(
+        num_envio=1, tipo_envio='Normal', custo_envio=10
+    )
+    for status_carrinho in CarrinhoDeCompras.StatusCarrinho.values:
+        carrinho = CarrinhoDeCompras.objects.create(
+            cliente=perfil, status=status_carrinho, frete=info_envio
+        )
+        ItemCarrinho.objects.bulk_create([
+            ItemCarrinho(
+                carrinho=carrinho, produto=produto, quantidade=1,
+                preco_unitario=1.0
+            )
+            for produto in produtos[:10]
+        ])
+    for i in range(args.pedidos):
+        PedidoManager().criar_pedido(
+            num_pedido=i, cliente=perfil, estado='SP', info_envio=info_envio,
+            detalhes=[{
+                'num_produto': j, 'nome_produto': f'Produto {j}',
+                'quantidade': 1, 'custo_unidade': 1.0,
+            } for j in range(3)]
+        )
+
+    if args.espera:
+        espera = args.espera / 1e3
+        from apps.carrinho.api import viewsets as carrinho
+        from apps.pedidos.api import viewsets as pedidos
+        classes = [
+            carrinho.ProdutoAPIView, carrinho.ProdutoDetailAPIView,
+            carrinho.CarrinhoAPIView, carrinho.ListarCarrinhosFinalizadosAPIView, # noqa E501
+            pedidos.PedidoAPIView,
+            carrinho.ProdutoAsyncAPIView, carrinho.ProdutoDetailAsyncAPIView,
+            carrinho.CarrinhoAsyncAPIView,
+            carrinho.ListarCarrinhosFinalizadosAsyncAPIView,
+            pedidos.PedidoAsyncAPIView,
+        ]
+        for classe in classes:
+            original = classe.get
+            if asyncio.iscoroutinefunction(original):
+                async def get(self, *a, _original=original, **k):
+                    await asyncio.sleep(espera)
+                    return await _original(self, *a, **k)
+            else:
+                def get(self, *a, _original=original, **k):
+                    time.sleep(espera)
+                    return _original(self, *a, **k)
+            classe.get = get
+
+    aplicacao = get_asgi_application()
+    uuid = str(produtos[0].num_produto)
+
+    print(
+        f"{args.requisicoes} requisições por medição, "
+        f"espera de I/O: {args.espera} ms"
+    )
+    print(f"{'rota':18} {'conexões':>8} {'req/s sínc.':>12} "
+          f"{'req/s assínc.':>14} {'p99 sínc.':>10} {'p99 assínc.':>12} "
+          f"{'threads sínc.':>14} {'threads assínc.':>16}")
+    for nome, sincrona, assincrona, consulta in ROTAS:
+        for conexoes in args.conexoes:
+            resultados = []
+            for caminho in (sincrona, assincrona):
+                caminho = caminho.format(uuid=uuid)
+                # Aquece o cache do catálogo e as conexões
+                asyncio.run(carga(aplicacao, caminho, consulta, token, 1, 5))
+                resultados.append(asyncio.run(carga(
+                    aplicacao, caminho, consulta, token, conexoes,
+                    args.requisicoes
+                )))
+            (rps_s, p99_s, threads_s), (rps_a, p99_a, threads_a) = resultados
+            print(f"{nome:18} {conexoes:>8} {rps_s:>12.0f} {rps_a:>14.0f} "
+                  f"{p99_s:>8.1f}ms {p99_a:>10.1f}ms "
+                  f"{threads_s:>14} {threads_a:>16}")
+
+if __name__ == '__main__':
+    main()
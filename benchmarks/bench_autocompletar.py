@@ -0,0 +1,89 @@
+"""
+Latência do autocompletar: índice em memória contra uma consulta por
+tecla (nome__istartswith ordenado por popularidade), além do tempo de
+montagem e da memória estimada do índice.
+
+    python benchmarks/bench_autocompletar.py --produtos 200000
+"""
+import argparse
+import random
+import time
+
+from _django import configurar
+
+PALAVRAS = (
+    "café camiseta caneca algodão térmica garrafa caderno mochila tênis "
+    "relógio cadeira mesa luminária panela frigideira toalha lençol "
+    "travesseiro fone cabo carregador teclado mouse monitor capa copo"
+).split()
+SILABAS = "ba be bi bo ca ce co da de di do fa fe fi ga go la le li lo ma me mi mo na ne no pa pe po ra re ri ro sa se si so ta te ti to".split() # noqa E501
+DIGITACOES = ("c", "ca", "cam", "cami", "camis", "camiseta ba", "lumi", "zzz")
+
+
+def medir(funcao, prefixos, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for prefixo in prefixos:
+            funcao(prefixo)
+    return (time.perf_counter() - inicio) / (repeticoes * len(prefixos)) * 1e6 # noqa E501
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--produtos', type=int, default=200000)
+    parser.add_argument('--repeticoes', type=int, default=200)
+    parser.add_argument('--memoria-mb', type=float, default=512)
+    args = parser.parse_args()
+
+    configurar()
+
+    from django.conf import settings
+    settings.AUTOCOMPLETAR = {'MEMORIA_MAXIMA_MB': args.memoria_mb}
+
+    from django.db.models import Sum
+    from django.db.models.functions import Coalesce
+    from apps.carrinho.autocompletar import indice_autocompletar
+    from apps.carrinho.models import Produto
+
+    aleatorio = random.Random(42)
+    lote = 10000
+    for base in range(0, args.produtos, lote):
+        Produto.objects.bulk_create([
+            Produto(
+                nome=f"{aleatorio.choice(PALAVRAS).title()} "
+                     f"{''.join(aleatorio.choices(SILABAS, k=3)).title()} {i}", # noqa E501
+                descricao="", preco=10.0, estoque=10
+            )
+            for i in range(base, min(base + lote, args.produtos))
+        ])
+
+    inicio = time.perf_counter()
+    indice_autocompletar.construir()
+    montagem = time.perf_counter() - inicio
+    metricas = indice_autocompletar.metricas()
+    print(
+        f"{args.produtos} produtos: índice montado em {montagem:.2f}s, "
+        f"{metricas['chaves']} chaves, ~{metricas['memoria_estimada_mb']} MB"
+    )
+
+    def consulta(prefixo):
+        return list(
+            Produto.objects.filter(nome__istartswith=prefixo).annotate(
+                popularidade=Coalesce(Sum('itens_carrinho__quantidade'), 0)
+            ).order_by('-popularidade', 'nome').values_list('nome')[:10]
+        )
+
+    # A primeira consulta de um prefixo longo varre a faixa; as seguintes
+    # saem do cache de prefixos até a próxima mudança no catálogo.
+    for prefixo in DIGITACOES:
+        frio = medir(indice_autocompletar.sugerir, [prefixo], 1)
+        quente = medir(indice_autocompletar.sugerir, [prefixo], args.repeticoes) # noqa E501
+        banco = medir(consulta, [prefixo], max(1, args.repeticoes // 50))
+        print(
+            f"  {prefixo!r:14s} índice: {frio:8.1f} µs (1ª) {quente:6.1f} µs | " # noqa E501
+            f"consulta por tecla: {banco:10.1f} µs"
+        )
+
+
+if __name__ == '__main__':
+    main()
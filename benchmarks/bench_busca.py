@@ -0,0 +1,97 @@
+"""
+Busca de produtos por texto: LIKE '%termo%' em nome/descrição (varredura
+da tabela) contra o índice FTS5 com ranking bm25, em catálogos de
+tamanhos diferentes.
+
+    python benchmarks/bench_busca.py --produtos 100000 1000000
+"""
+import argparse
+import random
+import time
+
+from _django import configurar
+
+PALAVRAS = (
+    "café camiseta caneca algodão térmica garrafa caderno mochila tênis "
+    "relógio cadeira mesa luminária panela frigideira toalha lençol "
+    "travesseiro fone cabo carregador teclado mouse monitor capa copo "
+    "prato talher vaso tapete cortina espelho sabonete perfume escova"
+).split()
+ADJETIVOS = (
+    "azul preto branco vermelho verde grande pequeno médio premium "
+    "básico orgânico importado nacional leve resistente macio"
+).split()
+# Marcas e modelos dão o vocabulário seletivo de um catálogo real; as
+# palavras acima casam com uma fração grande da tabela.
+SILABAS = "ba be bi bo ca ce co da de di do fa fe fi ga go la le li lo ma me mi mo na ne no pa pe po ra re ri ro sa se si so ta te ti to va ve vi vo za ze zu".split() # noqa E501
+MARCAS = [a + b + c for a in SILABAS[:20] for b in SILABAS for c in ('x', 'n', 'r')] # noqa E501
+TERMOS = (
+    "cafe", "camis alg", "tec", "organico premium",
+    MARCAS[7], MARCAS[-3][:4], f"{MARCAS[100]} lumin",
+)
+
+
+def popular(quantidade, inicio, Produto):
+    aleatorio = random.Random(inicio)
+    lote = 10000
+    for base in range(inicio, inicio + quantidade, lote):
+        Produto.objects.bulk_create([
+            Produto(
+                nome=f"{aleatorio.choice(PALAVRAS).title()} "
+                     f"{aleatorio.choice(MARCAS).title()} "
+                     f"{aleatorio.choice(ADJETIVOS)} {i}",
+                descricao=" ".join(aleatorio.choices(PALAVRAS + ADJETIVOS, k=8)), # noqa E501
+                preco=float(i % 500 + 1), estoque=10
+            )
+            for i in range(base, min(base + lote, inicio + quantidade))
+        ])
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e3, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--produtos', type=int, nargs='+', default=[100000, 1000000]
+    )
+    parser.add_argument('--limite', type=int, default=20)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    configurar()
+
+    from django.db.models import Q
+    from apps.carrinho.busca import buscar_produtos, extrair_palavras
+    from apps.carrinho.models import Produto
+
+    def like(termo):
+        filtro = Q()
+        for palavra in extrair_palavras(termo):
+            filtro &= Q(nome__icontains=palavra) | Q(
+                descricao__icontains=palavra
+            )
+        return list(Produto.objects.filter(filtro)[:args.limite])
+
+    total = 0
+    for alvo in sorted(args.produtos):
+        popular(alvo - total, total, Produto)
+        total = alvo
+        print(f"\n{total} produtos, {args.limite} resultados por busca")
+        for termo in TERMOS:
+            t_like, r_like = medir(lambda: like(termo), args.repeticoes)
+            t_fts, r_fts = medir(
+                lambda: buscar_produtos(termo, args.limite), args.repeticoes
+            )
+            print(
+                f"  {termo!r:20s} LIKE: {t_like:8.2f} ms ({len(r_like):2d}) | "
+                f"FTS5: {t_fts:7.2f} ms ({len(r_fts):2d})"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Stress test do decremento atômico de estoque no add-to-cart.
+
+Várias threads disputam o mesmo produto até o estoque acabar. Ao final o
+estoque precisa estar zerado, nunca negativo, e a soma das quantidades
+gravadas nos carrinhos precisa ser exatamente o estoque inicial.
+
+    python benchmarks/bench_estoque_concorrente.py --threads 8 --estoque 2000
+"""
+import argparse
+import threading
+import time
+
+from _django import configurar
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--estoque', type=int, default=2000)
+    parser.add_argument('--quantidade', type=int, default=1)
+    args = parser.parse_args()
+
+    configurar()
+
+    from django.contrib.auth.models import User
+    from django.db import OperationalError, connection
+    from apps.carrinho.managers.manager_carrinho import CarrinhoManager
+    from apps.carrinho.models import CarrinhoDeCompras, Produto
+    from apps.perfil.models import Perfil
+
+    produto = Produto.objects.create(
+        nome='Produto disputado', descricao='', preco=1.0,
+        estoque=args.estoque
+    )
+    carrinhos = []
+    for i in range(args.threads):
+        user = User.objects.create_user(username=f'bench{i}', password='x')
+        perfil = Perfil.objects.create(usuario=user)
+        carrinhos.append(CarrinhoManager().criar_carrinho_vazio(perfil))
+    connection.close()
+
+    sucessos = [0] * args.threads
+    recusas = [0] * args.threads
+    bloqueios = [0] * args.threads
+
+    def comprador(indice):
+        manager = CarrinhoManager()
+        carrinho = CarrinhoDeCompras.objects.get(pk=carrinhos[indice].pk)
+        item = Produto.objects.get(pk=produto.pk)
+        while True:
+            try:
+                manager.add_produto_carrinho(carrinho, item, args.quantidade)
+                sucessos[indice] += 1
+            except ValueError:
+                recusas[indice] += 1
+                break
+            except OperationalError:
+                # "database is locked": a transação foi desfeita, tenta de novo
+                bloqueios[indice] += 1
+                carrinho.refresh_from_db()
+        connection.close()
+
+    threads = [
+        threading.Thread(target=comprador, args=(i,))
+        for i in range(args.threads)
+    ]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    produto.refresh_from_db()
+    vendido = sum(
+        item['quantidade']
+        for carrinho in CarrinhoDeCompras.objects.all()
+        for item in carrinho.itens.values()
+    )
+    total = sum(sucessos)
+
+    print(f"threads:           {args.threads}")
+    print(f"estoque inicial:   {args.estoque}")
+    print(f"adições aceitas:   {total}")
+    print(f"retentativas:      {sum(bloqueios)}")
+    print(f"estoque final:     {produto.estoque}")
+    print(f"vendido (carrinhos): {vendido}")
+    print(f"oversell:          {max(0, vendido - args.estoque)}")
+    print(f"vazão:             {total / duracao:.0f} adições/s "
+          f"({duracao:.2f}s)")
+
+    assert produto.estoque >= 0
+    assert vendido + produto.estoque == args.estoque
+
+
+if __name__ == '__main__':
+    main()
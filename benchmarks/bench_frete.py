@@ -0,0 +1,55 @@
+"""
+Latência da resolução de frete por UF: caminho antigo (dicionário montado
+a cada chamada + consulta em InformacaoEnvio) contra o resolvedor em
+memória.
+
+    python benchmarks/bench_frete.py --iteracoes 20000
+"""
+import argparse
+import time
+
+from _django import configurar
+
+
+def medir(funcao, estados, iteracoes):
+    inicio = time.perf_counter()
+    for i in range(iteracoes):
+        funcao(estados[i % len(estados)])
+    return (time.perf_counter() - inicio) / iteracoes * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iteracoes', type=int, default=20000)
+    args = parser.parse_args()
+
+    configurar()
+
+    from apps.pedidos.frete import REGIAO_POR_ESTADO, resolvedor_frete
+    from apps.pedidos.models import InformacaoEnvio
+
+    for regiao in range(1, 6):
+        for i in range(3):
+            InformacaoEnvio.objects.create(
+                num_envio=regiao * 10 + i, tipo_envio=f"Tipo {i}",
+                custo_envio=10 * regiao + i, num_regiao_envio=regiao
+            )
+    estados = list(REGIAO_POR_ESTADO)
+
+    def caminho_antigo(estado):
+        regiao_por_estado = dict(REGIAO_POR_ESTADO)
+        return InformacaoEnvio.objects.filter(
+            num_regiao_envio=regiao_por_estado.get(estado)
+        ).first()
+
+    antes = medir(caminho_antigo, estados, args.iteracoes)
+    depois = medir(resolvedor_frete.resolver, estados, args.iteracoes)
+
+    print(f"consulta ao banco: {antes:8.2f} µs/resolução")
+    print(f"resolvedor:        {depois:8.2f} µs/resolução")
+    print(f"ganho:             {antes / depois:8.1f}x")
+    print(f"métricas:          {resolvedor_frete.metricas()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Serialização JSON das respostas: JSONRenderer/JSONParser do DRF contra
+OrjsonRenderer/OrjsonParser, em payloads de 10 mil linhas (produtos já
+passados pelo ProdutoSerializer e linhas "cruas" com UUID, datetime e
+Decimal).
+
+    python benchmarks/bench_json.py --linhas 10000
+"""
+import argparse
+import datetime
+import decimal
+import io
+import time
+import uuid
+
+from _django import configurar
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e3, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=10000)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    configurar()
+
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from api_carrinho.renderers import OrjsonParser, OrjsonRenderer
+    from apps.carrinho.api.serializers import ProdutoSerializer
+    from apps.carrinho.models import Produto
+
+    Produto.objects.bulk_create([
+        Produto(
+            nome=f"Produto {i}", descricao="Descrição do produto " * 4,
+            preco=float(i % 500 + 1), estoque=10
+        )
+        for i in range(args.linhas)
+    ])
+    agora = datetime.datetime.now(datetime.timezone.utc)
+    payloads = {
+        'produtos (serializer)': ProdutoSerializer(
+            Produto.objects.all(), many=True
+        ).data,
+        'linhas cruas': [
+            {
+                'num_produto': uuid.uuid4(),
+                'criado_em': agora,
+                'preco': decimal.Decimal('19.90'),
+                'quantidade': i,
+                'nome': f"Produto {i}",
+            }
+            for i in range(args.linhas)
+        ],
+    }
+
+    for nome, dados in payloads.items():
+        t_drf, corpo = medir(
+            lambda: JSONRenderer().render(dados), args.repeticoes
+        )
+        t_orjson, _ = medir(
+            lambda: OrjsonRenderer().render(dados), args.repeticoes
+        )
+        p_drf, _ = medir(
+            lambda: JSONParser().parse(io.BytesIO(corpo)), args.repeticoes
+        )
+        p_orjson, _ = medir(
+            lambda: OrjsonParser().parse(io.BytesIO(corpo)), args.repeticoes
+        )
+        print(
+            f"{nome:22s} {args.linhas} linhas, {len(corpo) / 1024:7.0f} KB | "
+            f"render DRF: {t_drf:7.2f} ms orjson: {t_orjson:6.2f} ms "
+            f"({t_drf / t_orjson:4.1f}x) | "
+            f"parse DRF: {p_drf:7.2f} ms orjson: {p_orjson:6.2f} ms "
+            f"({p_drf / p_orjson:4.1f}x)"
+        )
+
+
+if __name__ == '__main__':
+    main()
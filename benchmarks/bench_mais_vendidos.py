@@ -0,0 +1,105 @@
+"""
+Produtos mais vendidos: GROUP BY sobre DetalhesDoPedido a cada consulta
+contra o ranking mantido em memória (mapa de contagens + heap do top-N).
+Também mede o custo de registrar uma venda no ranking carregado.
+
+    python benchmarks/bench_mais_vendidos.py --pedidos 50000 --linhas 5
+"""
+import argparse
+import random
+import time
+
+from _django import configurar
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e3, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pedidos', type=int, default=50000)
+    parser.add_argument('--linhas', type=int, default=5)
+    parser.add_argument('--produtos', type=int, default=5000)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    configurar()
+
+    from io import StringIO
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db.models import Sum
+    from apps.pedidos.frete import REGIAO_POR_ESTADO
+    from apps.pedidos.mais_vendidos import ranking_mais_vendidos
+    from apps.pedidos.models import DetalhesDoPedido, InformacaoEnvio, Pedido
+    from apps.perfil.models import Perfil
+
+    aleatorio = random.Random(42)
+    perfil = Perfil.objects.create(usuario=User.objects.create_user('bench'))
+    info_envio = InformacaoEnvio.objects.create(
+        num_envio=1, tipo_envio='Normal', custo_envio=10
+    )
+    estados = list(REGIAO_POR_ESTADO)
+    pedidos = Pedido.objects.bulk_create([
+        Pedido(
+            num_pedido=i, cliente=perfil, info_envio=info_envio,
+            estado=aleatorio.choice(estados)
+        )
+        for i in range(args.pedidos)
+    ], batch_size=5000)
+    DetalhesDoPedido.objects.bulk_create([
+        DetalhesDoPedido(
+            pedido_id=pedido.pk, num_produto=num_produto,
+            nome_produto=f"Produto {num_produto}",
+            quantidade=aleatorio.randint(1, 5), custo_unidade=5.0,
+            subtotal=5.0
+        )
+        for pedido in pedidos
+        for num_produto in aleatorio.sample(range(args.produtos), args.linhas)
+    ], batch_size=5000)
+
+    inicio = time.perf_counter()
+    call_command('reconstruir_mais_vendidos', lote=5000, stdout=StringIO())
+    reconstrucao = time.perf_counter() - inicio
+    tamanho = ranking_mais_vendidos.configuracao()['TAMANHO']
+
+    def agrupamento():
+        return list(
+            DetalhesDoPedido.objects.values('num_produto').annotate(
+                total=Sum('quantidade')
+            ).order_by('-total', '-num_produto')[:tamanho]
+        )
+
+    def ranking():
+        return ranking_mais_vendidos.mais_vendidos()
+
+    antes, linhas_antes = medir(agrupamento, args.repeticoes)
+    depois, linhas_depois = medir(ranking, args.repeticoes)
+    assert [(linha['num_produto'], linha['total']) for linha in linhas_antes] == [ # noqa E501
+        (linha['num_produto'], linha['quantidade']) for linha in linhas_depois
+    ]
+
+    vendas = [
+        (4, aleatorio.randrange(args.produtos), '', aleatorio.randint(1, 5))
+        for _ in range(10000)
+    ]
+    inicio = time.perf_counter()
+    for venda in vendas:
+        ranking_mais_vendidos.registrar([venda])
+    registro = (time.perf_counter() - inicio) / len(vendas) * 1e6
+
+    linhas = args.pedidos * args.linhas
+    print(f"{args.pedidos} pedidos, {linhas} linhas, {args.produtos} produtos") # noqa E501
+    print(f"reconstrução:              {reconstrucao:8.2f} s")
+    print(f"top {tamanho}, GROUP BY:         {antes:8.2f} ms")
+    print(f"top {tamanho}, ranking:          {depois:8.3f} ms")
+    print(f"ganho:                     {antes / depois:8.1f}x")
+    print(f"registrar uma venda:       {registro:8.2f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Custo de uma página da listagem de produtos conforme a profundidade:
+OFFSET/LIMIT contra a paginação keyset (cursor) sobre os índices
+compostos (nome, id) e (preco, id).
+
+    python benchmarks/bench_paginacao.py --produtos 200000 --tamanho 50
+"""
+import argparse
+import time
+from urllib.parse import parse_qs, urlparse
+
+from _django import configurar
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--produtos', type=int, default=200000)
+    parser.add_argument('--tamanho', type=int, default=50)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    configurar()
+
+    from django.conf import settings
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from apps.carrinho.api.paginacao import PaginacaoPorChave
+    from apps.carrinho.models import Produto
+
+    lote = 5000
+    for inicio in range(0, args.produtos, lote):
+        Produto.objects.bulk_create([
+            Produto(
+                nome=f"Produto {i:07d}", descricao="",
+                preco=float(i % 997), estoque=1
+            )
+            for i in range(inicio, min(inicio + lote, args.produtos))
+        ])
+
+    settings.ALLOWED_HOSTS = ['testserver']
+    fabrica = APIRequestFactory()
+
+    def pagina_keyset(parametros):
+        paginacao = PaginacaoPorChave()
+        request = Request(fabrica.get('/produtos/', parametros))
+        paginacao.paginate_queryset(Produto.objects.all(), request)
+        return paginacao
+
+    print(f"{args.produtos} produtos, páginas de {args.tamanho}")
+    for ordenacao in ('id', 'nome', 'preco'):
+        ordem = (ordenacao,) if ordenacao == 'id' else (ordenacao, 'id')
+        profundo = args.produtos - args.tamanho * 2
+
+        # Cursor apontando para perto do fim, como o de um cliente que
+        # percorreu o catálogo
+        item = Produto.objects.order_by(*ordem)[profundo]
+        paginacao = pagina_keyset({'ordenacao': ordenacao})
+        link = paginacao.link_cursor(item, voltando=False)
+        cursor = parse_qs(urlparse(link).query)['cursor'][0]
+        parametros = {'tamanho': args.tamanho}
+
+        def offset(inicio):
+            return lambda: list(
+                Produto.objects.order_by(*ordem)[inicio:inicio + args.tamanho] # noqa E501
+            )
+
+        primeira = medir(offset(0), args.repeticoes)
+        offset_fundo = medir(offset(profundo), args.repeticoes)
+        keyset_fundo = medir(
+            lambda: pagina_keyset({**parametros, 'cursor': cursor}),
+            args.repeticoes
+        )
+        print(
+            f"{ordenacao:6s} página 1: {primeira:7.2f} ms | "
+            f"OFFSET {profundo}: {offset_fundo:7.2f} ms | "
+            f"cursor no mesmo ponto: {keyset_fundo:7.2f} ms"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+Navegação no catálogo concorrente com o checkout, com todas as leituras
+no default contra a réplica de leitura de api_carrinho/replica.py.
+
+Os leitores buscam produtos (GET produtos/busca/) e os escritores
+adicionam produtos ao carrinho (POST carrinhos/adicionar/...). No perfil
+'replica' o default e a réplica são arquivos SQLite separados e uma
+thread copia o default para a réplica a cada --intervalo segundos, como
+manage.py sincronizar_replica --intervalo. As requisições passam pelo
+handler WSGI do Django, sem servidor HTTP, e cada perfil roda num
+processo e num banco próprios.
+
+    python benchmarks/bench_replica.py --leitores 6 --escritores 2 --segundos 10
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from _django import configurar
+
+PERFIS = ('default', 'replica')
+
+
+def requisitar(aplicacao, metodo, caminho, token, consulta=''):
+    environ = {
+        'REQUEST_METHOD': metodo, 'PATH_INFO': caminho,
+        'QUERY_STRING': consulta,
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80',
+        'HTTP_HOST': 'testserver', 'HTTP_AUTHORIZATION': f'Token {token}',
+        'CONTENT_LENGTH': '0', 'wsgi.input': io.BytesIO(b''),
+        'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+    }
+    status = []
+    corpo = aplicacao(environ, lambda s, h, e=None: status.append(s))
+    try:
+        b''.join(corpo)
+    finally:
+        # Dispara request_finished, que fecha (ou mantém) a conexão
+        corpo.close()
+    return int(status[0].split()[0])
+
+
+def percentil(latencias, p):
+    latencias = sorted(latencias)
+    return latencias[max(int(len(latencias) * p) - 1, 0)] * 1e3
+
+
+def medir(args):
+    pasta = tempfile.mkdtemp(prefix='bench_')
+    banco = os.path.join(pasta, 'bench.sqlite3')
+    # O migrate já deixa a réplica com o esquema (post_migrate)
+    configurar(banco, os.path.join(pasta, 'replica.sqlite3')
+               if args.perfil == 'replica' else None)
+
+    from django.conf import settings
+    settings.ALLOWED_HOSTS = ['testserver']
+
+    from django.contrib.auth.models import User
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connection, connections
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from rest_framework.authtoken.models import Token
+    from rest_framework.views import APIView
+    from api_carrinho.replica import (
+        ReplicaMiddleware, RoteadorReplica, sincronizar
+    )
+    from apps.carrinho.managers.manager_carrinho import CarrinhoManager
+    from apps.carrinho.models import Produto
+    from apps.pedidos.models import InformacaoEnvio
+    from apps.perfil.models import Endereco, Perfil
+
+    # O throttling (100 requisições/dia por usuário) barraria a carga
+    APIView.throttle_classes = []
+
+    produtos = Produto.objects.bulk_create([
+        Produto(nome=f'Produto {i} cor {i % 7}', descricao='', preco=1.0,
+                estoque=10**9)
+        for i in range(args.produtos)
+    ])
+    # Frete do Sudeste, onde ficam os endereços
+    InformacaoEnvio.objects.create(
+        num_envio=1, tipo_envio='Normal', custo_envio=10, num_regiao_envio=4
+    )
+    tokens = []
+    for i in range(args.leitores + args.escritores):
+        perfil = Perfil.objects.create(
+            usuario=User.objects.create_user(f'bench{i}')
+        )
+        Endereco.objects.create(
+            perfil=perfil, estado='SP', cidade='São Paulo', rua='Rua',
+            numero='1', cep='01234-567'
+        )
+        CarrinhoManager().criar_carrinho_vazio(perfil)
+        tokens.append(Token.objects.create(user=perfil.usuario).key)
+    if args.perfil == 'replica':
+        sincronizar()
+    connection.close()
+
+    aplicacao = get_wsgi_application()
+    fim = time.perf_counter() + args.segundos
+    leituras, escritas, erros, copias = [], [], [], []
+
+    def leitor(indice):
+        aleatorio = random.Random(indice)
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            status = requisitar(
+                aplicacao, 'GET', '/produtos/busca/', tokens[indice],
+                f'q=cor+{aleatorio.randrange(7)}'
+            )
+            leituras.append(time.perf_counter() - inicio)
+            erros.append(status != 200)
+
+    def escritor(indice):
+        aleatorio = random.Random(indice)
+        while time.perf_counter() < fim:
+            produto = aleatorio.choice(produtos)
+            inicio = time.perf_counter()
+            status = requisitar(
+                aplicacao, 'POST',
+                f'/carrinhos/adicionar/{produto.num_produto}/1/',
+                tokens[indice]
+            )
+            escritas.append(time.perf_counter() - inicio)
+            # "database is locked" sobe da view como 500
+            erros.append(status != 200)
+
+    def sincronizador():
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            sincronizar()
+            copias.append(time.perf_counter() - inicio)
+            time.sleep(args.intervalo)
+        connections.close_all()
+
+    threads = [
+        threading.Thread(target=leitor, args=(i,))
+        for i in range(args.leitores)
+    ] + [
+        threading.Thread(target=escritor, args=(args.leitores + i,))
+        for i in range(args.escritores)
+    ]
+    if args.perfil == 'replica':
+        threads.append(threading.Thread(target=sincronizador))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Confere que o perfil leu de onde devia: dentro de uma requisição GET
+    # o roteador escolhe a réplica só quando ela é um arquivo separado
+    rota = []
+    ReplicaMiddleware(lambda r: rota.append(
+        RoteadorReplica().db_for_read(Produto)
+    ) or HttpResponse())(RequestFactory().get('/produtos/'))
+
+    print(json.dumps({
+        'rota': rota[0] or 'default',
+        'leituras': len(leituras),
+        'escritas': len(escritas),
+        'erros': sum(erros),
+        'p99_leitura': percentil(leituras, 0.99),
+        'p99_escrita': percentil(escritas, 0.99),
+        'copias': len(copias),
+        'copia_media': sum(copias) / len(copias) * 1e3 if copias else 0.0,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--leitores', type=int, default=6)
+    parser.add_argument('--escritores', type=int, default=2)
+    parser.add_argument('--produtos', type=int, default=5000)
+    parser.add_argument('--segundos', type=float, default=10.0)
+    parser.add_argument('--intervalo', type=float, default=1.0)
+    parser.add_argument('--perfil', choices=PERFIS)
+    args = parser.parse_args()
+
+    if args.perfil:
+        return medir(args)
+
+    print(f"{args.leitores} leitores, {args.escritores} escritores, "
+          f"{args.produtos} produtos, {args.segundos:.0f} s, "
+          f"cópia a cada {args.intervalo:.1f} s")
+    print(f"{'perfil':8} {'rota':>8} {'leit./s':>8} {'escr./s':>8} "
+          f"{'erros':>6} {'p99 leit.':>10} {'p99 escr.':>10} {'cópia':>8}")
+    for perfil in PERFIS:
+        saida = subprocess.run(
+            [sys.executable, __file__, '--perfil', perfil,
+             '--leitores', str(args.leitores),
+             '--escritores', str(args.escritores),
+             '--produtos', str(args.produtos),
+             '--segundos', str(args.segundos),
+             '--intervalo', str(args.intervalo)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        r = json.loads(saida.strip().splitlines()[-1])
+        copia = f"{r['copia_media']:.0f}ms" if r['copias'] else '-'
+        print(f"{perfil:8} {r['rota']:>8} "
+              f"{r['leituras'] / args.segundos:>8.0f} "
+              f"{r['escritas'] / args.segundos:>8.0f} {r['erros']:>6} "
+              f"{r['p99_leitura']:>8.1f}ms {r['p99_escrita']:>8.1f}ms "
+              f"{copia:>8}")
+
+
+if __name__ == '__main__':
+    main()
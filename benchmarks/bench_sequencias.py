@@ -0,0 +1,135 @@
+"""
+Stress test da numeração de pedidos gerada no servidor.
+
+Vários processos, cada um com várias threads, criam pedidos ao mesmo
+tempo no mesmo banco. Com o alocador em blocos nenhum número pode se
+repetir (zero IntegrityError); o modo "max" (MAX(num_pedido) + 1, como
+um cliente faria) mostra as colisões que o alocador evita.
+
+    python benchmarks/bench_sequencias.py --processos 4 --threads 4
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+
+from _django import configurar
+
+
+def criador(caminho_banco, modo, threads, pedidos, fila):
+    configurar(caminho_banco)
+
+    from django.db import IntegrityError, OperationalError, connection
+    from django.db.models import Max
+    from apps.pedidos.models import InformacaoEnvio, Pedido
+    from apps.pedidos.sequencias import alocador_sequencias
+    from apps.perfil.models import Perfil
+
+    perfil = Perfil.objects.get()
+    info_envio = InformacaoEnvio.objects.get()
+    connection.close()
+    colisoes = [0] * threads
+    bloqueios = [0] * threads
+
+    def numero():
+        if modo == 'alocador':
+            return alocador_sequencias.proximo('pedido')
+        ultimo = Pedido.objects.aggregate(ultimo=Max('num_pedido'))['ultimo']
+        return (ultimo or 0) + 1
+
+    def trabalhar(indice):
+        criados = 0
+        while criados < pedidos:
+            try:
+                Pedido.objects.create(
+                    num_pedido=numero(), cliente=perfil, estado='SP',
+                    info_envio=info_envio
+                )
+                criados += 1
+            except IntegrityError:
+                colisoes[indice] += 1
+            except OperationalError:
+                # "database is locked": tenta de novo
+                bloqueios[indice] += 1
+        connection.close()
+
+    lista = [
+        threading.Thread(target=trabalhar, args=(i,)) for i in range(threads)
+    ]
+    for thread in lista:
+        thread.start()
+    for thread in lista:
+        thread.join()
+    fila.put((sum(colisoes), sum(bloqueios), alocador_sequencias.reservas))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--processos', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--pedidos', type=int, default=250)
+    parser.add_argument(
+        '--modo', choices=('alocador', 'max', 'ambos'), default='ambos'
+    )
+    args = parser.parse_args()
+
+    modos = ('alocador', 'max') if args.modo == 'ambos' else (args.modo,)
+    contexto = multiprocessing.get_context('spawn')
+    caminho = configurar()
+
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from apps.pedidos.models import InformacaoEnvio, Pedido, Sequencia
+    from apps.perfil.models import Perfil
+
+    for modo in modos:
+        Pedido.objects.all().delete()
+        Sequencia.objects.all().delete()
+        Perfil.objects.all().delete()
+        InformacaoEnvio.objects.all().delete()
+        Perfil.objects.create(
+            usuario=User.objects.create_user(f'bench_{modo}')
+        )
+        InformacaoEnvio.objects.create(
+            num_envio=1, tipo_envio='Normal', custo_envio=10
+        )
+        connection.close()
+
+        fila = contexto.Queue()
+        processos = [
+            contexto.Process(
+                target=criador,
+                args=(caminho, modo, args.threads, args.pedidos, fila)
+            )
+            for _ in range(args.processos)
+        ]
+        inicio = time.perf_counter()
+        for processo in processos:
+            processo.start()
+        resultados = [fila.get() for _ in processos]
+        for processo in processos:
+            processo.join()
+        duracao = time.perf_counter() - inicio
+
+        esperado = args.processos * args.threads * args.pedidos
+        numeros = list(Pedido.objects.values_list('num_pedido', flat=True))
+        colisoes = sum(r[0] for r in resultados)
+        print(f"\nmodo {modo}: {args.processos} processos x "
+              f"{args.threads} threads x {args.pedidos} pedidos")
+        print(f"  pedidos criados:   {len(numeros)} (esperado {esperado})")
+        print(f"  números repetidos: {len(numeros) - len(set(numeros))}")
+        print(f"  IntegrityError:    {colisoes}")
+        print(f"  retentativas:      {sum(r[1] for r in resultados)}")
+        if modo == 'alocador':
+            print(f"  reservas de bloco: {sum(r[2] for r in resultados)}")
+            print(f"  buracos:           {max(numeros) - len(numeros)}")
+        print(f"  vazão:             {len(numeros) / duracao:.0f} pedidos/s "
+              f"({duracao:.2f}s)")
+
+        assert len(numeros) == esperado == len(set(numeros))
+        if modo == 'alocador':
+            assert colisoes == 0
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Carga mista de leitura e escrita pelos endpoints, com o SQLite "cru"
+(journal padrão, sem PRAGMAs, BEGIN DEFERRED, conexão nova por
+requisição) contra o perfil de api_carrinho/sqlite.py (WAL,
+synchronous=NORMAL, busy_timeout, mmap, BEGIN IMMEDIATE, CONN_MAX_AGE).
+
+Cada thread é um cliente com o próprio carrinho: a cada requisição lê o
+carrinho (GET carrinhos/) ou, com probabilidade --escritas, adiciona um
+produto (POST carrinhos/adicionar/...). As requisições passam pelo
+handler WSGI do Django, sem servidor HTTP, e cada perfil roda num
+processo e num banco próprios.
+
+    python benchmarks/bench_sqlite.py --threads 8 --segundos 10 --escritas 0.3
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from _django import BASE_DIR, configurar
+
+PERFIS = ('padrao', 'ajustado')
+
+
+def requisitar(aplicacao, metodo, caminho, token):
+    environ = {
+        'REQUEST_METHOD': metodo, 'PATH_INFO': caminho, 'QUERY_STRING': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80',
+        'HTTP_HOST': 'testserver', 'HTTP_AUTHORIZATION': f'Token {token}',
+        'CONTENT_LENGTH': '0', 'wsgi.input': io.BytesIO(b''),
+        'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+    }
+    status = []
+    corpo = aplicacao(environ, lambda s, h, e=None: status.append(s))
+    try:
+        b''.join(corpo)
+    finally:
+        # Dispara request_finished, que fecha (ou mantém) a conexão
+        corpo.close()
+    return int(status[0].split()[0])
+
+
+def medir(args):
+    if args.perfil == 'padrao':
+        # Antes do django.setup(): conexão por requisição, BEGIN DEFERRED
+        # e nenhum PRAGMA
+        sys.path.insert(0, str(BASE_DIR))
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_carrinho.settings') # noqa E501
+        from django.conf import settings
+        settings.DATABASES['default'].update(CONN_MAX_AGE=0, OPTIONS={})
+        settings.SQLITE_PRAGMAS = dict.fromkeys(settings.SQLITE_PRAGMAS)
+    configurar()
+
+    from django.conf import settings
+    settings.ALLOWED_HOSTS = ['testserver']
+
+    from django.contrib.auth.models import User
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connection
+    from rest_framework.authtoken.models import Token
+    from rest_framework.views import APIView
+    from apps.carrinho.managers.manager_carrinho import CarrinhoManager
+    from apps.carrinho.models import Produto
+    from apps.pedidos.models import InformacaoEnvio
+    from apps.perfil.models import Endereco, Perfil
+
+    # O throttling (100 requisições/dia por usuário) barraria a carga
+    APIView.throttle_classes = []
+
+    produtos = Produto.objects.bulk_create([
+        Produto(nome=f'Produto {i}', descricao='', preco=1.0, estoque=10**9)
+        for i in range(20)
+    ])
+    # Frete do Sudeste, onde ficam os endereços
+    InformacaoEnvio.objects.create(
+        num_envio=1, tipo_envio='Normal', custo_envio=10, num_regiao_envio=4
+    )
+    tokens = []
+    for i in range(args.threads):
+        perfil = Perfil.objects.create(
+            usuario=User.objects.create_user(f'bench{i}')
+        )
+        Endereco.objects.create(
+            perfil=perfil, estado='SP', cidade='São Paulo', rua='Rua',
+            numero='1', cep='01234-567'
+        )
+        CarrinhoManager().criar_carrinho_vazio(perfil)
+        tokens.append(Token.objects.create(user=perfil.usuario).key)
+    connection.close()
+
+    aplicacao = get_wsgi_application()
+    fim = time.perf_counter() + args.segundos
+    resultados = [None] * args.threads
+
+    def cliente(indice):
+        aleatorio = random.Random(indice)
+        leituras = escritas = erros = 0
+        latencias = []
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            if aleatorio.random() < args.escritas:
+                produto = aleatorio.choice(produtos)
+                status = requisitar(
+                    aplicacao, 'POST',
+                    f'/carrinhos/adicionar/{produto.num_produto}/1/',
+                    tokens[indice]
+                )
+                escritas += 1
+            else:
+                status = requisitar(
+                    aplicacao, 'GET', '/carrinhos/', tokens[indice]
+                )
+                leituras += 1
+            latencias.append(time.perf_counter() - inicio)
+            # "database is locked" sobe da view como 500
+            erros += status != 200
+        resultados[indice] = (leituras, escritas, erros, latencias)
+
+    threads = [
+        threading.Thread(target=cliente, args=(i,))
+        for i in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencias = sorted(x for *_, lista in resultados for x in lista)
+    print(json.dumps({
+        'leituras': sum(r[0] for r in resultados),
+        'escritas': sum(r[1] for r in resultados),
+        'erros': sum(r[2] for r in resultados),
+        'p99': latencias[int(len(latencias) * 0.99) - 1] * 1e3,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--segundos', type=float, default=10.0)
+    parser.add_argument('--escritas', type=float, default=0.3)
+    parser.add_argument('--perfil', choices=PERFIS)
+    args = parser.parse_args()
+
+    if args.perfil:
+        return medir(args)
+
+    print(f"{args.threads} threads, {args.segundos:.0f} s, "
+          f"{args.escritas:.0%} escritas")
+    print(f"{'perfil':10} {'req/s':>8} {'leituras':>9} {'escritas':>9} "
+          f"{'erros':>6} {'p99':>9}")
+    for perfil in PERFIS:
+        saida = subprocess.run(
+            [sys.executable, __file__, '--perfil', perfil,
+             '--threads', str(args.threads), '--segundos', str(args.segundos),
+             '--escritas', str(args.escritas)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        r = json.loads(saida.strip().splitlines()[-1])
+        total = r['leituras'] + r['escritas']
+        print(f"{perfil:10} {total / args.segundos:>8.0f} {r['leituras']:>9} "
+              f"{r['escritas']:>9} {r['erros']:>6} {r['p99']:>7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Listagem completa do catálogo: lista serializada inteira na memória e
+renderizada de uma vez contra o streaming (?stream=1), medindo o tempo
+até o primeiro byte, o tempo total e o pico de memória (tracemalloc).
+
+    python benchmarks/bench_streaming.py --produtos 50000 200000
+"""
+import argparse
+import time
+import tracemalloc
+
+from _django import configurar
+
+
+def medir(gerar_corpo):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    primeiro = None
+    tamanho = 0
+    for pedaco in gerar_corpo():
+        if primeiro is None:
+            primeiro = time.perf_counter() - inicio
+        tamanho += len(pedaco)
+    total = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return primeiro * 1e3, total * 1e3, pico / 2 ** 20, tamanho
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--produtos', type=int, nargs='+', default=[50000, 200000]
+    )
+    args = parser.parse_args()
+
+    configurar()
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIClient
+    from api_carrinho.renderers import OrjsonRenderer
+    from apps.carrinho.api.serializers import ProdutoSerializer
+    from apps.carrinho.models import Produto
+
+    settings.ALLOWED_HOSTS = ['testserver']
+    settings.REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'] = ()
+    cliente = APIClient()
+    cliente.force_authenticate(User.objects.create_user('bench'))
+
+    def em_memoria():
+        # Como a listagem funcionava antes: tudo serializado e renderizado
+        dados = ProdutoSerializer(Produto.objects.order_by('id'), many=True).data # noqa E501
+        yield OrjsonRenderer().render(dados)
+
+    def em_streaming():
+        yield from cliente.get('/produtos/', {'stream': 1}).streaming_content
+
+    total = 0
+    for alvo in sorted(args.produtos):
+        Produto.objects.bulk_create([
+            Produto(
+                nome=f"Produto {i}", descricao="Descrição do produto " * 4,
+                preco=float(i % 500 + 1), estoque=10
+            )
+            for i in range(total, alvo)
+        ], batch_size=10000)
+        total = alvo
+
+        print(f"\n{total} produtos")
+        for nome, funcao in (("em memória", em_memoria), ("streaming", em_streaming)): # noqa E501
+            primeiro, tempo, pico, tamanho = medir(funcao)
+            print(
+                f"  {nome:11s} 1º byte: {primeiro:8.1f} ms | total: "
+                f"{tempo:8.1f} ms | pico de memória: {pico:7.1f} MB | "
+                f"{tamanho / 2 ** 20:.1f} MB enviados"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Relatório de vendas por dia de um período: agregação direta sobre
+DetalhesDoPedido + Pedido (varredura a cada consulta) contra as vendas
+diárias consolidadas (VendaDiaria). Também mede a reconstrução em lotes.
+
+    python benchmarks/bench_vendas.py --pedidos 50000 --linhas 5 --dias 365
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from _django import configurar
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e3, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pedidos', type=int, default=50000)
+    parser.add_argument('--linhas', type=int, default=5)
+    parser.add_argument('--dias', type=int, default=365)
+    parser.add_argument('--produtos', type=int, default=500)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    configurar()
+
+    from io import StringIO
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db.models import Sum
+    from django.db.models.functions import TruncDate
+    from django.utils import timezone
+    from apps.pedidos.frete import REGIAO_POR_ESTADO
+    from apps.pedidos.managers.managers_pedido import VendaDiariaManager
+    from apps.pedidos.models import DetalhesDoPedido, InformacaoEnvio, Pedido
+    from apps.perfil.models import Perfil
+
+    aleatorio = random.Random(42)
+    perfil = Perfil.objects.create(usuario=User.objects.create_user('bench'))
+    info_envio = InformacaoEnvio.objects.create(
+        num_envio=1, tipo_envio='Normal', custo_envio=10
+    )
+    agora = timezone.now()
+    estados = list(REGIAO_POR_ESTADO)
+    pedidos = Pedido.objects.bulk_create([
+        Pedido(
+            num_pedido=i, cliente=perfil, info_envio=info_envio,
+            estado=aleatorio.choice(estados)
+        )
+        for i in range(args.pedidos)
+    ], batch_size=5000)
+    # auto_now_add ignora o valor passado: as datas são espalhadas depois
+    for pedido in pedidos:
+        pedido.data_criacao = agora - timedelta(
+            days=pedido.num_pedido % args.dias
+        )
+    Pedido.objects.bulk_update(pedidos, ['data_criacao'], batch_size=5000)
+    ids = [pedido.pk for pedido in pedidos]
+    DetalhesDoPedido.objects.bulk_create([
+        DetalhesDoPedido(
+            pedido_id=pedido_id, num_produto=num_produto,
+            nome_produto=f"Produto {num_produto}", quantidade=2,
+            custo_unidade=5.0, subtotal=10.0
+        )
+        for pedido_id in ids
+        for num_produto in aleatorio.sample(range(args.produtos), args.linhas)
+    ], batch_size=5000)
+
+    inicio = time.perf_counter()
+    call_command('reconstruir_vendas_diarias', dias=30, stdout=StringIO())
+    reconstrucao = time.perf_counter() - inicio
+
+    fim = timezone.localdate()
+    comeco = fim - timedelta(days=29)
+
+    def varredura():
+        return list(
+            DetalhesDoPedido.objects.annotate(
+                dia=TruncDate('pedido__data_criacao')
+            ).filter(dia__range=(comeco, fim)).values('dia').annotate(
+                quantidade=Sum('quantidade'), receita=Sum('subtotal')
+            ).order_by('dia')
+        )
+
+    def consolidado():
+        return VendaDiariaManager().periodo(comeco, fim, 'dia')
+
+    antes, linhas_antes = medir(varredura, args.repeticoes)
+    depois, linhas_depois = medir(consolidado, args.repeticoes)
+    assert [(linha['dia'], linha['quantidade']) for linha in linhas_antes] == [ # noqa E501
+        (dia, quantidade) for dia, quantidade, _ in linhas_depois
+    ]
+
+    linhas = args.pedidos * args.linhas
+    print(f"{args.pedidos} pedidos, {linhas} linhas, {args.dias} dias")
+    print(f"reconstrução:                  {reconstrucao:8.2f} s")
+    print(f"últimos 30 dias, varredura:    {antes:8.2f} ms")
+    print(f"últimos 30 dias, consolidado:  {depois:8.2f} ms")
+    print(f"ganho:                         {antes / depois:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()